@@ -0,0 +1,179 @@
+"""
+Caché de Resultados de Análisis
+LRU en memoria con segundo nivel opcional en disco, invalidado al cambiar la base de conocimiento
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge import snapshot
+
+
+_DIRECTORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _firma_codigo() -> str:
+    """Firma de los módulos de conocimiento y análisis (fecha de modificación de cada fuente)"""
+    fuentes = sorted(glob.glob(os.path.join(_DIRECTORIO_RAIZ, "knowledge", "*.py")) +
+                     glob.glob(os.path.join(_DIRECTORIO_RAIZ, "analysis", "*.py")))
+    resumen = hashlib.sha256()
+    for fuente in fuentes:
+        try:
+            resumen.update(f"{os.path.basename(fuente)}:{os.stat(fuente).st_mtime_ns};".encode())
+        except OSError:
+            continue
+    return resumen.hexdigest()[:16]
+
+
+class CacheResultados:
+    """
+    Caché de resultados compactos por clave de contenido
+
+    Las claves las calcula el consumidor (ver `clave`) e incluyen la firma de
+    la base de conocimiento: la versión del snapshot, su fecha y tamaño y la
+    de los módulos fuente. Si el snapshot cambia durante la vida de la caché,
+    el nivel en memoria se vacía y las entradas de disco con otra firma se
+    eliminan.
+
+    El nivel en disco (SQLite) es opcional y sobrevive a los reinicios; los
+    aciertos en disco se promueven a memoria.
+    """
+
+    def __init__(self, max_entradas: int = 256, ruta_disco: Optional[str] = None,
+                 max_entradas_disco: int = 10000, ruta_snapshot: Optional[str] = None):
+        """
+        Args:
+            max_entradas: Capacidad del nivel en memoria (LRU)
+            ruta_disco: Base SQLite del segundo nivel; None para usar solo memoria
+            max_entradas_disco: Capacidad del nivel en disco (se descartan las
+                entradas usadas hace más tiempo)
+            ruta_snapshot: Snapshot de la base de conocimiento (por defecto el del proyecto)
+        """
+        self.max_entradas = max_entradas
+        self.max_entradas_disco = max_entradas_disco
+        self.ruta_snapshot = ruta_snapshot or snapshot.RUTA_SNAPSHOT
+        self._memoria: "OrderedDict[str, Any]" = OrderedDict()
+        self.estadisticas = {"aciertos_memoria": 0, "aciertos_disco": 0, "fallos": 0, "invalidaciones": 0}
+
+        self._firma_codigo = _firma_codigo()
+        self._estado_snapshot = self._consultar_snapshot()
+        self.firma = self._calcular_firma()
+
+        self._conexion = None
+        if ruta_disco:
+            self._conexion = sqlite3.connect(ruta_disco, check_same_thread=False)
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                "clave TEXT PRIMARY KEY, firma TEXT NOT NULL, datos BLOB NOT NULL, usado REAL NOT NULL)"
+            )
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_resultados_usado ON resultados(usado)")
+            self._purgar_disco()
+
+    def _consultar_snapshot(self):
+        try:
+            estado = os.stat(self.ruta_snapshot)
+            return estado.st_mtime_ns, estado.st_size
+        except OSError:
+            return None
+
+    def _calcular_firma(self) -> str:
+        return f"{snapshot.VERSION_SNAPSHOT}:{self._estado_snapshot}:{self._firma_codigo}"
+
+    def _comprobar_vigencia(self):
+        """Invalida la caché si el snapshot ha cambiado desde la última consulta"""
+        estado = self._consultar_snapshot()
+        if estado != self._estado_snapshot:
+            self._estado_snapshot = estado
+            self.firma = self._calcular_firma()
+            self._memoria.clear()
+            self.estadisticas["invalidaciones"] += 1
+            if self._conexion:
+                self._purgar_disco()
+
+    def _purgar_disco(self):
+        """Elimina las entradas de disco de otras versiones de la base de conocimiento"""
+        with self._conexion:
+            self._conexion.execute("DELETE FROM resultados WHERE firma != ?", (self.firma,))
+
+    def clave(self, *partes: str) -> str:
+        """Clave de contenido: resumen SHA-256 de las partes y de la firma vigente"""
+        self._comprobar_vigencia()
+        resumen = hashlib.sha256(self.firma.encode())
+        for parte in partes:
+            resumen.update(b"\x00" + parte.encode("utf-8"))
+        return resumen.hexdigest()
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        """Valor almacenado para la clave, o None"""
+        valor = self._memoria.get(clave)
+        if valor is not None:
+            self._memoria.move_to_end(clave)
+            self.estadisticas["aciertos_memoria"] += 1
+            return valor
+
+        if self._conexion:
+            fila = self._conexion.execute(
+                "SELECT datos FROM resultados WHERE clave = ?", (clave,)).fetchone()
+            if fila:
+                with self._conexion:
+                    self._conexion.execute("UPDATE resultados SET usado = ? WHERE clave = ?",
+                                           (time.time(), clave))
+                valor = pickle.loads(fila[0])
+                self._guardar_en_memoria(clave, valor)
+                self.estadisticas["aciertos_disco"] += 1
+                return valor
+
+        self.estadisticas["fallos"] += 1
+        return None
+
+    def guardar(self, clave: str, valor: Any):
+        """Almacena un valor en memoria y, si está activo, en disco"""
+        self._guardar_en_memoria(clave, valor)
+        if self._conexion:
+            with self._conexion:
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO resultados (clave, firma, datos, usado) VALUES (?, ?, ?, ?)",
+                    (clave, self.firma, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), time.time())
+                )
+                self._conexion.execute(
+                    "DELETE FROM resultados WHERE clave IN (SELECT clave FROM resultados "
+                    "ORDER BY usado DESC LIMIT -1 OFFSET ?)", (self.max_entradas_disco,)
+                )
+
+    def _guardar_en_memoria(self, clave: str, valor: Any):
+        self._memoria[clave] = valor
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def limpiar(self):
+        """Vacía ambos niveles"""
+        self._memoria.clear()
+        if self._conexion:
+            with self._conexion:
+                self._conexion.execute("DELETE FROM resultados")
+
+    def __len__(self) -> int:
+        return len(self._memoria)
+
+    @property
+    def tasa_aciertos(self) -> float:
+        """Fracción de consultas resueltas por la caché (en memoria o en disco)"""
+        aciertos = self.estadisticas["aciertos_memoria"] + self.estadisticas["aciertos_disco"]
+        total = aciertos + self.estadisticas["fallos"]
+        return aciertos / total if total else 0.0
+
+    def describir(self) -> str:
+        """Resumen de uso de la caché"""
+        e = self.estadisticas
+        return (f"{len(self._memoria)} entradas en memoria; aciertos {e['aciertos_memoria']} (memoria) + "
+                f"{e['aciertos_disco']} (disco), fallos {e['fallos']}: tasa {self.tasa_aciertos:.0%}")
@@ -3,16 +3,28 @@ Analizador de Casos Penales
 Identifica tipos penales, analiza elementos y circunstancias
 """
 
+import copy
+import json
 import re
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+import time
+from array import array
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple, Optional, Union
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from knowledge.codigo_penal import CodigoPenal, TipoPenal, CircunstanciaModificativa
+from knowledge import prescripcion
+from knowledge.normalizacion import DocumentoNormalizado, normalizar
+from knowledge.codigo_penal import ArticuloCP, CodigoPenal, TipoPenal, CircunstanciaModificativa
+from knowledge.penas import PenaCalculada
+from knowledge.registro import obtener_codigo_penal
+from .cache_resultados import CacheResultados
+from .etapas import Etapa, EjecucionEtapas, GrafoEtapas
+from .puntuacion_tipos import AUSENTE, CONCURRE, DUDOSO, ModeloPuntuacionTipos
 
 
 @dataclass
@@ -22,23 +34,263 @@ class AnalisisElementos:
     elementos_ausentes: List[str]
     elementos_dudosos: List[str]
     conclusion: str  # "Tipo completo", "Tipo incompleto", "Tipo no concurre"
+    estados: Dict[str, int] = field(default_factory=dict)  # elemento -> CONCURRE/DUDOSO/AUSENTE
+
+    @classmethod
+    def desde_estados(cls, elementos: List[str], estados: Dict[str, int]) -> "AnalisisElementos":
+        """Construye el análisis a partir del estado de cada elemento del tipo"""
+        concurrentes, ausentes, dudosos = [], [], []
+        for elemento in elementos:
+            estado = estados.get(elemento, AUSENTE)
+            if estado == CONCURRE:
+                concurrentes.append(f"✓ {elemento}")
+            elif estado == DUDOSO:
+                dudosos.append(f"? {elemento}")
+            else:
+                ausentes.append(f"✗ {elemento}")
+
+        # Determinar conclusión
+        if not ausentes and not dudosos:
+            conclusion = "Tipo completo - Todos los elementos concurren"
+        elif ausentes:
+            conclusion = f"Tipo incompleto - Faltan elementos: {len(ausentes)}"
+        else:
+            conclusion = f"Tipo probable - Elementos dudosos: {len(dudosos)}"
+
+        return cls(
+            elementos_concurrentes=concurrentes,
+            elementos_ausentes=ausentes,
+            elementos_dudosos=dudosos,
+            conclusion=conclusion,
+            estados={elemento: estados.get(elemento, AUSENTE) for elemento in elementos}
+        )
 
 
-@dataclass
 class ResultadoAnalisis:
-    """Resultado completo del análisis de un caso"""
-    tipos_penales_identificados: List[TipoPenal]
-    tipo_principal: Optional[TipoPenal]
-    analisis_elementos: Dict[str, AnalisisElementos]
-    circunstancias_atenuantes: List[CircunstanciaModificativa]
-    circunstancias_agravantes: List[CircunstanciaModificativa]
-    circunstancias_eximentes: List[CircunstanciaModificativa]
-    pena_estimada: str
-    prescripcion: Dict[str, str]
-    calificacion_juridica: str
-    fundamentacion: str
-    advertencias: List[str]
-    alternativas_juridicas: List[str]
+    """
+    Resultado completo del análisis de un caso
+
+    Guarda los datos del análisis: tipos, estado de los elementos,
+    circunstancias, marco penal calculado y prescripción.
+    `puntuacion_relativa_tipos` reparte 1 entre los candidatos según su
+    puntuación; no es una probabilidad de acierto. Los textos en
+    Markdown (pena estimada, calificación, fundamentación, advertencias y
+    alternativas) se redactan la primera vez que se consultan, con las
+    mismas etapas que analizar_caso, y se conservan para las siguientes
+    consultas: en lotes y en el servicio, donde casi nunca se muestran, no
+    llegan a generarse.
+
+    El contexto se copia al construir el resultado, de modo que los textos
+    se redactan con el del análisis aunque el llamante modifique después el
+    suyo. Al serializarse con pickle se conservan los textos ya redactados y
+    la configuración del analizador que produjo el resultado; los que falten
+    los redacta un analizador compartido con esa misma configuración. Si el
+    analizador usaba un Código Penal propio, que no puede reproducirse en
+    otro proceso, los textos pendientes se redactan antes de serializar.
+    """
+
+    # Datos del análisis, calculados siempre
+    DATOS = ("tipos_penales_identificados", "tipo_principal", "analisis_elementos",
+             "circunstancias_atenuantes", "circunstancias_agravantes", "circunstancias_eximentes",
+             "marco_penal", "prescripcion", "articulos_aplicables", "puntuacion_relativa_tipos")
+    # Textos redactados bajo demanda
+    TEXTOS = ("pena_estimada", "calificacion_juridica", "fundamentacion", "advertencias", "alternativas_juridicas")
+    # Todos los campos del resultado, en orden de presentación
+    CAMPOS = ("tipos_penales_identificados", "tipo_principal", "analisis_elementos",
+              "circunstancias_atenuantes", "circunstancias_agravantes", "circunstancias_eximentes",
+              "marco_penal", "pena_estimada", "prescripcion", "calificacion_juridica", "fundamentacion",
+              "advertencias", "alternativas_juridicas", "articulos_aplicables", "puntuacion_relativa_tipos")
+
+    __slots__ = DATOS + ("tipos_descartados", "hechos", "contexto", "_textos", "_analizador", "_configuracion")
+
+    def __init__(self, tipos_penales_identificados: List[TipoPenal], tipo_principal: Optional[TipoPenal],
+                 analisis_elementos: Dict[str, AnalisisElementos],
+                 circunstancias_atenuantes: List[CircunstanciaModificativa],
+                 circunstancias_agravantes: List[CircunstanciaModificativa],
+                 circunstancias_eximentes: List[CircunstanciaModificativa],
+                 prescripcion: Dict[str, str], marco_penal: Optional[PenaCalculada] = None,
+                 articulos_aplicables: Dict[str, ArticuloCP] = None,
+                 puntuacion_relativa_tipos: Dict[str, float] = None,
+                 tipos_descartados: List[TipoPenal] = None, hechos: str = "", contexto: Dict = None,
+                 analizador: Optional["CaseAnalyzer"] = None, **textos):
+        """
+        Args:
+            tipos_descartados: Candidatos que no pasaron al análisis de elementos
+            hechos, contexto: Los del caso, para redactar los textos
+            analizador: El que redactará los textos (por defecto, el compartido)
+            textos: Textos ya redactados (pena_estimada, fundamentacion...), si los hay
+        """
+        desconocidos = set(textos) - set(self.TEXTOS)
+        if desconocidos:
+            raise TypeError(f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+
+        self.tipos_penales_identificados = tipos_penales_identificados
+        self.tipo_principal = tipo_principal
+        self.analisis_elementos = analisis_elementos
+        self.circunstancias_atenuantes = circunstancias_atenuantes
+        self.circunstancias_agravantes = circunstancias_agravantes
+        self.circunstancias_eximentes = circunstancias_eximentes
+        self.marco_penal = marco_penal
+        self.prescripcion = prescripcion
+        self.articulos_aplicables = articulos_aplicables if articulos_aplicables is not None else {}
+        self.puntuacion_relativa_tipos = puntuacion_relativa_tipos if puntuacion_relativa_tipos is not None else {}
+        self.tipos_descartados = tipos_descartados if tipos_descartados is not None else []
+        self.hechos = hechos
+        self.contexto = copy.deepcopy(contexto) if contexto is not None else {}
+        self._textos = textos
+        self._analizador = analizador
+        self._configuracion = None
+
+    def _texto(self, campo: str):
+        texto = self._textos.get(campo)
+        if texto is None:
+            analizador = self._analizador or _analizador_compartido(self._configuracion)
+            texto = self._textos[campo] = analizador._redactar(self, campo)
+        return texto
+
+    @property
+    def pena_estimada(self) -> str:
+        return self._texto("pena_estimada")
+
+    @property
+    def calificacion_juridica(self) -> str:
+        return self._texto("calificacion_juridica")
+
+    @property
+    def fundamentacion(self) -> str:
+        return self._texto("fundamentacion")
+
+    @property
+    def advertencias(self) -> List[str]:
+        return self._texto("advertencias")
+
+    @property
+    def alternativas_juridicas(self) -> List[str]:
+        return self._texto("alternativas_juridicas")
+
+    def redactado(self, campo: str) -> bool:
+        """Si el texto ya se ha redactado"""
+        return campo in self._textos
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Todos los campos (redacta los textos pendientes)"""
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    def __getstate__(self):
+        if self._analizador is not None:
+            configuracion = self._analizador.configuracion()
+            if configuracion is None:
+                for campo in self.TEXTOS:
+                    self._texto(campo)
+        else:
+            configuracion = self._configuracion
+        estado = {nombre: getattr(self, nombre) for nombre in self.__slots__
+                  if nombre not in ("_analizador", "_configuracion")}
+        estado["_configuracion"] = configuracion
+        return estado
+
+    def __setstate__(self, estado):
+        self._configuracion = None
+        for nombre, valor in estado.items():
+            setattr(self, nombre, valor)
+        self._analizador = None
+
+    def __eq__(self, otro):
+        if not isinstance(otro, ResultadoAnalisis):
+            return NotImplemented
+        return all(getattr(self, nombre) == getattr(otro, nombre)
+                   for nombre in self.DATOS + ("tipos_descartados", "hechos", "contexto"))
+
+    __hash__ = None
+
+    def __repr__(self):
+        principal = self.tipo_principal.nombre if self.tipo_principal else None
+        return (f"ResultadoAnalisis(tipo_principal={principal!r}, "
+                f"tipos={[tipo.nombre for tipo in self.tipos_penales_identificados]!r})")
+
+
+@dataclass
+class EstadoCaso:
+    """
+    Estado del análisis incremental de un caso
+
+    Lo que los hechos recibidos hasta ahora aportan a cada paso del análisis.
+    Todo se acumula por unión, de modo que basta con actualizarlo con cada
+    fragmento nuevo de los hechos.
+    """
+    hechos: str = ""
+    contexto: Dict = field(default_factory=dict)
+    # Final del texto normalizado (últimas palabras): se antepone al fragmento
+    # siguiente para que las locuciones partidas entre turnos se reconozcan
+    cola: str = ""
+    palabras_clave: Set[int] = field(default_factory=set)
+    elementos_presentes: Set[str] = field(default_factory=set)
+    cobertura: Dict[str, set] = field(default_factory=dict)
+    terminos_circunstancias: Set[int] = field(default_factory=set)
+    hay_dudas: bool = False
+    # Etapas del análisis del caso: los pasos 1, 2 y 4 se imponen desde este
+    # estado y el resto se memoriza entre turnos mientras no cambien sus entradas
+    ejecucion: Optional[EjecucionEtapas] = None
+
+
+@dataclass
+class MetricasLote:
+    """Rendimiento de un análisis por lotes; se actualiza a medida que llegan los resultados"""
+    trabajadores: int = 1
+    casos: int = 0
+    segundos: float = 0.0
+
+    @property
+    def casos_por_segundo(self) -> float:
+        return self.casos / self.segundos if self.segundos else 0.0
+
+    def describir(self) -> str:
+        return (f"{self.casos} casos en {self.segundos:.2f} s con {self.trabajadores} "
+                f"trabajador(es): {self.casos_por_segundo:.1f} casos/s")
+
+
+# Un caso del lote: los hechos, o (hechos, contexto)
+CasoLote = Union[str, Tuple[str, Dict]]
+
+# Analizador de cada proceso trabajador, creado una vez al arrancar el proceso
+_analizador_trabajador = None
+
+# Analizadores que redactan los textos de los resultados que no traen el suyo
+# (los recibidos de otro proceso), por configuración; se crean al primer uso
+_analizadores_compartidos: Dict[Optional[Tuple], "CaseAnalyzer"] = {}
+
+
+def _analizador_compartido(configuracion: Optional[Tuple] = None) -> "CaseAnalyzer":
+    """Analizador con la configuración indicada (ver CaseAnalyzer.configuracion); None, la de defecto"""
+    analizador = _analizadores_compartidos.get(configuracion)
+    if analizador is None:
+        if _analizador_trabajador is not None and (
+                configuracion is None or _analizador_trabajador.configuracion() == configuracion):
+            analizador = _analizador_trabajador
+        else:
+            analizador = CaseAnalyzer(**dict(configuracion or ()))
+        _analizadores_compartidos[configuracion] = analizador
+    return analizador
+
+
+def _inicializar_trabajador(max_tipos_analizados: Optional[int]):
+    """Carga la base de conocimiento en el proceso trabajador (una sola vez)"""
+    global _analizador_trabajador
+    _analizador_trabajador = CaseAnalyzer(max_tipos_analizados=max_tipos_analizados)
+
+
+def _analizar_en_trabajador(tarea: Tuple[int, str, Dict]) -> Tuple[int, "ResultadoAnalisis"]:
+    indice, hechos, contexto = tarea
+    return indice, _analizador_trabajador.analizar_caso(hechos, contexto)
+
+
+def _tareas_lote(casos: Iterable[CasoLote]) -> Iterator[Tuple[int, str, Dict]]:
+    for indice, caso in enumerate(casos):
+        if isinstance(caso, str):
+            yield indice, caso, {}
+        else:
+            hechos, contexto = caso
+            yield indice, hechos, contexto or {}
 
 
 class CaseAnalyzer:
@@ -47,8 +299,121 @@ class CaseAnalyzer:
     Identifica delitos, analiza elementos y circunstancias
     """
 
-    def __init__(self):
-        self.codigo_penal = CodigoPenal()
+    # Número de tipos candidatos que se someten al análisis completo de elementos
+    MAX_TIPOS_ANALIZADOS = 8
+
+    # Términos que marcan como dudosos los elementos no expresados
+    TERMINOS_DUDA = ("posible", "probablemente")
+
+    # Salidas del análisis: los campos de ResultadoAnalisis, cada uno una etapa
+    SALIDAS = ResultadoAnalisis.CAMPOS
+
+    # Palabras del turno anterior que se vuelven a procesar en el análisis
+    # incremental; mayor que la locución más larga de las tablas de términos
+    SOLAPE_TOKENS = 8
+
+    def __init__(self, codigo_penal: Optional[CodigoPenal] = None,
+                 max_tipos_analizados: Optional[int] = MAX_TIPOS_ANALIZADOS,
+                 cache: Optional[CacheResultados] = None):
+        """
+        Args:
+            codigo_penal: Código Penal a utilizar. Por defecto, la instancia
+                compartida del registro de conocimiento.
+            max_tipos_analizados: Candidatos (los mejor puntuados) que pasan al
+                análisis de elementos; el resto se ofrecen como alternativas de
+                confianza baja. None analiza todos.
+            cache: Caché de resultados; los hechos ya analizados con el mismo
+                contexto y la misma base de conocimiento no se reanalizan
+        """
+        self.codigo_penal = codigo_penal or obtener_codigo_penal()
+        self._codigo_compartido = self.codigo_penal is obtener_codigo_penal()
+        self.max_tipos_analizados = max_tipos_analizados
+        self.modelo_tipos = ModeloPuntuacionTipos(self.codigo_penal)
+        self.cache = cache
+        self.etapas = self._construir_etapas()
+        self._casos: Dict[str, EstadoCaso] = {}
+
+    def configuracion(self) -> Optional[Tuple]:
+        """
+        Argumentos con los que se reconstruye un analizador equivalente en otro proceso
+
+        None si usa un Código Penal propio (no el del registro), que no puede
+        reconstruirse a partir de sus argumentos.
+        """
+        if not self._codigo_compartido:
+            return None
+        return (("max_tipos_analizados", self.max_tipos_analizados),)
+
+    def _construir_etapas(self) -> GrafoEtapas:
+        """
+        Pasos del análisis como grafo de etapas
+
+        Entradas base: 'hechos' y 'contexto'. Cada campo de ResultadoAnalisis
+        es una etapa; las intermedias son 'documento', 'candidatos',
+        'seleccion' (tipos analizados, tipos descartados), 'clasificacion'
+        (tipo principal, puntuaciones relativas) y 'circunstancias' (atenuantes,
+        agravantes, eximentes).
+        """
+        cp = self.codigo_penal
+        return GrafoEtapas(("hechos", "contexto"), [
+            # Paso 0: Normalizar los hechos una sola vez para todos los pasos
+            Etapa("documento", ("hechos",), DocumentoNormalizado.desde_texto),
+
+            # Paso 1: Identificar tipos penales posibles y preseleccionar los mejor puntuados
+            Etapa("candidatos", ("documento",), self._identificar_tipos_penales),
+            Etapa("seleccion", ("documento", "candidatos"),
+                  lambda documento, candidatos: self._preseleccionar_tipos(
+                      candidatos, lambda: cp.puntuar_tipos(documento))),
+            Etapa("tipos_penales_identificados", ("seleccion",), lambda seleccion: seleccion[0]),
+
+            # Paso 2: Analizar elementos de cada tipo
+            Etapa("analisis_elementos", ("documento", "tipos_penales_identificados", "contexto"),
+                  lambda documento, tipos, contexto: {
+                      tipo.nombre: self._analizar_elementos_tipo(documento, tipo, contexto) for tipo in tipos}),
+
+            # Paso 3: Determinar tipo principal (el que mejor se ajusta)
+            Etapa("clasificacion", ("tipos_penales_identificados", "analisis_elementos"),
+                  self._determinar_tipo_principal),
+            Etapa("tipo_principal", ("clasificacion",), lambda clasificacion: clasificacion[0]),
+            Etapa("puntuacion_relativa_tipos", ("clasificacion",), lambda clasificacion: clasificacion[1]),
+            Etapa("articulos_aplicables", ("tipo_principal", "contexto"),
+                  lambda tipo, contexto: self._seleccionar_articulos(tipo, contexto.get('fecha_hechos'))),
+
+            # Paso 4: Identificar circunstancias modificativas
+            Etapa("circunstancias", ("documento", "contexto"), self._identificar_circunstancias),
+            Etapa("circunstancias_atenuantes", ("circunstancias",), lambda circunstancias: circunstancias[0]),
+            Etapa("circunstancias_agravantes", ("circunstancias",), lambda circunstancias: circunstancias[1]),
+            Etapa("circunstancias_eximentes", ("circunstancias",), lambda circunstancias: circunstancias[2]),
+
+            # Paso 5: Calcular pena estimada
+            Etapa("marco_penal", ("tipo_principal", "circunstancias"),
+                  lambda tipo, circunstancias: self._calcular_marco_penal(tipo, circunstancias[0], circunstancias[1])),
+            Etapa("pena_estimada", ("tipo_principal", "circunstancias", "marco_penal"),
+                  lambda tipo, circunstancias, marco: self._calcular_pena(
+                      tipo, circunstancias[0], circunstancias[1], marco)),
+
+            # Paso 6: Verificar prescripción
+            Etapa("prescripcion", ("tipo_principal", "contexto"),
+                  lambda tipo, contexto: self._verificar_prescripcion(
+                      tipo, contexto.get('fecha_hechos'),
+                      contexto.get('interrupciones', ()), contexto.get('suspensiones', ()))),
+
+            # Paso 7: Generar calificación jurídica
+            Etapa("calificacion_juridica", ("tipo_principal", "circunstancias"),
+                  lambda tipo, circunstancias: self._generar_calificacion_juridica(tipo, *circunstancias)),
+
+            # Paso 8: Generar fundamentación
+            Etapa("fundamentacion", ("hechos", "tipo_principal", "analisis_elementos", "circunstancias"),
+                  lambda hechos, tipo, analisis, circunstancias: self._generar_fundamentacion(
+                      hechos, tipo, analisis, *circunstancias)),
+
+            # Paso 9: Generar advertencias
+            Etapa("advertencias", ("tipo_principal", "analisis_elementos", "contexto"), self._generar_advertencias),
+
+            # Paso 10: Identificar alternativas jurídicas
+            Etapa("alternativas_juridicas", ("seleccion", "tipo_principal"),
+                  lambda seleccion, tipo: self._identificar_alternativas_juridicas(seleccion[0], tipo, seleccion[1])),
+        ])
 
     def analizar_caso(self, hechos: str, contexto: Dict = None) -> ResultadoAnalisis:
         """
@@ -64,270 +429,440 @@ class CaseAnalyzer:
         if contexto is None:
             contexto = {}
 
-        # Paso 1: Identificar tipos penales posibles
-        tipos_identificados = self._identificar_tipos_penales(hechos)
+        clave_cache = None
+        if self.cache is not None:
+            clave_cache = self._clave_cache(hechos, contexto)
+            compacto = self.cache.obtener(clave_cache)
+            if compacto is not None:
+                return self._restaurar_resultado(compacto, hechos, contexto)
 
-        # Paso 2: Analizar elementos de cada tipo
-        analisis_elementos = {}
-        for tipo in tipos_identificados:
-            analisis = self._analizar_elementos_tipo(hechos, tipo, contexto)
-            analisis_elementos[tipo.nombre] = analisis
+        # Todas las etapas del grafo (ver _construir_etapas)
+        resultado = self._resultado(self.preparar_analisis(hechos, contexto))
 
-        # Paso 3: Determinar tipo principal (el que mejor se ajusta)
-        tipo_principal = self._determinar_tipo_principal(tipos_identificados, analisis_elementos)
+        if clave_cache is not None:
+            self._guardar_en_cache(clave_cache, resultado)
+        return resultado
 
-        # Paso 4: Identificar circunstancias modificativas
-        atenuantes = self._identificar_atenuantes(hechos, contexto)
-        agravantes = self._identificar_agravantes(hechos, contexto)
-        eximentes = self._identificar_eximentes(hechos, contexto)
+    def preparar_analisis(self, hechos: str, contexto: Dict = None) -> EjecucionEtapas:
+        """
+        Análisis perezoso de un caso
 
-        # Paso 5: Calcular pena estimada
-        pena_estimada = self._calcular_pena(tipo_principal, atenuantes, agravantes)
+        No calcula nada hasta que se piden salidas (campos de ResultadoAnalisis)
+        con `obtener`; entonces solo se ejecutan las etapas de las que dependen,
+        y los resultados intermedios se memorizan. Con `fijar` se puede cambiar
+        el contexto o imponer otras circunstancias y volver a pedir las salidas:
+        solo se recalculan las etapas afectadas. No usa la caché de resultados.
 
-        # Paso 6: Verificar prescripción
-        prescripcion = self._verificar_prescripcion(tipo_principal, contexto.get('fecha_hechos'))
+        Ejemplo:
+            ejecucion = analizador.preparar_analisis(hechos)
+            ejecucion["pena_estimada"]    # no genera fundamentación ni advertencias
+        """
+        return self.etapas.ejecutar(hechos=hechos, contexto=contexto if contexto is not None else {})
 
-        # Paso 7: Generar calificación jurídica
-        calificacion = self._generar_calificacion_juridica(
-            tipo_principal, atenuantes, agravantes, eximentes
-        )
+    def analizar_salidas(self, hechos: str, contexto: Dict = None,
+                         salidas: Iterable[str] = ("tipo_principal",)) -> Dict[str, Any]:
+        """Solo las salidas pedidas del análisis (nombres de campos de ResultadoAnalisis)"""
+        return self.preparar_analisis(hechos, contexto).obtener(*salidas)
 
-        # Paso 8: Generar fundamentación
-        fundamentacion = self._generar_fundamentacion(
-            hechos, tipo_principal, analisis_elementos, atenuantes, agravantes, eximentes
+    def _resultado(self, ejecucion: EjecucionEtapas) -> ResultadoAnalisis:
+        """ResultadoAnalisis con los datos de la ejecución; los textos se redactan al consultarlos"""
+        return ResultadoAnalisis(
+            **ejecucion.obtener(*ResultadoAnalisis.DATOS),
+            tipos_descartados=ejecucion["seleccion"][1],
+            hechos=ejecucion["hechos"],
+            contexto=ejecucion["contexto"],
+            analizador=self,
         )
 
-        # Paso 9: Generar advertencias
-        advertencias = self._generar_advertencias(
-            tipo_principal, analisis_elementos, contexto
+    def _redactar(self, resultado: ResultadoAnalisis, campo: str):
+        """Redacta un texto del resultado con las etapas del análisis, a partir de sus datos"""
+        ejecucion = self.etapas.ejecutar(hechos=resultado.hechos, contexto=resultado.contexto)
+        ejecucion.fijar("seleccion", (resultado.tipos_penales_identificados, resultado.tipos_descartados))
+        ejecucion.fijar("analisis_elementos", resultado.analisis_elementos)
+        ejecucion.fijar("clasificacion", (resultado.tipo_principal, resultado.puntuacion_relativa_tipos))
+        ejecucion.fijar("circunstancias", (resultado.circunstancias_atenuantes, resultado.circunstancias_agravantes,
+                                           resultado.circunstancias_eximentes))
+        ejecucion.fijar("marco_penal", resultado.marco_penal)
+        return ejecucion[campo]
+
+    def analizar_incremental(self, case_id: str, hechos_nuevos: str, contexto: Dict = None) -> ResultadoAnalisis:
+        """
+        Añade hechos a un caso en curso y analiza el caso completo
+
+        Solo se procesa el fragmento nuevo, precedido de las últimas palabras
+        del anterior por si una locución queda partida entre turnos: sus
+        palabras clave y los términos de elementos y circunstancias se suman
+        al estado del caso. Los tipos y sus elementos, y las circunstancias,
+        solo se recalculan si el fragmento aporta algo a sus entradas, y se
+        imponen a las etapas del caso; de las demás etapas solo se vuelven a
+        ejecutar las que dependen de lo que ha cambiado. Nada de ello depende
+        de la longitud de los hechos. El resultado es el de analizar_caso
+        sobre todos los hechos del caso unidos por saltos de línea.
+
+        Con caché de resultados, el primer fragmento de un caso se busca en
+        ella y se guarda como lo haría analizar_caso; los turnos siguientes
+        no la consultan, pues su clave depende de todos los hechos.
+
+        Args:
+            case_id: Identificador del caso (el del historial de conversación)
+            hechos_nuevos: Hechos añadidos en este turno
+            contexto: Información adicional; si se omite se mantiene la anterior
+
+        Returns:
+            ResultadoAnalisis del caso con todos los hechos recibidos
+        """
+        estado = self._casos.get(case_id)
+        if estado is None:
+            estado = self._casos[case_id] = EstadoCaso()
+        desde_cero = not estado.hechos
+        cambia_contexto = contexto is not None and contexto != estado.contexto
+        if cambia_contexto:
+            estado.contexto = dict(contexto)
+
+        if estado.hechos:
+            estado.hechos = f"{estado.hechos}\n{hechos_nuevos}"
+            fragmento = DocumentoNormalizado.desde_texto(f"{estado.cola}\n{hechos_nuevos}")
+        else:
+            estado.hechos = hechos_nuevos
+            fragmento = DocumentoNormalizado.desde_texto(hechos_nuevos)
+        if len(fragmento.tokens) > self.SOLAPE_TOKENS:
+            estado.cola = fragmento.texto[fragmento.posiciones[-self.SOLAPE_TOKENS][0]:]
+        else:
+            estado.cola = fragmento.texto
+
+        cp = self.codigo_penal
+        palabras_clave = cp.palabras_clave_en(fragmento.texto) - estado.palabras_clave
+        elementos = cp.elementos_presentes(fragmento) - estado.elementos_presentes
+        terminos = cp.detector_circunstancias.terminos_presentes(fragmento) - estado.terminos_circunstancias
+        cobertura_nueva = cp.cubrir_elementos(fragmento, estado.cobertura)
+        dudas_nuevas = not estado.hay_dudas and fragmento.contiene_alguno(self.TERMINOS_DUDA)
+
+        estado.palabras_clave |= palabras_clave
+        estado.elementos_presentes |= elementos
+        estado.terminos_circunstancias |= terminos
+        estado.hay_dudas = estado.hay_dudas or dudas_nuevas
+
+        clave_cache = None
+        if desde_cero and self.cache is not None:
+            clave_cache = self._clave_cache(estado.hechos, estado.contexto)
+            compacto = self.cache.obtener(clave_cache)
+            if compacto is not None:
+                # Las etapas se preparan en el turno siguiente a partir del estado
+                estado.ejecucion = None
+                return self._restaurar_resultado(compacto, estado.hechos, estado.contexto)
+
+        if estado.ejecucion is None:
+            estado.ejecucion = self.preparar_analisis(estado.hechos, estado.contexto)
+        ejecucion = estado.ejecucion
+        ejecucion.fijar("hechos", estado.hechos)
+        ejecucion.fijar("contexto", estado.contexto)
+
+        # Pasos 1 y 2 sobre el estado acumulado
+        if not ejecucion.calculada("seleccion") or palabras_clave or elementos or cobertura_nueva or dudas_nuevas:
+            candidatos = cp.tipos_de_palabras_clave(estado.palabras_clave)
+            identificados, descartados = self._preseleccionar_tipos(
+                candidatos, lambda: cp.puntuar_cobertura(estado.cobertura))
+            ejecucion.fijar("seleccion", (identificados, descartados))
+            ejecucion.fijar("analisis_elementos", {tipo.nombre: self._analizar_elementos_acumulados(tipo, estado)
+                                                   for tipo in identificados})
+
+        # Paso 4 sobre el estado acumulado
+        if not ejecucion.calculada("circunstancias") or terminos or cambia_contexto:
+            claves = cp.detector_circunstancias.evaluar(estado.terminos_circunstancias, estado.contexto)
+            ejecucion.fijar("circunstancias", self._agrupar_circunstancias(claves))
+
+        resultado = self._resultado(ejecucion)
+        if clave_cache is not None:
+            self._guardar_en_cache(clave_cache, resultado)
+        return resultado
+
+    def etapas_caso(self, case_id: str) -> Optional[EjecucionEtapas]:
+        """
+        Etapas del análisis incremental de un caso, para consultar hipótesis
+
+        Conviene trabajar sobre una copia (`derivar`) para no alterar el caso.
+        """
+        estado = self._casos.get(case_id)
+        return estado.ejecucion if estado else None
+
+    def olvidar_caso(self, case_id: str):
+        """Descarta el estado incremental de un caso"""
+        self._casos.pop(case_id, None)
+
+    def _analizar_elementos_acumulados(self, tipo: TipoPenal, estado: EstadoCaso) -> AnalisisElementos:
+        """Como _analizar_elementos_tipo, con los elementos presentes ya localizados en el estado del caso"""
+        elementos = tipo.elementos_objetivos + tipo.elementos_subjetivos
+        ausente = DUDOSO if estado.hay_dudas else AUSENTE
+        estados = {elemento: CONCURRE if elemento in estado.elementos_presentes else ausente
+                   for elemento in elementos}
+        return AnalisisElementos.desde_estados(elementos, estados)
+
+    def _clave_cache(self, hechos: str, contexto: Dict) -> str:
+        """
+        Clave de caché del caso
+
+        Los hechos normalizados, el contexto serializado de forma canónica, el
+        número de candidatos analizados y la fecha de hoy (el estado de la
+        prescripción depende de ella); la caché añade la firma de la base.
+        """
+        return self.cache.clave(
+            normalizar(hechos),
+            json.dumps(contexto, sort_keys=True, ensure_ascii=False, default=str),
+            str(self.max_tipos_analizados),
+            date.today().isoformat(),
         )
 
-        # Paso 10: Identificar alternativas jurídicas
-        alternativas = self._identificar_alternativas_juridicas(
-            tipos_identificados, tipo_principal
+    def _guardar_en_cache(self, clave_cache: str, resultado: ResultadoAnalisis):
+        """Guarda la forma compacta del resultado, si la tiene"""
+        compacto = self._compactar_resultado(resultado)
+        if compacto is not None:
+            self.cache.guardar(clave_cache, compacto)
+
+    def _compactar_resultado(self, resultado: ResultadoAnalisis) -> Optional[Tuple]:
+        """
+        Forma compacta del resultado para la caché
+
+        Tipos y circunstancias se guardan por clave y los elementos como un
+        vector de estados; los textos no se guardan, se redactan al
+        consultarlos. None si el resultado contiene tipos ajenos al Código.
+        """
+        cp = self.codigo_penal
+        tipos = resultado.tipos_penales_identificados
+        circunstancias = (resultado.circunstancias_atenuantes + resultado.circunstancias_agravantes +
+                          resultado.circunstancias_eximentes)
+        claves_tipos = tuple(cp.clave_tipo(tipo) for tipo in tipos)
+        claves_descartados = tuple(cp.clave_tipo(tipo) for tipo in resultado.tipos_descartados)
+        claves_circunstancias = tuple(cp.clave_circunstancia(c) for c in circunstancias)
+        if None in claves_tipos or None in claves_descartados or None in claves_circunstancias:
+            return None
+
+        estados = {}
+        for analisis in resultado.analisis_elementos.values():
+            estados.update(analisis.estados)
+
+        return (
+            claves_tipos,
+            claves_descartados,
+            cp.clave_tipo(resultado.tipo_principal) if resultado.tipo_principal else None,
+            self.modelo_tipos.vector(estados).tobytes(),
+            claves_circunstancias,
+            dict(resultado.prescripcion),
+            tuple(resultado.puntuacion_relativa_tipos.get(tipo.nombre) for tipo in tipos),
         )
 
+    def _restaurar_resultado(self, compacto: Tuple, hechos: str, contexto: Dict) -> ResultadoAnalisis:
+        """Reconstruye un ResultadoAnalisis a partir de su forma compacta"""
+        (claves_tipos, claves_descartados, clave_principal, vector, claves_circunstancias,
+         prescripcion, relativas) = compacto
+        cp = self.codigo_penal
+
+        tipos = [cp.tipos_penales[clave] for clave in claves_tipos]
+        tipo_principal = cp.tipos_penales[clave_principal] if clave_principal else None
+
+        estados = array("b")
+        estados.frombytes(vector)
+        columnas = self.modelo_tipos.columnas
+        analisis_elementos = {}
+        for tipo in tipos:
+            elementos = tipo.elementos_objetivos + tipo.elementos_subjetivos
+            analisis_elementos[tipo.nombre] = AnalisisElementos.desde_estados(
+                elementos, {elemento: estados[columnas[elemento]] for elemento in elementos})
+
+        atenuantes, agravantes, eximentes = self._agrupar_circunstancias(claves_circunstancias)
+
         return ResultadoAnalisis(
-            tipos_penales_identificados=tipos_identificados,
+            tipos_penales_identificados=tipos,
             tipo_principal=tipo_principal,
             analisis_elementos=analisis_elementos,
             circunstancias_atenuantes=atenuantes,
             circunstancias_agravantes=agravantes,
             circunstancias_eximentes=eximentes,
-            pena_estimada=pena_estimada,
-            prescripcion=prescripcion,
-            calificacion_juridica=calificacion,
-            fundamentacion=fundamentacion,
-            advertencias=advertencias,
-            alternativas_juridicas=alternativas
+            marco_penal=self._calcular_marco_penal(tipo_principal, atenuantes, agravantes),
+            prescripcion=dict(prescripcion),
+            articulos_aplicables=self._seleccionar_articulos(tipo_principal, contexto.get('fecha_hechos')),
+            puntuacion_relativa_tipos={tipo.nombre: relativa for tipo, relativa in zip(tipos, relativas)
+                                       if relativa is not None},
+            tipos_descartados=[cp.tipos_penales[clave] for clave in claves_descartados],
+            hechos=hechos,
+            contexto=contexto,
+            analizador=self,
         )
 
-    def _identificar_tipos_penales(self, hechos: str) -> List[TipoPenal]:
+    def _identificar_tipos_penales(self, documento: DocumentoNormalizado) -> List[TipoPenal]:
         """Identifica los tipos penales aplicables según los hechos"""
-        return self.codigo_penal.identificar_tipos_por_palabras_clave(hechos)
+        return self.codigo_penal.identificar_tipos_por_palabras_clave(documento.texto)
 
-    def _analizar_elementos_tipo(self, hechos: str, tipo: TipoPenal,
+    def analizar_lote(self, casos: Iterable[CasoLote], workers: Optional[int] = None,
+                      chunksize: int = 8, ordenado: bool = True,
+                      metricas: Optional[MetricasLote] = None) -> Iterator:
+        """
+        Analiza muchos casos repartiéndolos entre procesos
+
+        Cada proceso trabajador carga la base de conocimiento una sola vez
+        (la instancia compartida del registro) y analiza los casos que recibe
+        en bloques de `chunksize`. Los casos se leen del iterable a medida que
+        se consumen los resultados.
+
+        Args:
+            casos: Hechos, o pares (hechos, contexto)
+            workers: Procesos trabajadores (por defecto, uno por CPU); con 1
+                se analiza en este mismo proceso
+            chunksize: Casos enviados a un trabajador en cada bloque
+            ordenado: Si es True los resultados se entregan en el orden de los
+                casos; si no, según se completan, como pares (índice, resultado)
+            metricas: Se actualiza con el número de casos y el tiempo transcurrido
+
+        Yields:
+            ResultadoAnalisis, o (índice, ResultadoAnalisis) si ordenado es False
+        """
+        workers = workers or os.cpu_count() or 1
+        metricas = metricas if metricas is not None else MetricasLote()
+        metricas.trabajadores = workers
+        inicio = time.perf_counter()
+
+        def entregar(indice, resultado):
+            metricas.casos += 1
+            metricas.segundos = time.perf_counter() - inicio
+            return resultado if ordenado else (indice, resultado)
+
+        if workers == 1:
+            for indice, hechos, contexto in _tareas_lote(casos):
+                yield entregar(indice, self.analizar_caso(hechos, contexto))
+            return
+
+        with Pool(workers, initializer=_inicializar_trabajador,
+                  initargs=(self.max_tipos_analizados,)) as pool:
+            repartir = pool.imap if ordenado else pool.imap_unordered
+            for indice, resultado in repartir(_analizar_en_trabajador, _tareas_lote(casos), chunksize):
+                yield entregar(indice, resultado)
+
+    def _preseleccionar_tipos(self, tipos: List[TipoPenal], puntuar: Callable[[], Dict[str, float]]
+                              ) -> Tuple[List[TipoPenal], List[TipoPenal]]:
+        """
+        Limita el análisis de elementos a los candidatos mejor puntuados
+
+        Args:
+            tipos: Candidatos en orden de identificación
+            puntuar: Devuelve la puntuación rápida de los tipos por clave; solo
+                se llama si hay más candidatos que el límite
+
+        Returns:
+            (tipos a analizar, en su orden original; tipos descartados, de mayor a menor puntuación)
+        """
+        limite = self.max_tipos_analizados
+        if limite is None or len(tipos) <= limite:
+            return tipos, []
+
+        puntuaciones = puntuar()
+        ranking = sorted(range(len(tipos)),
+                         key=lambda i: -puntuaciones.get(self.codigo_penal.clave_tipo(tipos[i]), 0.0))
+        elegidos = set(ranking[:limite])
+        return ([tipo for i, tipo in enumerate(tipos) if i in elegidos],
+                [tipos[i] for i in ranking[limite:]])
+
+    def _analizar_elementos_tipo(self, documento: DocumentoNormalizado, tipo: TipoPenal,
                                  contexto: Dict) -> AnalisisElementos:
         """Analiza si concurren los elementos del tipo penal"""
-        hechos_lower = hechos.lower()
-
-        elementos_concurrentes = []
-        elementos_ausentes = []
-        elementos_dudosos = []
-
-        # Analizar elementos objetivos
-        for elemento in tipo.elementos_objetivos:
-            if self._elemento_presente(elemento, hechos_lower):
-                elementos_concurrentes.append(f"✓ {elemento}")
-            elif self._elemento_posible(elemento, hechos_lower):
-                elementos_dudosos.append(f"? {elemento}")
+        elementos = tipo.elementos_objetivos + tipo.elementos_subjetivos
+        estados = {}
+
+        # Analizar elementos objetivos y subjetivos
+        for elemento in elementos:
+            if self._elemento_presente(elemento, documento):
+                estados[elemento] = CONCURRE
+            elif self._elemento_posible(elemento, documento):
+                estados[elemento] = DUDOSO
             else:
-                elementos_ausentes.append(f"✗ {elemento}")
-
-        # Analizar elementos subjetivos
-        for elemento in tipo.elementos_subjetivos:
-            if self._elemento_presente(elemento, hechos_lower):
-                elementos_concurrentes.append(f"✓ {elemento}")
-            elif self._elemento_posible(elemento, hechos_lower):
-                elementos_dudosos.append(f"? {elemento}")
-            else:
-                elementos_ausentes.append(f"✗ {elemento}")
+                estados[elemento] = AUSENTE
 
-        # Determinar conclusión
-        if not elementos_ausentes and not elementos_dudosos:
-            conclusion = "Tipo completo - Todos los elementos concurren"
-        elif elementos_ausentes:
-            conclusion = f"Tipo incompleto - Faltan elementos: {len(elementos_ausentes)}"
-        else:
-            conclusion = f"Tipo probable - Elementos dudosos: {len(elementos_dudosos)}"
+        return AnalisisElementos.desde_estados(elementos, estados)
 
-        return AnalisisElementos(
-            elementos_concurrentes=elementos_concurrentes,
-            elementos_ausentes=elementos_ausentes,
-            elementos_dudosos=elementos_dudosos,
-            conclusion=conclusion
-        )
-
-    def _elemento_presente(self, elemento: str, hechos: str) -> bool:
+    def _elemento_presente(self, elemento: str, documento: DocumentoNormalizado) -> bool:
         """Verifica si un elemento está claramente presente en los hechos"""
         # Lógica simplificada - en producción sería NLP avanzado
-        elemento_lower = elemento.lower()
-
-        # Mapeo de elementos a palabras clave
-        keywords = {
-            "conducta: matar": ["matar", "muerte", "fallecer", "morir", "acabar con la vida"],
-            "dolo": ["intencion", "voluntad", "querer", "proposito", "deliberad"],
-            "ánimo de lucro": ["lucro", "dinero", "beneficio", "vender", "ganar", "enriquec"],
-            "engaño": ["engaño", "mentira", "falso", "fraudulent", "ardid", "trampa"],
-            "violencia": ["violencia", "golpe", "agresi", "fuerza física"],
-            "intimidacion": ["amenaza", "intimidar", "miedo", "coaccion"],
-            "sin consentimiento": ["sin consentimiento", "en contra de su voluntad", "negativa", "rechazar"],
-        }
+        return self.codigo_penal.terminos_elemento(elemento).presente_en(documento)
 
-        # Buscar palabras clave del elemento en los hechos
-        for key, words in keywords.items():
-            if key in elemento_lower:
-                return any(word in hechos for word in words)
-
-        # Búsqueda genérica
-        palabras_elemento = elemento_lower.split()
-        return any(palabra in hechos for palabra in palabras_elemento if len(palabra) > 3)
-
-    def _elemento_posible(self, elemento: str, hechos: str) -> bool:
+    def _elemento_posible(self, elemento: str, documento: DocumentoNormalizado) -> bool:
         """Verifica si un elemento es posible pero no está claramente expresado"""
         # Lógica para elementos que pueden inferirse
-        return "posible" in hechos or "probablemente" in hechos
+        return documento.contiene_alguno(self.TERMINOS_DUDA)
+
+    def _determinar_tipo_principal(self, tipos: List[TipoPenal], analisis: Dict[str, AnalisisElementos]
+                                   ) -> Tuple[Optional[TipoPenal], Dict[str, float]]:
+        """
+        Determina cuál es el tipo penal principal del caso
 
-    def _determinar_tipo_principal(self, tipos: List[TipoPenal],
-                                   analisis: Dict[str, AnalisisElementos]) -> Optional[TipoPenal]:
-        """Determina cuál es el tipo penal principal del caso"""
+        Returns:
+            (tipo principal, puntuación relativa de cada candidato por nombre del
+            tipo; ver ModeloPuntuacionTipos.puntuaciones_relativas)
+        """
         if not tipos:
-            return None
+            return None, {}
+
+        estados = {}
+        for tipo in tipos:
+            estados.update(analisis[tipo.nombre].estados)
+        claves = [self.codigo_penal.clave_tipo(tipo) for tipo in tipos]
+        puntuaciones = self.modelo_tipos.puntuar(estados, [c for c in claves if c])
+
+        # A igual puntuación prevalece el orden de identificación
+        puntuacion = {tipo.nombre: puntuaciones.get(clave, float("-inf")) for tipo, clave in zip(tipos, claves)}
+        tipo_principal = max(tipos, key=lambda t: puntuacion[t.nombre])
+
+        relativas = self.modelo_tipos.puntuaciones_relativas(puntuaciones)
+        return tipo_principal, {tipo.nombre: relativas[clave] for tipo, clave in zip(tipos, claves)
+                                if clave in relativas}
+
+    def _seleccionar_articulos(self, tipo: Optional[TipoPenal],
+                               fecha_hechos: Optional[str]) -> Dict[str, ArticuloCP]:
+        """Redacción de los artículos del tipo vigente a la fecha de los hechos (o la actual)"""
+        articulos = {}
+        if not tipo:
+            return articulos
+
+        for referencia in tipo.articulos:
+            numero = referencia.split(".")[0]
+            articulo = None
+            if fecha_hechos:
+                articulo = self.codigo_penal.buscar_articulo(numero, fecha=fecha_hechos)
+            articulo = articulo or self.codigo_penal.buscar_articulo(numero)
+            if articulo:
+                articulos[numero] = articulo
+        return articulos
+
+    def _identificar_circunstancias(self, documento: DocumentoNormalizado, contexto: Dict
+                                    ) -> Tuple[List[CircunstanciaModificativa], ...]:
+        """
+        Identifica las circunstancias modificativas con las reglas del Código Penal
 
-        # Ordenar por número de elementos concurrentes
-        tipos_ordenados = sorted(
-            tipos,
-            key=lambda t: len(analisis[t.nombre].elementos_concurrentes) -
-                         len(analisis[t.nombre].elementos_ausentes),
-            reverse=True
+        Returns:
+            (atenuantes, agravantes, eximentes)
+        """
+        return self._agrupar_circunstancias(self.codigo_penal.detector_circunstancias.detectar(documento, contexto))
+
+    def _agrupar_circunstancias(self, claves: Iterable[str]) -> Tuple[List[CircunstanciaModificativa], ...]:
+        """Circunstancias por clave, agrupadas en (atenuantes, agravantes, eximentes)"""
+        por_tipo = {"atenuante": [], "agravante": [], "eximente": []}
+        for clave in claves:
+            circunstancia = self.codigo_penal.buscar_circunstancia(clave)
+            if circunstancia and circunstancia.tipo in por_tipo:
+                por_tipo[circunstancia.tipo].append(circunstancia)
+        return por_tipo["atenuante"], por_tipo["agravante"], por_tipo["eximente"]
+
+    def _calcular_marco_penal(self, tipo: Optional[TipoPenal], atenuantes: List,
+                              agravantes: List) -> Optional[PenaCalculada]:
+        """Marcos penales resultantes de aplicar las circunstancias al tipo (arts. 66 y ss.)"""
+        if not tipo:
+            return None
+        return self.codigo_penal.calcular_marco_penal(
+            self.codigo_penal.clave_tipo(tipo) or "",
+            [self.codigo_penal.clave_circunstancia(at) for at in atenuantes],
+            [self.codigo_penal.clave_circunstancia(ag) for ag in agravantes],
         )
 
-        return tipos_ordenados[0] if tipos_ordenados else None
-
-    def _identificar_atenuantes(self, hechos: str, contexto: Dict) -> List[CircunstanciaModificativa]:
-        """Identifica circunstancias atenuantes"""
-        atenuantes = []
-        hechos_lower = hechos.lower()
-
-        # Arrebato/obcecación
-        if any(word in hechos_lower for word in ["arrebato", "obcecacion", "ira", "calentura", "impulso"]):
-            atenuante = self.codigo_penal.buscar_circunstancia("atenuante_arrebato")
-            if atenuante:
-                atenuantes.append(atenuante)
-
-        # Confesión
-        if any(word in hechos_lower for word in ["confesar", "confesion", "reconocer", "admitir"]):
-            atenuante = self.codigo_penal.buscar_circunstancia("atenuante_confesion")
-            if atenuante:
-                atenuantes.append(atenuante)
-
-        # Reparación
-        if any(word in hechos_lower for word in ["reparar", "reparacion", "devolver", "indemnizar", "pagar"]):
-            atenuante = self.codigo_penal.buscar_circunstancia("atenuante_reparacion")
-            if atenuante:
-                atenuantes.append(atenuante)
-
-        # Adicción
-        if any(word in hechos_lower for word in ["adiccion", "drogadicto", "alcoholico", "dependencia"]):
-            atenuante = self.codigo_penal.buscar_circunstancia("atenuante_adiccion")
-            if atenuante:
-                atenuantes.append(atenuante)
-
-        return atenuantes
-
-    def _identificar_agravantes(self, hechos: str, contexto: Dict) -> List[CircunstanciaModificativa]:
-        """Identifica circunstancias agravantes"""
-        agravantes = []
-        hechos_lower = hechos.lower()
-
-        # Alevosía
-        if any(word in hechos_lower for word in ["alevosia", "sorpresa", "indefens", "dormid", "espalda"]):
-            agravante = self.codigo_penal.buscar_circunstancia("agravante_alevosa")
-            if agravante:
-                agravantes.append(agravante)
-
-        # Ensañamiento
-        if any(word in hechos_lower for word in ["ensañamiento", "sadismo", "crueldad", "tortura", "sufrimiento"]):
-            agravante = self.codigo_penal.buscar_circunstancia("agravante_ensanamiento")
-            if agravante:
-                agravantes.append(agravante)
-
-        # Precio/recompensa
-        if any(word in hechos_lower for word in ["precio", "recompensa", "pago", "contrato", "sicario"]):
-            agravante = self.codigo_penal.buscar_circunstancia("agravante_precio")
-            if agravante:
-                agravantes.append(agravante)
-
-        # Abuso de superioridad
-        if any(word in hechos_lower for word in ["varios", "grupo", "superioridad", "indefens"]):
-            agravante = self.codigo_penal.buscar_circunstancia("agravante_abuso_superioridad")
-            if agravante:
-                agravantes.append(agravante)
-
-        # Discriminación
-        if any(word in hechos_lower for word in ["racista", "xenofob", "homofob", "machista", "discrimin"]):
-            agravante = self.codigo_penal.buscar_circunstancia("agravante_discriminacion")
-            if agravante:
-                agravantes.append(agravante)
-
-        # Abuso de confianza
-        if any(word in hechos_lower for word in ["confianza", "amigo", "familiar", "empleado"]):
-            agravante = self.codigo_penal.buscar_circunstancia("agravante_abuso_confianza")
-            if agravante:
-                agravantes.append(agravante)
-
-        # Reincidencia
-        if contexto.get("antecedentes") or "antecedentes" in hechos_lower:
-            agravante = self.codigo_penal.buscar_circunstancia("agravante_reincidencia")
-            if agravante:
-                agravantes.append(agravante)
-
-        return agravantes
-
-    def _identificar_eximentes(self, hechos: str, contexto: Dict) -> List[CircunstanciaModificativa]:
-        """Identifica circunstancias eximentes"""
-        eximentes = []
-        hechos_lower = hechos.lower()
-
-        # Legítima defensa
-        if any(word in hechos_lower for word in ["defensa", "defender", "agresi", "atacar", "repeler"]):
-            if "legitima defensa" in hechos_lower or ("agresi" in hechos_lower and "defens" in hechos_lower):
-                eximente = self.codigo_penal.buscar_circunstancia("eximente_legitima_defensa")
-                if eximente:
-                    eximentes.append(eximente)
-
-        # Anomalía psíquica
-        if any(word in hechos_lower for word in ["esquizofrenia", "psicosis", "trastorno mental", "demencia", "incapaz"]):
-            eximente = self.codigo_penal.buscar_circunstancia("eximente_anomalia_psiquica")
-            if eximente:
-                eximentes.append(eximente)
-
-        # Estado de necesidad
-        if any(word in hechos_lower for word in ["necesidad", "evitar mal", "hambre extrema"]):
-            eximente = self.codigo_penal.buscar_circunstancia("eximente_estado_necesidad")
-            if eximente:
-                eximentes.append(eximente)
-
-        # Miedo insuperable
-        if any(word in hechos_lower for word in ["miedo insuperable", "terror", "amenaza grave"]):
-            eximente = self.codigo_penal.buscar_circunstancia("eximente_miedo_insuperable")
-            if eximente:
-                eximentes.append(eximente)
-
-        return eximentes
-
-    def _calcular_pena(self, tipo: Optional[TipoPenal], atenuantes: List, agravantes: List) -> str:
-        """Calcula la pena estimada"""
+    def _calcular_pena(self, tipo: Optional[TipoPenal], atenuantes: List, agravantes: List,
+                       calculada: Optional[PenaCalculada]) -> str:
+        """Redacta la pena estimada a partir del marco penal calculado"""
         if not tipo:
             return "No se puede calcular pena sin tipo penal principal"
 
@@ -337,24 +872,39 @@ class CaseAnalyzer:
             pena += f"\n**Con {len(atenuantes)} atenuante(s):**\n"
             for at in atenuantes:
                 pena += f"  - {at.nombre}: {at.efectos}\n"
-            pena += "  → Probable rebaja de pena en grado inferior\n"
 
         if agravantes:
             pena += f"\n**Con {len(agravantes)} agravante(s):**\n"
             for ag in agravantes:
                 pena += f"  - {ag.nombre}: {ag.efectos}\n"
-            pena += "  → Posible agravación según art. 66 CP\n"
+
+        if calculada and calculada.marcos:
+            pena += "\n**Marco penal resultante:**\n"
+            for marco in calculada.marcos:
+                pena += f"  - {marco.describir().capitalize()}\n"
+            for regla in calculada.reglas:
+                pena += f"  → {regla}\n"
 
         pena += f"\n**Gravedad del delito:** {tipo.gravedad}"
 
         return pena
 
-    def _verificar_prescripcion(self, tipo: Optional[TipoPenal], fecha_hechos: Optional[str]) -> Dict[str, str]:
-        """Verifica si el delito o la pena han prescrito"""
+    def _verificar_prescripcion(self, tipo: Optional[TipoPenal], fecha_hechos: Optional[str],
+                                interrupciones=(), suspensiones=()) -> Dict[str, str]:
+        """
+        Verifica si el delito ha prescrito
+
+        Args:
+            tipo: Tipo penal principal
+            fecha_hechos: Fecha de los hechos (DD/MM/AAAA)
+            interrupciones: Fechas desde las que se reinicia el cómputo (art. 132.2)
+            suspensiones: Periodos (inicio, fin) que no computan
+        """
         if not tipo:
             return {"estado": "No aplicable - sin tipo penal"}
 
-        prescripcion_info = self.codigo_penal.get_prescripcion(tipo.nombre.lower())
+        clave = self.codigo_penal.clave_tipo(tipo) or ""
+        prescripcion_info = self.codigo_penal.get_prescripcion(clave)
 
         if not fecha_hechos:
             return {
@@ -363,13 +913,27 @@ class CaseAnalyzer:
                 "estado": "No se puede calcular sin fecha de los hechos"
             }
 
-        # Aquí iría lógica de cálculo de fechas (simplificado)
-        return {
+        resultado = self.codigo_penal.calcular_prescripcion(clave, fecha_hechos, interrupciones, suspensiones)
+        if resultado is None:
+            return {
+                "delito": prescripcion_info.get("prescripcion_delito", "No determinado"),
+                "pena": prescripcion_info.get("prescripcion_pena", "No determinado"),
+                "estado": "Fecha de los hechos no válida (use DD/MM/AAAA)",
+                "fecha_hechos": fecha_hechos
+            }
+
+        verificacion = {
             "delito": prescripcion_info.get("prescripcion_delito", "No determinado"),
             "pena": prescripcion_info.get("prescripcion_pena", "No determinado"),
-            "estado": "Requiere cálculo preciso con fecha exacta",
-            "fecha_hechos": fecha_hechos
+            "estado": resultado.estado,
+            "fecha_hechos": fecha_hechos,
+            "fecha_prescripcion": resultado.describir_fecha()
         }
+        if resultado.inicio_computo != prescripcion.interpretar_fecha(fecha_hechos):
+            verificacion["inicio_computo"] = resultado.inicio_computo.strftime("%d/%m/%Y")
+        if resultado.dias_suspendidos:
+            verificacion["dias_suspendidos"] = str(resultado.dias_suspendidos)
+        return verificacion
 
     def _generar_calificacion_juridica(self, tipo: Optional[TipoPenal],
                                        atenuantes: List, agravantes: List,
@@ -492,13 +1056,25 @@ class CaseAnalyzer:
             if not contexto.get('fecha_hechos'):
                 advertencias.append("⚠️ Para verificar prescripción, es necesario indicar la fecha de los hechos")
 
+            # Sucesión de leyes penales
+            else:
+                for numero in dict.fromkeys(ref.split(".")[0] for ref in tipo.articulos):
+                    if self.codigo_penal.redaccion_modificada_desde(numero, contexto['fecha_hechos']):
+                        actual = self.codigo_penal.buscar_articulo(numero)
+                        advertencias.append(
+                            f"⚠️ El art. {numero} CP ha sido modificado desde la fecha de los hechos "
+                            f"({actual.ultima_modificacion or 'nueva redacción'}): aplique la ley más "
+                            f"favorable al reo (art. 2.2 CP)"
+                        )
+
         # Advertencias procedimentales
         advertencias.append("⚠️ Consulte los plazos procesales aplicables en su caso concreto")
 
         return advertencias
 
     def _identificar_alternativas_juridicas(self, tipos: List[TipoPenal],
-                                            tipo_principal: Optional[TipoPenal]) -> List[str]:
+                                            tipo_principal: Optional[TipoPenal],
+                                            descartados: List[TipoPenal] = ()) -> List[str]:
         """Identifica calificaciones jurídicas alternativas"""
         alternativas = []
 
@@ -513,6 +1089,13 @@ class CaseAnalyzer:
                     f"(arts. {', '.join(tipo.articulos)} CP) - {tipo.bien_juridico}"
                 )
 
+        # Candidatos no analizados en detalle por su baja puntuación
+        for tipo in descartados:
+            alternativas.append(
+                f"Calificación alternativa de confianza baja (elementos no analizados) como "
+                f"**{tipo.nombre}** (arts. {', '.join(tipo.articulos)} CP) - {tipo.bien_juridico}"
+            )
+
         # Alternativas por grados de ejecución
         alternativas.append("Valorar posible tentativa (art. 16 CP) si el delito no se consumó")
         alternativas.append("Valorar participación como cómplice o cooperador necesario (arts. 27-29 CP)")
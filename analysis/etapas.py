@@ -0,0 +1,173 @@
+"""
+Grafo de Etapas del Análisis
+Etapas con nombre y entradas declaradas, calculadas bajo demanda y memorizadas
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+
+@dataclass(frozen=True)
+class Etapa:
+    """Paso del análisis: una función de los valores de sus entradas (entradas base u otras etapas)"""
+    nombre: str
+    entradas: Tuple[str, ...]
+    funcion: Callable[..., Any]
+
+
+class GrafoEtapas:
+    """
+    Grafo acíclico de etapas
+
+    Cada etapa declara las entradas que necesita; el grafo valida que todas
+    existan y que no haya ciclos, y sabe qué etapas dependen de cada valor.
+    """
+
+    def __init__(self, entradas: Iterable[str], etapas: Iterable[Etapa]):
+        self.entradas: FrozenSet[str] = frozenset(entradas)
+        self.etapas: Dict[str, Etapa] = {}
+        for etapa in etapas:
+            if etapa.nombre in self.etapas or etapa.nombre in self.entradas:
+                raise ValueError(f"Etapa duplicada: '{etapa.nombre}'")
+            self.etapas[etapa.nombre] = etapa
+
+        self._dependientes: Dict[str, List[str]] = {nombre: [] for nombre in self.entradas | set(self.etapas)}
+        for etapa in self.etapas.values():
+            for entrada in etapa.entradas:
+                if entrada not in self._dependientes:
+                    raise ValueError(f"La etapa '{etapa.nombre}' depende de '{entrada}', que no existe")
+                self._dependientes[entrada].append(etapa.nombre)
+
+        self.orden: List[str] = self._ordenar()
+
+    def _ordenar(self) -> List[str]:
+        """Orden topológico de las etapas; ValueError si hay un ciclo"""
+        orden, estado = [], {}
+
+        def visitar(nombre, camino):
+            if estado.get(nombre) == "hecho" or nombre in self.entradas:
+                return
+            if estado.get(nombre) == "visitando":
+                raise ValueError("Ciclo entre etapas: " + " -> ".join(camino + [nombre]))
+            estado[nombre] = "visitando"
+            for entrada in self.etapas[nombre].entradas:
+                visitar(entrada, camino + [nombre])
+            estado[nombre] = "hecho"
+            orden.append(nombre)
+
+        for nombre in self.etapas:
+            visitar(nombre, [])
+        return orden
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self._dependientes
+
+    def dependientes(self, nombre: str) -> List[str]:
+        """Etapas que usan directamente el valor indicado"""
+        return self._dependientes[nombre]
+
+    def ejecutar(self, **entradas) -> "EjecucionEtapas":
+        """Ejecución del grafo con los valores de las entradas base; no calcula nada todavía"""
+        return EjecucionEtapas(self, entradas)
+
+
+class EjecucionEtapas:
+    """
+    Valores de las etapas para unas entradas concretas
+
+    Una etapa se calcula la primera vez que se pide (ella o una salida que
+    depende de ella) y su valor se memoriza. `fijar` cambia una entrada base
+    o impone el valor de una etapa y descarta solo los valores que dependen
+    de él, de modo que la siguiente consulta recalcula únicamente las etapas
+    afectadas. Una etapa fijada conserva su valor aunque cambien sus entradas.
+    """
+
+    def __init__(self, grafo: GrafoEtapas, entradas: Dict[str, Any]):
+        desconocidas = set(entradas) - grafo.entradas
+        if desconocidas:
+            raise ValueError(f"Entradas desconocidas: {', '.join(sorted(desconocidas))}")
+        self.grafo = grafo
+        self._valores: Dict[str, Any] = dict(entradas)
+        self._fijadas: Set[str] = set()
+        # Veces que se ha calculado cada etapa (para medir lo que se reutiliza)
+        self.calculos: Dict[str, int] = {}
+
+    def __getitem__(self, nombre: str) -> Any:
+        if nombre not in self._valores:
+            if nombre not in self.grafo:
+                raise KeyError(nombre)
+            for etapa in self._pendientes(nombre):
+                definicion = self.grafo.etapas[etapa]
+                self._valores[etapa] = definicion.funcion(*(self._valores[e] for e in definicion.entradas))
+                self.calculos[etapa] = self.calculos.get(etapa, 0) + 1
+        return self._valores[nombre]
+
+    def _pendientes(self, nombre: str) -> List[str]:
+        """Etapas sin valor de las que depende `nombre` (incluida), en orden de cálculo"""
+        pendientes, visitadas = [], set()
+
+        def visitar(actual):
+            if actual in visitadas or actual in self._valores:
+                return
+            visitadas.add(actual)
+            if actual not in self.grafo.etapas:
+                raise KeyError(f"Falta la entrada '{actual}'")
+            for entrada in self.grafo.etapas[actual].entradas:
+                visitar(entrada)
+            pendientes.append(actual)
+
+        visitar(nombre)
+        return pendientes
+
+    def obtener(self, *salidas: str) -> Dict[str, Any]:
+        """Valores de las salidas pedidas; solo se calculan las etapas de las que dependen"""
+        return {salida: self[salida] for salida in salidas}
+
+    def calculada(self, nombre: str) -> bool:
+        """Si el valor está disponible sin calcular nada"""
+        return nombre in self._valores
+
+    def fijar(self, nombre: str, valor: Any):
+        """
+        Cambia una entrada base o impone el valor de una etapa
+
+        Se descartan los valores de las etapas que dependen de ella (salvo las
+        fijadas, que bloquean la propagación). Volver a fijar el mismo objeto
+        no descarta nada.
+        """
+        if nombre not in self.grafo:
+            raise KeyError(nombre)
+        if nombre in self.grafo.etapas:
+            self._fijadas.add(nombre)
+        if nombre in self._valores and self._valores[nombre] is valor:
+            return
+        self._valores[nombre] = valor
+        self._invalidar(nombre)
+
+    def liberar(self, nombre: str):
+        """Deja de imponer el valor de una etapa; se recalculará desde sus entradas"""
+        if nombre in self._fijadas:
+            self._fijadas.discard(nombre)
+            self._valores.pop(nombre, None)
+            self._invalidar(nombre)
+
+    def _invalidar(self, nombre: str):
+        pendientes = list(self.grafo.dependientes(nombre))
+        while pendientes:
+            dependiente = pendientes.pop()
+            if dependiente in self._fijadas or dependiente not in self._valores:
+                continue
+            del self._valores[dependiente]
+            pendientes.extend(self.grafo.dependientes(dependiente))
+
+    def derivar(self) -> "EjecucionEtapas":
+        """
+        Copia independiente que comparte los valores ya calculados
+
+        Sirve para plantear hipótesis (otra combinación de circunstancias,
+        otro contexto) sin alterar la ejecución original.
+        """
+        copia = EjecucionEtapas(self.grafo, {})
+        copia._valores = dict(self._valores)
+        copia._fijadas = set(self._fijadas)
+        return copia
@@ -0,0 +1,148 @@
+"""
+Puntuación de Tipos Penales
+Matriz tipos x elementos con pesos de cobertura, especialidad y gravedad
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.codigo_penal import CodigoPenal
+from knowledge.penas import PRISION
+
+
+# Estado de un elemento del tipo en los hechos
+CONCURRE = 1
+DUDOSO = 0
+AUSENTE = -1
+
+EstadosElementos = Dict[str, int]
+
+
+class ModeloPuntuacionTipos:
+    """
+    Puntuación lineal de los tipos penales a partir del estado de sus elementos
+
+    La matriz indicadora tipos x elementos se guarda por filas en arrays
+    compactos (CSR): cada fila contiene las columnas de los elementos del tipo.
+    Un caso es un vector de estados por elemento (CONCURRE, DUDOSO, AUSENTE) y
+    su puntuación es un producto matriz-vector ponderado:
+
+        cobertura    elementos concurrentes / elementos del tipo
+        ausencias    elementos ausentes / elementos del tipo (resta)
+        especialidad elementos concurrentes / máximo de elementos de un tipo;
+                     favorece al tipo especial que contiene al genérico
+                     (asesinato frente a homicidio, art. 8.1ª CP)
+        gravedad     logaritmo del máximo de prisión, normalizado; desempata
+                     a favor del precepto más grave (art. 8.4ª CP)
+
+    El peso relativo de cada candidato se obtiene con una softmax de
+    temperatura fija sobre sus puntuaciones. No es una probabilidad calibrada:
+    los pesos y la temperatura son una escala elegida a mano, sin ajustar
+    sobre casos anotados, y solo indican cuánto se distancia cada candidato
+    de los demás. La misma matriz sirve para puntuar lotes de casos sin
+    reconstruirla.
+    """
+
+    PESO_COBERTURA = 1.0
+    PESO_AUSENCIAS = 0.5
+    PESO_ESPECIALIDAD = 0.5
+    PESO_GRAVEDAD = 0.25
+    # Escala de la softmax: una diferencia de puntuación de 0.15 multiplica por e
+    # el peso relativo. Fijada a mano; no procede de un ajuste sobre casos anotados
+    TEMPERATURA = 0.15
+
+    def __init__(self, codigo_penal: CodigoPenal):
+        self.claves: List[str] = []
+        self.columnas: Dict[str, int] = {}
+        self._fila_de: Dict[str, int] = {}
+        self._inicio = array("l", [0])
+        self._columna = array("i")
+
+        prisiones = []
+        for clave, tipo in codigo_penal.tipos_penales.items():
+            self._fila_de[clave] = len(self.claves)
+            self.claves.append(clave)
+            for elemento in tipo.elementos_objetivos + tipo.elementos_subjetivos:
+                self._columna.append(self.columnas.setdefault(elemento, len(self.columnas)))
+            self._inicio.append(len(self._columna))
+
+            marcos = codigo_penal.marcos_penales.get(clave, ())
+            prisiones.append(max((m.maximo for m in marcos if m.clase == PRISION), default=0))
+
+        escala = math.log1p(max(prisiones, default=0)) or 1.0
+        self._gravedad = array("d", (math.log1p(dias) / escala for dias in prisiones))
+        self._max_elementos = max((self._inicio[f + 1] - self._inicio[f] for f in range(len(self.claves))),
+                                  default=0) or 1
+
+    def vector(self, estados: EstadosElementos) -> array:
+        """Vector de estados por columna; los elementos no evaluados cuentan como ausentes"""
+        vector = array("b", [AUSENTE]) * len(self.columnas)
+        for elemento, estado in estados.items():
+            columna = self.columnas.get(elemento)
+            if columna is not None:
+                vector[columna] = estado
+        return vector
+
+    def _puntuar_vector(self, vector: Sequence[int], filas: Sequence[int]) -> List[float]:
+        """Producto ponderado de las filas indicadas por el vector de estados"""
+        inicio, columna, gravedad = self._inicio, self._columna, self._gravedad
+        puntuaciones = []
+        for fila in filas:
+            desde, hasta = inicio[fila], inicio[fila + 1]
+            total = (hasta - desde) or 1
+            concurrentes = ausentes = 0
+            for posicion in range(desde, hasta):
+                estado = vector[columna[posicion]]
+                if estado == CONCURRE:
+                    concurrentes += 1
+                elif estado == AUSENTE:
+                    ausentes += 1
+            puntuaciones.append(
+                self.PESO_COBERTURA * concurrentes / total
+                - self.PESO_AUSENCIAS * ausentes / total
+                + self.PESO_ESPECIALIDAD * concurrentes / self._max_elementos
+                + self.PESO_GRAVEDAD * gravedad[fila]
+            )
+        return puntuaciones
+
+    def _filas(self, claves: Optional[Iterable[str]]) -> List[int]:
+        if claves is None:
+            return list(range(len(self.claves)))
+        return [self._fila_de[clave] for clave in claves if clave in self._fila_de]
+
+    def puntuar(self, estados: EstadosElementos, claves: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Puntuación de los tipos para un caso
+
+        Args:
+            estados: Estado de cada elemento (por su descripción)
+            claves: Tipos candidatos; por defecto, todos
+        """
+        filas = self._filas(claves)
+        return dict(zip((self.claves[f] for f in filas), self._puntuar_vector(self.vector(estados), filas)))
+
+    def puntuar_lote(self, lote: Iterable[EstadosElementos],
+                     claves: Optional[Iterable[str]] = None) -> List[Dict[str, float]]:
+        """Puntuación de muchos casos sobre la misma matriz"""
+        filas = self._filas(claves)
+        nombres = [self.claves[f] for f in filas]
+        return [dict(zip(nombres, self._puntuar_vector(self.vector(estados), filas))) for estados in lote]
+
+    def puntuaciones_relativas(self, puntuaciones: Dict[str, float]) -> Dict[str, float]:
+        """
+        Puntuación relativa de cada candidato (softmax de las puntuaciones; suman 1)
+
+        Ordena los candidatos y mide su distancia, pero no es la probabilidad
+        de que la calificación sea correcta (ver TEMPERATURA).
+        """
+        if not puntuaciones:
+            return {}
+        maxima = max(puntuaciones.values())
+        pesos = {clave: math.exp((p - maxima) / self.TEMPERATURA) for clave, p in puntuaciones.items()}
+        total = sum(pesos.values())
+        return {clave: peso / total for clave, peso in pesos.items()}
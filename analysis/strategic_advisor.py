@@ -3,9 +3,11 @@ Asesor Estratégico Procesal
 Proporciona recomendaciones sobre estrategia de defensa y acusación
 """
 
-from typing import List, Dict, Tuple
+from typing import Iterable, List, Dict, Tuple
 from dataclasses import dataclass
 
+from knowledge.penas import TablaEscenariosPena
+
 
 @dataclass
 class RecomendacionEstrategica:
@@ -157,6 +159,49 @@ class StrategicAdvisor:
 
         return recomendaciones
 
+    # Atenuantes posteriores al delito que la defensa aún puede provocar (art. 21.4ª y 5ª)
+    ATENUANTES_POSTDELICTUALES = ["atenuante_confesion", "atenuante_reparacion"]
+
+    def interpretar_escenarios_pena(self, tabla: TablaEscenariosPena, apreciadas: Iterable[str],
+                                    nombres: Dict[str, str] = None) -> List[str]:
+        """
+        Resume una tabla de escenarios de pena para la estrategia
+
+        Args:
+            tabla: Escenarios calculados por CodigoPenal.escenarios_pena
+            apreciadas: Claves de las circunstancias apreciadas en el análisis
+            nombres: Nombre a mostrar por clave de circunstancia
+
+        Returns:
+            Conclusiones: escenarios extremos y efecto de acreditar o excluir
+            cada circunstancia candidata respecto de la situación actual
+        """
+        nombres = nombres or {}
+
+        def describir(mascara):
+            claves = tabla.circunstancias_de(mascara)
+            circunstancias = ", ".join(nombres.get(c, c) for c in claves) or "sin circunstancias"
+            return f"{circunstancias} → {tabla.pena(mascara).describir()}"
+
+        actual = tabla.mascara(apreciadas)
+        favorable, gravoso = tabla.extremos()
+        conclusiones = [
+            f"Situación actual: {describir(actual)}",
+            f"Escenario más favorable: {describir(favorable)}",
+            f"Escenario más gravoso: {describir(gravoso)}",
+        ]
+
+        for bit, clave in enumerate(tabla.circunstancias):
+            alternativa = actual ^ (1 << bit)
+            if tabla.indices[alternativa] == tabla.indices[actual]:
+                continue
+            verbo = "Excluir" if actual >> bit & 1 else "Acreditar"
+            conclusiones.append(
+                f"{verbo} {nombres.get(clave, clave)}: {tabla.pena(alternativa).describir()}"
+            )
+
+        return conclusiones
+
     def recomendar_estrategia_acusacion(self, analisis_caso: Dict) -> List[RecomendacionEstrategica]:
         """Recomienda estrategia de acusación"""
         recomendaciones = []
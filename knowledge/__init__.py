@@ -6,5 +6,9 @@ Gestión de base de datos legal española (Código Penal, LECrim, Jurisprudencia
 from .codigo_penal import CodigoPenal
 from .jurisprudencia import Jurisprudencia
 from .lecrim import LECrim
+from .registro import obtener_codigo_penal, obtener_jurisprudencia, obtener_lecrim
 
-__all__ = ['CodigoPenal', 'Jurisprudencia', 'LECrim']
+__all__ = [
+    'CodigoPenal', 'Jurisprudencia', 'LECrim',
+    'obtener_codigo_penal', 'obtener_jurisprudencia', 'obtener_lecrim'
+]
@@ -0,0 +1,13 @@
+"""
+Paso de construcción de la Base de Conocimiento
+Genera el snapshot precompilado: python -m knowledge [ruta_snapshot]
+"""
+
+import sys
+
+from .snapshot import construir_snapshot
+
+
+if __name__ == "__main__":
+    destino = construir_snapshot(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"✓ Snapshot de la base de conocimiento generado: {destino}")
@@ -0,0 +1,133 @@
+"""
+Almacén de Textos Mapeado en Memoria
+Guarda los textos largos de la base de conocimiento en un único fichero de solo lectura (mmap)
+
+Los procesos que abren el mismo fichero (o que lo heredan por fork) comparten
+las mismas páginas físicas; cada texto se decodifica únicamente cuando se accede a él.
+"""
+
+import mmap
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+# Referencia a un texto dentro del almacén: (desplazamiento, longitud en bytes)
+RefTexto = Tuple[int, int]
+
+
+class AlmacenTextos:
+    """Lector de solo lectura sobre un fichero de textos mapeado en memoria"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            tamano = os.fstat(f.fileno()).st_size
+            # mmap no admite ficheros vacíos
+            self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if tamano else b""
+
+    def leer(self, ref: RefTexto) -> str:
+        """Decodifica el texto referenciado"""
+        desplazamiento, longitud = ref
+        return self._mapa[desplazamiento:desplazamiento + longitud].decode("utf-8")
+
+
+class EscritorAlmacenTextos:
+    """
+    Construye un fichero de almacén de textos
+
+    Los textos idénticos se escriben una sola vez y comparten referencia.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._temporal = ruta + ".tmp"
+        self._fichero = open(self._temporal, "wb")
+        self._desplazamiento = 0
+        self._indice: Dict[str, RefTexto] = {}
+
+    def agregar(self, texto: str) -> RefTexto:
+        """Añade un texto al almacén y devuelve su referencia"""
+        ref = self._indice.get(texto)
+        if ref is None:
+            datos = texto.encode("utf-8")
+            self._fichero.write(datos)
+            ref = (self._desplazamiento, len(datos))
+            self._desplazamiento += len(datos)
+            self._indice[texto] = ref
+        return ref
+
+    def cerrar(self):
+        """Vuelca el fichero y lo publica de forma atómica"""
+        self._fichero.close()
+        os.replace(self._temporal, self.ruta)
+        _almacenes.pop(self.ruta, None)
+
+
+# Almacenes abiertos en este proceso, por ruta
+_almacenes: Dict[str, AlmacenTextos] = {}
+_lock = threading.Lock()
+
+
+def abrir_almacen(ruta: str) -> AlmacenTextos:
+    """Devuelve el almacén abierto para la ruta (uno por proceso)"""
+    almacen = _almacenes.get(ruta)
+    if almacen is None:
+        with _lock:
+            almacen = _almacenes.get(ruta)
+            if almacen is None:
+                almacen = AlmacenTextos(ruta)
+                _almacenes[ruta] = almacen
+    return almacen
+
+
+class CampoTextoMapeado:
+    """
+    Descriptor de campo de texto respaldado por un AlmacenTextos
+
+    El valor se guarda como referencia al almacén y se decodifica en cada acceso,
+    de modo que el objeto no retiene una copia privada del texto.
+    Asignar un valor lo guarda en memoria como en un campo normal.
+    """
+
+    def __set_name__(self, propietario, nombre: str):
+        self.nombre = nombre
+
+    def __get__(self, obj, propietario=None):
+        if obj is None:
+            return self
+        valor = obj.__dict__["_textos"].get(self.nombre)
+        if isinstance(valor, tuple):
+            return abrir_almacen(obj._ruta_almacen).leer(valor)
+        return valor
+
+    def __set__(self, obj, valor):
+        obj.__dict__.setdefault("_textos", {})[self.nombre] = valor
+
+
+class ProxyTextosMapeados:
+    """
+    Mixin para dataclasses cuyos campos de texto largos residen en el almacén
+
+    Las subclases declaran esos campos como CampoTextoMapeado; el resto de
+    campos se comportan como en la dataclass original.
+    """
+
+    _ruta_almacen: Optional[str] = None
+
+    @classmethod
+    def desde(cls, original, escritor: EscritorAlmacenTextos):
+        """Crea un proxy a partir de una instancia ya construida, volcando sus textos largos"""
+        proxy = cls.__new__(cls)
+        proxy.__dict__["_textos"] = {}
+        proxy._ruta_almacen = escritor.ruta
+
+        for nombre, valor in vars(original).items():
+            if isinstance(getattr(cls, nombre, None), CampoTextoMapeado):
+                proxy.__dict__["_textos"][nombre] = (
+                    escritor.agregar(valor) if isinstance(valor, str) else valor
+                )
+            else:
+                setattr(proxy, nombre, valor)
+
+        return proxy
@@ -0,0 +1,84 @@
+"""
+Autómata de búsqueda multipatrón (Aho-Corasick)
+Localiza todas las palabras clave de un diccionario en una sola pasada sobre el texto
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+class AutomataAhoCorasick:
+    """
+    Autómata Aho-Corasick sobre un conjunto fijo de patrones
+
+    Se compila una sola vez; cada búsqueda recorre el texto una única vez,
+    con coste proporcional a la longitud del texto más el número de coincidencias,
+    independientemente de cuántos patrones contenga el diccionario.
+    """
+
+    def __init__(self, patrones: Iterable[str]):
+        self.patrones: List[str] = []
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallo: List[int] = [0]
+        self._salidas: List[List[int]] = [[]]
+
+        for patron in patrones:
+            self._agregar_patron(patron)
+        self._construir_enlaces_fallo()
+
+    def _agregar_patron(self, patron: str):
+        """Inserta un patrón en el trie"""
+        indice = len(self.patrones)
+        self.patrones.append(patron)
+
+        estado = 0
+        for caracter in patron:
+            siguiente = self._transiciones[estado].get(caracter)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones.append({})
+                self._fallo.append(0)
+                self._salidas.append([])
+                self._transiciones[estado][caracter] = siguiente
+            estado = siguiente
+
+        self._salidas[estado].append(indice)
+
+    def _construir_enlaces_fallo(self):
+        """Calcula los enlaces de fallo por anchura y propaga las salidas"""
+        cola = deque(self._transiciones[0].values())
+
+        while cola:
+            estado = cola.popleft()
+            for caracter, siguiente in self._transiciones[estado].items():
+                cola.append(siguiente)
+
+                fallo = self._fallo[estado]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[siguiente] = destino if destino != siguiente else 0
+
+                self._salidas[siguiente].extend(self._salidas[self._fallo[siguiente]])
+
+    def buscar(self, texto: str) -> Set[int]:
+        """Devuelve los índices de todos los patrones presentes en el texto"""
+        transiciones = self._transiciones
+        fallo = self._fallo
+        salidas = self._salidas
+
+        encontrados = set()
+        estado = 0
+
+        for caracter in texto:
+            while estado and caracter not in transiciones[estado]:
+                estado = fallo[estado]
+            estado = transiciones[estado].get(caracter, 0)
+            if salidas[estado]:
+                encontrados.update(salidas[estado])
+
+        return encontrados
+
+    def buscar_patrones(self, texto: str) -> Set[str]:
+        """Devuelve los patrones (como texto) presentes en el texto"""
+        return {self.patrones[i] for i in self.buscar(texto)}
@@ -0,0 +1,240 @@
+"""
+Base de Sentencias en SQLite (FTS5)
+Almacén persistente de jurisprudencia importada, consultable con búsqueda de texto completo
+"""
+
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .grafo_citas import extraer_citas
+from .jurisprudencia import Sentencia
+from .normalizacion import tokenizar
+
+
+RUTA_BD_JURISPRUDENCIA = os.environ.get(
+    "ASISTENTE_LEGAL_BD_JURISPRUDENCIA",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "jurisprudencia.sqlite")
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sentencias (
+    id INTEGER PRIMARY KEY,
+    clave TEXT UNIQUE NOT NULL,
+    tribunal TEXT,
+    numero TEXT,
+    fecha TEXT,
+    ponente TEXT,
+    materia TEXT,
+    tipo_penal TEXT,
+    resumen TEXT,
+    doctrina TEXT,
+    enlace_cendoj TEXT,
+    palabras_clave TEXT
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sentencias_fts USING fts5(
+    materia, tipo_penal, palabras_clave, texto,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TABLE IF NOT EXISTS citas (
+    sentencia_id INTEGER NOT NULL,
+    destino TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS citas_sentencia ON citas (sentencia_id);
+
+CREATE TABLE IF NOT EXISTS ficheros_importados (
+    ruta TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+_COLUMNAS_SENTENCIA = ("tribunal, numero, fecha, ponente, materia, tipo_penal, "
+                       "resumen, doctrina, enlace_cendoj, palabras_clave")
+_COLUMNAS = "clave, " + _COLUMNAS_SENTENCIA
+
+
+def _fila_a_sentencia(fila: Tuple) -> Sentencia:
+    """Convierte una fila de la tabla 'sentencias' (sin la clave) en Sentencia"""
+    (tribunal, numero, fecha, ponente, materia, tipo_penal,
+     resumen, doctrina, enlace_cendoj, palabras_clave) = fila
+    return Sentencia(
+        tribunal=tribunal,
+        numero=numero,
+        fecha=fecha,
+        ponente=ponente,
+        materia=materia,
+        tipo_penal=tipo_penal,
+        resumen=resumen,
+        doctrina=doctrina,
+        enlace_cendoj=enlace_cendoj,
+        palabras_clave=json.loads(palabras_clave or "[]")
+    )
+
+
+class BaseSentencias:
+    """
+    Almacén SQLite de sentencias con índice FTS5
+
+    Lo alimenta el importador de CENDOJ (knowledge.importador_cendoj) y lo
+    consulta Jurisprudencia cuando se le indica una ruta de base de datos.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        """Cierra la conexión"""
+        self.conexion.close()
+
+    def __len__(self) -> int:
+        return self.contar()
+
+    def contar(self, desde_id: int = 0) -> int:
+        """Número de sentencias con id posterior al indicado"""
+        return self.conexion.execute(
+            "SELECT COUNT(*) FROM sentencias WHERE id > ?", (desde_id,)
+        ).fetchone()[0]
+
+    def ficheros_importados(self, rutas: Iterable[str]) -> Dict[str, float]:
+        """Devuelve, de las rutas indicadas, las ya importadas con su mtime de importación"""
+        rutas = list(rutas)
+        importados = {}
+        # SQLite limita el número de parámetros por consulta
+        for inicio in range(0, len(rutas), 500):
+            tramo = rutas[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(tramo))
+            importados.update(self.conexion.execute(
+                f"SELECT ruta, mtime FROM ficheros_importados WHERE ruta IN ({marcadores})", tramo
+            ))
+        return importados
+
+    def insertar_lote(self, registros: Iterable[Tuple[str, float, Optional[str], Optional[Sentencia], str]]):
+        """
+        Inserta un lote de sentencias en una única transacción
+
+        Args:
+            registros: Tuplas (ruta, mtime, clave, sentencia, texto). Los ficheros
+                que no produjeron sentencia (clave None) se marcan igualmente
+                como importados para no reprocesarlos.
+        """
+        with self.conexion:
+            for ruta, mtime, clave, sentencia, texto in registros:
+                if sentencia is not None:
+                    self._insertar(clave, sentencia, texto)
+                self.conexion.execute(
+                    "INSERT OR REPLACE INTO ficheros_importados (ruta, mtime) VALUES (?, ?)",
+                    (ruta, mtime)
+                )
+
+    def _insertar(self, clave: str, sentencia: Sentencia, texto: str):
+        """Inserta o reemplaza una sentencia, su entrada FTS y las citas que contiene"""
+        fila = self.conexion.execute(
+            "SELECT id FROM sentencias WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila:
+            self.conexion.execute("DELETE FROM citas WHERE sentencia_id = ?", (fila[0],))
+            self.conexion.execute("DELETE FROM sentencias_fts WHERE rowid = ?", (fila[0],))
+            self.conexion.execute("DELETE FROM sentencias WHERE id = ?", (fila[0],))
+
+        cursor = self.conexion.execute(
+            f"INSERT INTO sentencias ({_COLUMNAS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (clave, sentencia.tribunal, sentencia.numero, sentencia.fecha, sentencia.ponente,
+             sentencia.materia, sentencia.tipo_penal, sentencia.resumen, sentencia.doctrina,
+             sentencia.enlace_cendoj, json.dumps(sentencia.palabras_clave, ensure_ascii=False))
+        )
+        self.conexion.execute(
+            "INSERT INTO sentencias_fts (rowid, materia, tipo_penal, palabras_clave, texto) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (cursor.lastrowid, sentencia.materia, sentencia.tipo_penal,
+             " ".join(sentencia.palabras_clave), texto)
+        )
+        self.conexion.executemany(
+            "INSERT INTO citas (sentencia_id, destino) VALUES (?, ?)",
+            ((cursor.lastrowid, destino) for destino in extraer_citas(texto))
+        )
+
+    def firma(self) -> Tuple[int, int]:
+        """Identifica el contenido actual (número de sentencias e id máximo)"""
+        return tuple(self.conexion.execute(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM sentencias"
+        ).fetchone())
+
+    def iterar_textos(self) -> Iterator[Tuple[str, str]]:
+        """Recorre en streaming los pares (clave, resumen + doctrina)"""
+        cursor = self.conexion.execute("SELECT clave, resumen, doctrina FROM sentencias ORDER BY id")
+        for clave, resumen, doctrina in cursor:
+            yield clave, f"{resumen or ''} {doctrina or ''}"
+
+    def iterar_citas(self, desde_id: int = 0) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Recorre en streaming las sentencias con las citas que contienen
+
+        Args:
+            desde_id: Solo sentencias con id posterior (las añadidas desde entonces)
+
+        Returns:
+            Pares (numero, [números de las sentencias citadas])
+        """
+        cursor = self.conexion.execute(
+            "SELECT s.id, s.numero, c.destino FROM sentencias AS s "
+            "LEFT JOIN citas AS c ON c.sentencia_id = s.id "
+            "WHERE s.id > ? ORDER BY s.id", (desde_id,)
+        )
+        actual, numero, destinos = None, None, []
+        for id_sentencia, numero_fila, destino in cursor:
+            if id_sentencia != actual:
+                if actual is not None:
+                    yield numero, destinos
+                actual, numero, destinos = id_sentencia, numero_fila, []
+            if destino is not None:
+                destinos.append(destino)
+        if actual is not None:
+            yield numero, destinos
+
+    def obtener(self, clave: str) -> Optional[Sentencia]:
+        """Obtiene una sentencia por clave"""
+        fila = self.conexion.execute(
+            f"SELECT {_COLUMNAS_SENTENCIA} FROM sentencias WHERE clave = ?", (clave,)
+        ).fetchone()
+        return _fila_a_sentencia(fila) if fila else None
+
+    def buscar(self, consulta: str, limite: int = 50,
+               columnas: Sequence[str] = None) -> List[Tuple[str, Sentencia]]:
+        """
+        Búsqueda de texto completo (ranking bm25 de FTS5)
+
+        Cada palabra de la consulta se trata como prefijo y todas deben aparecer.
+
+        Args:
+            consulta: Texto a buscar
+            limite: Número máximo de resultados
+            columnas: Columnas FTS a las que restringir la búsqueda
+                ('materia', 'tipo_penal', 'palabras_clave', 'texto'); todas por defecto
+
+        Returns:
+            Lista de (clave, sentencia) ordenada por relevancia
+        """
+        tokens = tokenizar(consulta, eliminar_stopwords=False)
+        if not tokens:
+            return []
+
+        expresion = " AND ".join(f'"{token}"*' for token in tokens)
+        if columnas:
+            expresion = "{" + " ".join(columnas) + "} : (" + expresion + ")"
+        columnas_select = ", ".join(f"s.{c}" for c in _COLUMNAS.split(", "))
+        filas = self.conexion.execute(
+            f"SELECT {columnas_select} FROM sentencias_fts "
+            "JOIN sentencias AS s ON s.id = sentencias_fts.rowid "
+            "WHERE sentencias_fts MATCH ? ORDER BY bm25(sentencias_fts) LIMIT ?",
+            (expresion, limite)
+        ).fetchall()
+
+        return [(fila[0], _fila_a_sentencia(fila[1:])) for fila in filas]
@@ -3,9 +3,23 @@ Código Penal Español - LO 10/1995
 Base de conocimiento del Código Penal con todos los tipos penales, penas y circunstancias
 """
 
-from typing import Dict, List, Optional, Tuple
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
+
+from .almacen_textos import CampoTextoMapeado, ProxyTextosMapeados
+from .automata import AutomataAhoCorasick
+from .indice_bm25 import IndiceBM25
+from .normalizacion import STOPWORDS_ES, ConjuntoTerminos, DocumentoNormalizado, normalizar, tokenizar
+from .penas import (MarcoPenal, PenaCalculada, TablaEscenariosPena, aplicar_reglas,
+                    construir_escenarios, interpretar_pena)
+from . import prescripcion
+from .prescripcion import PlazoPrescripcion, ResultadoPrescripcion
+from .reglas_circunstancias import REGLAS_CIRCUNSTANCIAS, DetectorCircunstancias
+from .referencias_articulos import clave_orden, extraer_remisiones, interpretar_rango, normalizar_numero
+from .versiones_articulos import HistorialArticulo
+from .snapshot import cargar_seccion
 
 
 @dataclass
@@ -21,6 +35,13 @@ class ArticuloCP:
     vigencia: str = "Vigente"
     ultima_modificacion: Optional[str] = None
     notas: Optional[str] = None
+    vigente_desde: Optional[str] = None  # AAAA-MM-DD; None = desde la entrada en vigor del Código
+    vigente_hasta: Optional[str] = None  # AAAA-MM-DD; None = vigente hoy
+
+
+class ArticuloCPMapeado(ProxyTextosMapeados, ArticuloCP):
+    """ArticuloCP cuyo contenido reside en el almacén de textos mapeado"""
+    contenido = CampoTextoMapeado()
 
 
 @dataclass
@@ -50,17 +71,154 @@ class CircunstanciaModificativa:
     ejemplos: List[str]
 
 
+# Mapeo de palabras clave a tipos penales
+PALABRAS_CLAVE_TIPOS: Dict[str, List[str]] = {
+    "matar": ["homicidio", "asesinato"],
+    "muerte": ["homicidio", "asesinato"],
+    "asesinar": ["asesinato"],
+    "alevosía": ["asesinato"],
+    "lesion": ["lesiones_basicas"],
+    "golpe": ["lesiones_basicas", "violencia_genero"],
+    "herir": ["lesiones_basicas"],
+    "robar": ["hurto", "robo_fuerza", "robo_violencia"],
+    "hurto": ["hurto"],
+    "sustraccion": ["hurto"],
+    "robo": ["robo_fuerza", "robo_violencia"],
+    "violencia": ["robo_violencia", "violencia_genero"],
+    "intimidacion": ["robo_violencia"],
+    "estafa": ["estafa"],
+    "engaño": ["estafa"],
+    "defraud": ["estafa"],
+    "agresi": ["agresion_sexual"],
+    "violacion": ["violacion"],
+    "sexual": ["agresion_sexual", "violacion"],
+    "droga": ["trafico_drogas"],
+    "estupefaciente": ["trafico_drogas"],
+    "trafico": ["trafico_drogas"],
+    "conducir": ["conduccion_temeraria"],
+    "alcohol": ["conduccion_temeraria"],
+    "velocidad": ["conduccion_temeraria"],
+    "maltrato": ["violencia_genero"],
+    "mujer": ["violencia_genero"],
+    "pareja": ["violencia_genero"]
+}
+
+
+# Palabras indicativas de los elementos del tipo cuya descripción contiene la clave,
+# con cada forma admitida escrita (se buscan como palabras completas, sin tildes);
+# el resto de elementos se buscan por las palabras significativas de su descripción
+PALABRAS_CLAVE_ELEMENTOS: Dict[str, List[str]] = {
+    "conducta: matar": ["matar", "mato", "mataron", "matarlo", "matarla", "matarle", "muerte", "muertes",
+                        "murio", "fallecer", "fallecio", "fallecimiento", "morir", "acabar con la vida",
+                        "acabo con la vida"],
+    "dolo": ["intencion", "intencionado", "intencionada", "intencionadamente", "voluntad", "voluntariamente",
+             "querer", "queria", "proposito", "deliberado", "deliberada", "deliberadamente"],
+    "ánimo de lucro": ["lucro", "dinero", "beneficio", "beneficios", "vender", "vendio", "ganar",
+                       "enriquecer", "enriquecerse", "enriquecimiento"],
+    "engaño": ["engaño", "engaños", "engañar", "engañado", "engañada", "mentira", "mentiras", "falso", "falsa",
+               "falsos", "falsas", "fraudulento", "fraudulenta", "fraude", "ardid", "trampa"],
+    "violencia": ["violencia", "violentamente", "golpe", "golpes", "golpear", "golpeo", "golpeando", "golpeado",
+                  "golpeada", "agresion", "agresiones", "agredir", "agredio", "agredido", "agredida",
+                  "fuerza física"],
+    "intimidacion": ["amenaza", "amenazas", "amenazo", "amenazando", "amenazado", "amenazada", "intimidar",
+                     "intimido", "intimidacion", "miedo", "coaccion", "coacciones"],
+    "sin consentimiento": ["sin consentimiento", "sin su consentimiento", "en contra de su voluntad",
+                           "contra su voluntad", "negativa", "se nego", "rechazar", "rechazo"],
+}
+
+# Longitud mínima de las palabras de la descripción que se usan como indicio
+_MIN_PALABRA_ELEMENTO = 4
+
+
 class CodigoPenal:
     """
     Base de conocimiento del Código Penal Español
     LO 10/1995 y reformas posteriores
     """
 
-    def __init__(self):
-        self.articulos = self._cargar_articulos()
-        self.tipos_penales = self._cargar_tipos_penales()
-        self.circunstancias = self._cargar_circunstancias()
+    def __init__(self, usar_snapshot: bool = True):
+        """
+        Args:
+            usar_snapshot: Si es True, carga la base precompilada cuando está
+                vigente (ver knowledge.snapshot); si no, construye desde los literales.
+        """
+        datos = cargar_seccion("codigo_penal") if usar_snapshot else None
+
+        if datos:
+            self.articulos = datos["articulos"]
+            self.articulos_historicos = datos["articulos_historicos"]
+            self.tipos_penales = datos["tipos_penales"]
+            self.circunstancias = datos["circunstancias"]
+            self.indice_articulos = datos["indice_articulos"]
+            self.marcos_penales = datos["marcos_penales"]
+            self.plazos_prescripcion = datos["plazos_prescripcion"]
+            self.remisiones_articulos = datos["remisiones_articulos"]
+        else:
+            self.articulos = self._cargar_articulos()
+            self.articulos_historicos = self._cargar_articulos_historicos()
+            self.tipos_penales = self._cargar_tipos_penales()
+            self.circunstancias = self._cargar_circunstancias()
+            self.indice_articulos = self._construir_indice_articulos()
+            self.marcos_penales = self._construir_marcos_penales()
+            self.plazos_prescripcion = self._construir_plazos_prescripcion()
+            self.remisiones_articulos = None
         self.version = "LO 10/1995 (actualizado 2024)"
+        # La instancia compartida del registro no admite altas (ver knowledge.registro)
+        self.solo_lectura = False
+
+        # Historial de redacciones por artículo; las no modificadas comparten el texto
+        self._textos_articulos: Dict[str, str] = {}
+        self.versiones_articulos: Dict[str, HistorialArticulo] = {}
+        for articulo in self.articulos_historicos + list(self.articulos.values()):
+            historial = self.versiones_articulos.setdefault(articulo.numero, HistorialArticulo())
+            historial.agregar(articulo, self._textos_articulos)
+
+        # Números de artículo en orden natural (bis, ter...) para consultas por rango
+        self._orden_articulos: List[Tuple[Tuple[int, int, int], str]] = sorted(
+            (clave, numero) for numero in self.articulos
+            if (clave := clave_orden(numero)) is not None
+        )
+        if self.remisiones_articulos is None:
+            self.remisiones_articulos = self._construir_remisiones()
+
+        # Claves por nombre, para llegar a las claves desde los objetos
+        self._claves_tipos = {tipo.nombre: clave for clave, tipo in self.tipos_penales.items()}
+        self._claves_circunstancias = {c.nombre: clave for clave, c in self.circunstancias.items()}
+
+        # Penas ya calculadas por (tipo, atenuantes, agravantes)
+        self._cache_penas: Dict[Tuple[str, FrozenSet[str], FrozenSet[str]], PenaCalculada] = {}
+
+        # Autómata de palabras clave compilado una sola vez (sin tildes, como el texto)
+        self._automata_palabras_clave = AutomataAhoCorasick(normalizar(p) for p in PALABRAS_CLAVE_TIPOS)
+        self._tipos_por_palabra = list(PALABRAS_CLAVE_TIPOS.values())
+
+        # Reglas de detección de circunstancias, compiladas en un solo buscador
+        self.detector_circunstancias = DetectorCircunstancias(REGLAS_CIRCUNSTANCIAS)
+
+        # Términos indicativos de cada elemento de los tipos, compilados una vez, e
+        # índices invertidos palabra -> (tipo, elemento) para puntuar candidatos y
+        # palabra -> elemento para localizar los elementos presentes
+        self._terminos_elementos: Dict[str, ConjuntoTerminos] = {}
+        self._num_elementos: Dict[str, int] = {}
+        postings: Dict[str, set] = {}
+        elementos_por_palabra: Dict[str, set] = {}
+        for clave, tipo_penal in self.tipos_penales.items():
+            elementos = tipo_penal.elementos_objetivos + tipo_penal.elementos_subjetivos
+            self._num_elementos[clave] = len(elementos)
+            for indice, elemento in enumerate(elementos):
+                terminos = self.terminos_elemento(elemento)
+                palabras = set(terminos.palabras)
+                for frase in terminos.frases:
+                    palabras.update(p for p in frase.split() if p not in STOPWORDS_ES)
+                for palabra in palabras:
+                    postings.setdefault(palabra, set()).add((clave, indice))
+                    elementos_por_palabra.setdefault(palabra, set()).add(elemento)
+        self._indice_elementos: Dict[str, Tuple[Tuple[str, int], ...]] = {
+            palabra: tuple(sorted(entradas)) for palabra, entradas in postings.items()
+        }
+        self._elementos_por_palabra: Dict[str, Tuple[str, ...]] = {
+            palabra: tuple(sorted(elementos)) for palabra, elementos in elementos_por_palabra.items()
+        }
 
     def _cargar_articulos(self) -> Dict[str, ArticuloCP]:
         """Carga los artículos del Código Penal"""
@@ -283,7 +441,8 @@ c) Los que utilizando tarjetas de crédito o débito, o cheques de viaje, o los
             libro="II",
             titulo_grupo="Delitos contra la libertad e indemnidad sexual",
             capitulo="I",
-            ultima_modificacion="LO 10/2022 (Ley del 'solo sí es sí')"
+            ultima_modificacion="LO 10/2022 (Ley del 'solo sí es sí')",
+            vigente_desde="2022-10-07"
         )
 
         # VIOLENCIA DE GÉNERO
@@ -321,6 +480,23 @@ c) Los que utilizando tarjetas de crédito o débito, o cheques de viaje, o los
 
         return articulos
 
+    def _cargar_articulos_historicos(self) -> List[ArticuloCP]:
+        """Carga las redacciones anteriores de los artículos modificados"""
+        return [
+            ArticuloCP(
+                numero="178",
+                titulo="Agresión sexual",
+                contenido="""El que atentare contra la libertad sexual de otra persona, utilizando violencia o intimidación, será castigado como responsable de agresión sexual con la pena de prisión de uno a cinco años.""",
+                libro="II",
+                titulo_grupo="Delitos contra la libertad e indemnidad sexual",
+                capitulo="I",
+                vigencia="Derogado",
+                ultima_modificacion="LO 11/1999",
+                notas="Redacción anterior a la LO 10/2022. La violación se regulaba en el art. 179 (prisión de seis a doce años).",
+                vigente_hasta="2022-10-06"
+            ),
+        ]
+
     def _cargar_tipos_penales(self) -> Dict[str, TipoPenal]:
         """Carga los tipos penales con sus elementos"""
         tipos = {}
@@ -829,9 +1005,155 @@ c) Los que utilizando tarjetas de crédito o débito, o cheques de viaje, o los
 
         return circunstancias
 
-    def buscar_articulo(self, numero: str) -> Optional[ArticuloCP]:
-        """Busca un artículo por número"""
-        return self.articulos.get(numero)
+    def _construir_indice_articulos(self) -> IndiceBM25:
+        """Construye el índice de texto completo sobre título, contenido y notas"""
+        indice = IndiceBM25()
+        for articulo in self.articulos.values():
+            self._indexar_articulo(indice, articulo)
+        return indice
+
+    @staticmethod
+    def _indexar_articulo(indice: IndiceBM25, articulo: ArticuloCP):
+        """Añade un artículo al índice (el título pesa el doble)"""
+        indice.agregar(articulo.numero, [
+            (articulo.titulo, 2),
+            (articulo.contenido, 1),
+            (articulo.notas, 1),
+        ])
+
+    def _construir_remisiones(self) -> Dict[str, List[str]]:
+        """Lista de adyacencia de las remisiones que contiene cada artículo vigente"""
+        return {numero: self._remisiones_de(articulo) for numero, articulo in self.articulos.items()}
+
+    def _remisiones_de(self, articulo: ArticuloCP) -> List[str]:
+        """Artículos a los que remite el texto de un artículo (sin él mismo)"""
+        numeros, relativas = extraer_remisiones(articulo.contenido)
+        for relativa in relativas:
+            vecino = self._articulo_contiguo(articulo.numero, -1 if relativa == "anterior" else 1)
+            if vecino and vecino not in numeros:
+                numeros.append(vecino)
+        return [numero for numero in numeros if numero != articulo.numero]
+
+    def _articulo_contiguo(self, numero: str, desplazamiento: int) -> Optional[str]:
+        """Número del artículo anterior (-1) o siguiente (+1) en orden natural"""
+        clave = clave_orden(numero)
+        if clave is None:
+            return None
+        if desplazamiento < 0:
+            posicion = bisect_left(self._orden_articulos, (clave, "")) - 1
+        else:
+            posicion = bisect_right(self._orden_articulos, (clave, "\uffff"))
+        if 0 <= posicion < len(self._orden_articulos):
+            return self._orden_articulos[posicion][1]
+        return None
+
+    def articulos_ordenados(self) -> List[ArticuloCP]:
+        """Artículos vigentes en orden natural de numeración"""
+        return [self.articulos[numero] for _, numero in self._orden_articulos]
+
+    def articulos_en_rango(self, rango: str) -> List[ArticuloCP]:
+        """
+        Artículos vigentes comprendidos en un rango ("138-143", "147 a 148 bis")
+
+        Returns:
+            Artículos en orden natural; lista vacía si el rango no es válido
+        """
+        extremos = interpretar_rango(rango)
+        if extremos is None:
+            return []
+        desde, hasta = extremos
+        inicio = bisect_left(self._orden_articulos, (desde, ""))
+        fin = bisect_right(self._orden_articulos, (hasta, "\uffff"))
+        return [self.articulos[numero] for _, numero in self._orden_articulos[inicio:fin]]
+
+    def buscar_articulo_con_remisiones(self, numero: str, fecha=None
+                                       ) -> Tuple[Optional[ArticuloCP], List[ArticuloCP]]:
+        """
+        Busca un artículo junto con los artículos a los que remite
+
+        Args:
+            numero: Número del artículo
+            fecha: Como en buscar_articulo; las remisiones se resuelven en la misma fecha
+
+        Returns:
+            (artículo, artículos remitidos que existen en la base)
+        """
+        articulo = self.buscar_articulo(numero, fecha)
+        if articulo is None:
+            return None, []
+
+        remisiones = (self.remisiones_articulos.get(articulo.numero, [])
+                      if articulo is self.articulos.get(articulo.numero)
+                      else self._remisiones_de(articulo))
+        relacionados = [self.buscar_articulo(remitido, fecha) for remitido in remisiones]
+        return articulo, [relacionado for relacionado in relacionados if relacionado]
+
+    def agregar_articulo(self, articulo: ArticuloCP):
+        """
+        Añade un artículo o una nueva redacción y actualiza el índice de forma incremental
+
+        La redacción se incorpora al historial según su `vigente_desde`; si es
+        la más reciente pasa a ser la vigente en `articulos`.
+
+        Raises:
+            TypeError: Si es la instancia compartida del registro; para añadir
+                artículos se crea un CodigoPenal propio.
+        """
+        if self.solo_lectura:
+            raise TypeError("El Código Penal compartido es de solo lectura; use un CodigoPenal propio")
+        historial = self.versiones_articulos.setdefault(articulo.numero, HistorialArticulo())
+        articulo = historial.agregar(articulo, self._textos_articulos)
+        if historial.actual() is articulo:
+            if articulo.numero not in self.articulos and (clave := clave_orden(articulo.numero)):
+                insort(self._orden_articulos, (clave, articulo.numero))
+            self.articulos[articulo.numero] = articulo
+            self._indexar_articulo(self.indice_articulos, articulo)
+            self.remisiones_articulos[articulo.numero] = self._remisiones_de(articulo)
+        else:
+            self.articulos_historicos.append(articulo)
+
+    def buscar_articulo(self, numero: str, fecha=None) -> Optional[ArticuloCP]:
+        """
+        Busca un artículo por número
+
+        Args:
+            numero: Número del artículo
+            fecha: Si se indica (date o DD/MM/AAAA), la redacción vigente en esa
+                fecha; None si el artículo no estaba vigente entonces
+        """
+        if numero not in self.articulos:
+            numero = normalizar_numero(numero)
+
+        if fecha is None:
+            return self.articulos.get(numero)
+
+        historial = self.versiones_articulos.get(numero)
+        fecha = prescripcion.interpretar_fecha(fecha)
+        if historial is None or fecha is None:
+            return None
+        return historial.vigente_en(fecha)
+
+    def redaccion_modificada_desde(self, numero: str, fecha) -> bool:
+        """Indica si la redacción vigente en la fecha ya no es la actual (art. 2.2 CP)"""
+        anterior = self.buscar_articulo(numero, fecha)
+        return anterior is not None and anterior is not self.articulos.get(numero)
+
+    def buscar_texto_articulos(self, consulta: str, k: int = 10) -> List[Tuple[ArticuloCP, float]]:
+        """
+        Búsqueda de texto completo en los artículos (ranking BM25)
+
+        Args:
+            consulta: Términos a buscar (p. ej. "intoxicación plena")
+            k: Número máximo de resultados
+
+        Returns:
+            Lista de (artículo, puntuación) ordenada de mayor a menor relevancia
+        """
+        return [
+            (self.articulos[numero], puntuacion)
+            for numero, puntuacion in self.indice_articulos.buscar(consulta, k)
+            if numero in self.articulos
+        ]
 
     def buscar_tipo_penal(self, nombre: str) -> Optional[TipoPenal]:
         """Busca un tipo penal por nombre"""
@@ -841,74 +1163,238 @@ c) Los que utilizando tarjetas de crédito o débito, o cheques de viaje, o los
         """Busca una circunstancia modificativa"""
         return self.circunstancias.get(clave)
 
-    def identificar_tipos_por_palabras_clave(self, texto: str) -> List[TipoPenal]:
-        """Identifica posibles tipos penales basándose en palabras clave del texto"""
-        texto_lower = texto.lower()
-        tipos_identificados = []
+    def terminos_elemento(self, elemento: str) -> ConjuntoTerminos:
+        """Términos que indican la presencia de un elemento del tipo (compilados y memorizados)"""
+        terminos = self._terminos_elementos.get(elemento)
+        if terminos is None:
+            descripcion = normalizar(elemento)
+            palabras = next((palabras for clave, palabras in PALABRAS_CLAVE_ELEMENTOS.items()
+                             if normalizar(clave) in descripcion), None)
+            if palabras is None:
+                palabras = [p for p in tokenizar(descripcion) if len(p) >= _MIN_PALABRA_ELEMENTO]
+            terminos = self._terminos_elementos[elemento] = ConjuntoTerminos.desde_terminos(palabras)
+        return terminos
+
+    def elementos_presentes(self, documento: DocumentoNormalizado) -> Set[str]:
+        """
+        Elementos de los tipos del catálogo con algún término indicativo en el documento
 
-        # Mapeo de palabras clave a tipos penales
-        mapeo = {
-            "matar": ["homicidio", "asesinato"],
-            "muerte": ["homicidio", "asesinato"],
-            "asesinar": ["asesinato"],
-            "alevosía": ["asesinato"],
-            "lesion": ["lesiones_basicas"],
-            "golpe": ["lesiones_basicas", "violencia_genero"],
-            "herir": ["lesiones_basicas"],
-            "robar": ["hurto", "robo_fuerza", "robo_violencia"],
-            "hurto": ["hurto"],
-            "sustraccion": ["hurto"],
-            "robo": ["robo_fuerza", "robo_violencia"],
-            "violencia": ["robo_violencia", "violencia_genero"],
-            "intimidacion": ["robo_violencia"],
-            "estafa": ["estafa"],
-            "engaño": ["estafa"],
-            "defraud": ["estafa"],
-            "agresi": ["agresion_sexual"],
-            "violacion": ["violacion"],
-            "sexual": ["agresion_sexual", "violacion"],
-            "droga": ["trafico_drogas"],
-            "estupefaciente": ["trafico_drogas"],
-            "trafico": ["trafico_drogas"],
-            "conducir": ["conduccion_temeraria"],
-            "alcohol": ["conduccion_temeraria"],
-            "velocidad": ["conduccion_temeraria"],
-            "maltrato": ["violencia_genero"],
-            "mujer": ["violencia_genero"],
-            "pareja": ["violencia_genero"]
-        }
+        Equivale a comprobar terminos_elemento(e).presente_en(documento) para
+        cada elemento, pero solo se comprueban los que comparten alguna palabra
+        con el documento.
+        """
+        candidatos = set()
+        for palabra in documento.conjunto_tokens:
+            candidatos.update(self._elementos_por_palabra.get(palabra, ()))
+        return {elemento for elemento in candidatos if self._terminos_elementos[elemento].presente_en(documento)}
+
+    def cubrir_elementos(self, documento: DocumentoNormalizado, cubiertos: Dict[str, set]) -> int:
+        """
+        Añade a `cubiertos` (tipo -> índices de elementos) los elementos con
+        algún término indicativo en el documento
+
+        Returns:
+            Número de elementos cubiertos por primera vez
+        """
+        nuevos = 0
+        for palabra in documento.conjunto_tokens:
+            for clave, indice in self._indice_elementos.get(palabra, ()):
+                elementos = cubiertos.setdefault(clave, set())
+                if indice not in elementos:
+                    elementos.add(indice)
+                    nuevos += 1
+        return nuevos
+
+    def puntuar_cobertura(self, cubiertos: Dict[str, set]) -> Dict[str, float]:
+        """Fracción de los elementos de cada tipo que están cubiertos"""
+        return {clave: len(elementos) / self._num_elementos[clave] for clave, elementos in cubiertos.items()}
+
+    def puntuar_tipos(self, documento: DocumentoNormalizado) -> Dict[str, float]:
+        """
+        Puntuación rápida de los tipos según los hechos
+
+        Fracción de los elementos de cada tipo con algún término indicativo en
+        el documento. Se calcula sobre el índice invertido, visitando solo las
+        palabras presentes en los hechos, por lo que el coste no depende del
+        número de tipos del catálogo. Los tipos sin ningún indicio no aparecen.
+        """
+        cubiertos: Dict[str, set] = {}
+        self.cubrir_elementos(documento, cubiertos)
+        return self.puntuar_cobertura(cubiertos)
+
+    def palabras_clave_en(self, texto: str) -> Set[int]:
+        """Índices (en el orden de PALABRAS_CLAVE_TIPOS) de las palabras clave que aparecen en el texto"""
+        # Una sola pasada sobre el texto con el autómata compilado en __init__
+        return self._automata_palabras_clave.buscar(normalizar(texto))
 
-        for palabra_clave, tipos in mapeo.items():
-            if palabra_clave in texto_lower:
-                for tipo in tipos:
+    def tipos_de_palabras_clave(self, indices: Iterable[int]) -> List[TipoPenal]:
+        """Tipos penales asociados a las palabras clave indicadas, sin repetir"""
+        tipos_identificados = []
+        vistos = set()
+
+        # Orden estable: el de la tabla de palabras clave, no el de aparición en el texto
+        for indice in sorted(indices):
+            for tipo in self._tipos_por_palabra[indice]:
+                if tipo not in vistos:
+                    vistos.add(tipo)
                     tipo_penal = self.tipos_penales.get(tipo)
-                    if tipo_penal and tipo_penal not in tipos_identificados:
+                    if tipo_penal:
                         tipos_identificados.append(tipo_penal)
 
         return tipos_identificados
 
+    def identificar_tipos_por_palabras_clave(self, texto: str) -> List[TipoPenal]:
+        """Identifica posibles tipos penales basándose en palabras clave del texto"""
+        return self.tipos_de_palabras_clave(self.palabras_clave_en(texto))
+
+    def _construir_marcos_penales(self) -> Dict[str, Tuple[MarcoPenal, ...]]:
+        """Interpreta una sola vez las penas de cada tipo como marcos numéricos"""
+        return {
+            clave: interpretar_pena(tipo.pena_minima, tipo.pena_maxima)
+            for clave, tipo in self.tipos_penales.items()
+        }
+
+    def clave_tipo(self, tipo: TipoPenal) -> Optional[str]:
+        """Clave de un tipo penal en tipos_penales"""
+        return self._claves_tipos.get(tipo.nombre)
+
+    def clave_circunstancia(self, circunstancia: CircunstanciaModificativa) -> Optional[str]:
+        """Clave de una circunstancia en circunstancias"""
+        return self._claves_circunstancias.get(circunstancia.nombre)
+
+    def calcular_marco_penal(self, tipo_penal: str, atenuantes: Iterable[str] = (),
+                             agravantes: Iterable[str] = ()) -> Optional[PenaCalculada]:
+        """
+        Calcula los marcos penales resultantes (arts. 66, 68 y 70)
+
+        Args:
+            tipo_penal: Clave del tipo penal
+            atenuantes: Claves de las atenuantes apreciadas (incluida
+                'atenuante_incompleta', que se trata como eximente incompleta)
+            agravantes: Claves de las agravantes apreciadas
+
+        Returns:
+            PenaCalculada, o None si el tipo no existe. El resultado se memoiza
+            por combinación, que se repite entre análisis.
+        """
+        clave = tipo_penal.lower()
+        if clave not in self.marcos_penales:
+            return None
+
+        atenuantes = frozenset(a for a in atenuantes if a in self.circunstancias)
+        agravantes = frozenset(a for a in agravantes if a in self.circunstancias)
+        clave_cache = (clave, atenuantes, agravantes)
+
+        pena = self._cache_penas.get(clave_cache)
+        if pena is None:
+            incompletas = len(atenuantes & {"atenuante_incompleta"})
+            pena = self._cache_penas[clave_cache] = aplicar_reglas(
+                self.marcos_penales[clave],
+                atenuantes=len(atenuantes) - incompletas,
+                agravantes=len(agravantes),
+                eximentes_incompletas=incompletas,
+            )
+        return pena
+
+    # Límite de circunstancias candidatas en una tabla de escenarios (2^n filas)
+    MAX_CIRCUNSTANCIAS_ESCENARIOS = 12
+
+    def escenarios_pena(self, tipo: TipoPenal, circunstancias: Sequence[str]) -> Optional[TablaEscenariosPena]:
+        """
+        Marcos penales resultantes de todas las combinaciones de circunstancias
+
+        Args:
+            tipo: Tipo penal
+            circunstancias: Claves de las atenuantes y agravantes candidatas.
+                Las eximentes completas (que excluyen la pena) y las claves
+                desconocidas se descartan.
+
+        Returns:
+            TablaEscenariosPena con 2^n combinaciones, o None si el tipo no existe
+        """
+        clave = self.clave_tipo(tipo)
+        if clave is None:
+            return None
+
+        candidatas = []
+        for clave_circ in dict.fromkeys(circunstancias):
+            circunstancia = self.circunstancias.get(clave_circ)
+            if circunstancia is not None and circunstancia.tipo in ("atenuante", "agravante"):
+                candidatas.append(clave_circ)
+        if len(candidatas) > self.MAX_CIRCUNSTANCIAS_ESCENARIOS:
+            raise ValueError(
+                f"Demasiadas circunstancias candidatas ({len(candidatas)}); "
+                f"máximo {self.MAX_CIRCUNSTANCIAS_ESCENARIOS}"
+            )
+
+        mascaras = {"atenuante": 0, "agravante": 0, "incompleta": 0}
+        for bit, clave_circ in enumerate(candidatas):
+            clase = ("incompleta" if clave_circ == "atenuante_incompleta"
+                     else self.circunstancias[clave_circ].tipo)
+            mascaras[clase] |= 1 << bit
+
+        return construir_escenarios(
+            clave, self.marcos_penales[clave], candidatas,
+            mascaras["atenuante"], mascaras["agravante"], mascaras["incompleta"]
+        )
+
     def calcular_pena(self, tipo_penal: str, atenuantes: List[str] = None,
                      agravantes: List[str] = None) -> Tuple[str, str]:
         """
         Calcula el marco penal aplicable según tipo penal y circunstancias
-        Retorna (pena_minima, pena_maxima) como strings
+        Retorna (pena_minima, pena_maxima) como strings de la pena principal
         """
-        tipo = self.tipos_penales.get(tipo_penal.lower())
-        if not tipo:
+        pena = self.calcular_marco_penal(tipo_penal, atenuantes or (), agravantes or ())
+        if not pena:
             return ("Tipo penal no encontrado", "")
+        if not pena.marcos:
+            tipo = self.tipos_penales[tipo_penal.lower()]
+            return (tipo.pena_minima, tipo.pena_maxima)
+
+        return pena.marcos[0].extremos()
+
+    def _construir_plazos_prescripcion(self) -> Dict[str, PlazoPrescripcion]:
+        """Interpreta una sola vez los plazos de prescripción del delito de cada tipo"""
+        plazos = {}
+        for clave, tipo in self.tipos_penales.items():
+            plazo = prescripcion.interpretar_plazo(tipo.prescripcion_delito)
+            if plazo is not None:
+                plazos[clave] = plazo
+        return plazos
+
+    def calcular_prescripcion(self, tipo_penal: str, fecha_hechos,
+                              interrupciones: Iterable = (), suspensiones: Iterable = (),
+                              fecha_referencia: Optional[date] = None) -> Optional[ResultadoPrescripcion]:
+        """
+        Calcula la fecha de prescripción del delito
 
-        # Pena básica
-        pena_info = f"Pena básica: {tipo.pena_minima} a {tipo.pena_maxima}"
-
-        # Aplicar atenuantes (simplificado - en realidad requiere cálculo complejo)
-        if atenuantes:
-            pena_info += f"\n\nCon {len(atenuantes)} atenuante(s): Rebaja de pena en grado inferior"
+        Args:
+            tipo_penal: Clave del tipo penal
+            fecha_hechos: Fecha de comisión (date o texto DD/MM/AAAA)
+            interrupciones: Fechas desde las que se reinicia el cómputo
+            suspensiones: Periodos (inicio, fin) que no computan
+            fecha_referencia: Fecha a la que se evalúa el estado (hoy por defecto)
 
-        # Aplicar agravantes
-        if agravantes:
-            pena_info += f"\n\nCon {len(agravantes)} agravante(s): Posible agravación según art. 66"
+        Returns:
+            ResultadoPrescripcion, o None si el tipo no tiene plazo o la fecha no es válida
+        """
+        plazo = self.plazos_prescripcion.get(tipo_penal.lower())
+        fecha = prescripcion.interpretar_fecha(fecha_hechos)
+        if plazo is None or fecha is None:
+            return None
+        return prescripcion.calcular(plazo, fecha, interrupciones, suspensiones, fecha_referencia)
+
+    def calcular_prescripciones_lote(self, filas: Iterable[Sequence],
+                                     fecha_referencia: Optional[date] = None
+                                     ) -> List[Optional[ResultadoPrescripcion]]:
+        """
+        Calcula la prescripción de toda una cartera de asuntos
 
-        return (tipo.pena_minima, tipo.pena_maxima)
+        Args:
+            filas: Secuencias (clave_tipo, fecha_hechos[, interrupciones[, suspensiones]])
+            fecha_referencia: Fecha común a la que se evalúa el estado (hoy por defecto)
+        """
+        return prescripcion.calcular_lote(self.plazos_prescripcion, filas, fecha_referencia)
 
     def get_prescripcion(self, tipo_penal: str) -> Dict[str, str]:
         """Obtiene plazos de prescripción del delito y de la pena"""
@@ -0,0 +1,182 @@
+"""
+Grafo de Citas Jurisprudenciales
+Extracción de citas (STS/STC nnn/aaaa), grafo compacto y autoridad tipo PageRank
+"""
+
+import os
+import pickle
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+VERSION_GRAFO = 1
+
+_RE_CITA = re.compile(r"\b(STS|STC)\s*(?:n[º°o]\.?\s*)?(\d{1,5})\s*/\s*(\d{4})\b")
+
+
+def extraer_citas(texto: str) -> List[str]:
+    """Citas a sentencias del TS y del TC en el texto, normalizadas como 'STS 531/2022'"""
+    citas = []
+    vistas = set()
+    for tribunal, numero, anio in _RE_CITA.findall(texto or ""):
+        cita = f"{tribunal} {int(numero)}/{anio}"
+        if cita not in vistas:
+            vistas.add(cita)
+            citas.append(cita)
+    return citas
+
+
+class GrafoCitas:
+    """
+    Grafo dirigido de citas entre sentencias con puntuación de autoridad
+
+    Los nodos se identifican por el número de la sentencia ('STS 531/2022');
+    una sentencia citada que no está en el corpus es igualmente un nodo.
+    Las aristas se acumulan a medida que se ingieren sentencias y se compactan
+    en arrays de adyacencia (CSR de aristas entrantes) al recalcular.
+
+    El recálculo es incremental: la iteración de potencias parte de las
+    puntuaciones anteriores, por lo que tras añadir unas pocas sentencias
+    converge en pocas iteraciones en lugar de empezar desde cero.
+    """
+
+    def __init__(self, amortiguacion: float = 0.85):
+        self.amortiguacion = amortiguacion
+        self.firma: Optional[Tuple] = None
+        self._ids: Dict[str, int] = {}
+        self._numeros: List[str] = []
+        self._salientes: Dict[int, set] = {}
+        # Adyacencia compacta de aristas entrantes (CSR) y grado de salida
+        self._entrada_inicio = array("l", [0])
+        self._entrada_origen = array("i")
+        self._grado_salida = array("i")
+        self._puntuaciones = array("d")
+        self._pendiente = False
+
+    def __len__(self) -> int:
+        return len(self._numeros)
+
+    def _nodo(self, numero: str) -> int:
+        """Id del nodo, creándolo si no existe"""
+        nodo = self._ids.get(numero)
+        if nodo is None:
+            nodo = self._ids[numero] = len(self._numeros)
+            self._numeros.append(numero)
+        return nodo
+
+    def agregar(self, numero: str, citas: Iterable[str]):
+        """Registra una sentencia y las sentencias que cita"""
+        origen = self._nodo(numero)
+        salientes = self._salientes.setdefault(origen, set())
+        for cita in citas:
+            destino = self._nodo(cita)
+            if destino != origen and destino not in salientes:
+                salientes.add(destino)
+                self._pendiente = True
+        self._pendiente = self._pendiente or len(self._puntuaciones) != len(self._numeros)
+
+    def quitar(self, numero: str):
+        """Retira las citas que hace una sentencia; el nodo se conserva porque otras pueden citarla"""
+        origen = self._ids.get(numero)
+        if origen is not None and self._salientes.pop(origen, None):
+            self._pendiente = True
+
+    def _compactar(self):
+        """Reconstruye los arrays de adyacencia a partir de las aristas acumuladas"""
+        num_nodos = len(self._numeros)
+        entrantes: List[List[int]] = [[] for _ in range(num_nodos)]
+        grado = array("i", [0]) * num_nodos
+
+        for origen, destinos in self._salientes.items():
+            grado[origen] = len(destinos)
+            for destino in destinos:
+                entrantes[destino].append(origen)
+
+        self._entrada_inicio = array("l", [0])
+        self._entrada_origen = array("i")
+        for origenes in entrantes:
+            self._entrada_origen.extend(origenes)
+            self._entrada_inicio.append(len(self._entrada_origen))
+        self._grado_salida = grado
+
+    def recalcular(self, tolerancia: float = 1e-6, max_iteraciones: int = 100) -> int:
+        """
+        Recalcula la autoridad (PageRank) partiendo de las puntuaciones previas
+
+        Returns:
+            Número de iteraciones realizadas
+        """
+        num_nodos = len(self._numeros)
+        if not num_nodos:
+            return 0
+
+        self._compactar()
+        d = self.amortiguacion
+
+        # Arranque en caliente: nodos nuevos con la media uniforme y renormalizado
+        previas = list(self._puntuaciones) + [1.0 / num_nodos] * (num_nodos - len(self._puntuaciones))
+        total = sum(previas)
+        pr = [p / total for p in previas]
+
+        inicio, origenes, grado = self._entrada_inicio, self._entrada_origen, self._grado_salida
+        iteraciones = 0
+        for iteraciones in range(1, max_iteraciones + 1):
+            colgante = sum(pr[n] for n in range(num_nodos) if not grado[n])
+            base = (1 - d) / num_nodos + d * colgante / num_nodos
+            aporte = [pr[n] / grado[n] if grado[n] else 0.0 for n in range(num_nodos)]
+
+            nuevo = [
+                base + d * sum(aporte[u] for u in origenes[inicio[v]:inicio[v + 1]])
+                for v in range(num_nodos)
+            ]
+            delta = sum(abs(a - b) for a, b in zip(nuevo, pr))
+            pr = nuevo
+            if delta < tolerancia:
+                break
+
+        self._puntuaciones = array("d", pr)
+        self._pendiente = False
+        return iteraciones
+
+    def autoridad(self, numero: str) -> float:
+        """Puntuación de autoridad de una sentencia (0 si no está en el grafo)"""
+        if self._pendiente:
+            self.recalcular()
+        nodo = self._ids.get(numero)
+        return self._puntuaciones[nodo] if nodo is not None else 0.0
+
+    def citada_por(self, numero: str) -> List[str]:
+        """Sentencias que citan a la indicada"""
+        nodo = self._ids.get(numero)
+        if nodo is None:
+            return []
+        return [self._numeros[origen] for origen, destinos in self._salientes.items() if nodo in destinos]
+
+    def guardar(self, ruta: str):
+        """Persiste el grafo con sus puntuaciones (escritura atómica)"""
+        if self._pendiente:
+            self.recalcular()
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            pickle.dump({"version": VERSION_GRAFO, "grafo": self.__dict__}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str, firma: Tuple = None) -> Optional["GrafoCitas"]:
+        """Carga un grafo persistido; None si no existe, es incompatible o no corresponde a la firma"""
+        try:
+            with open(ruta, "rb") as f:
+                contenido = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        if contenido.get("version") != VERSION_GRAFO:
+            return None
+
+        grafo = cls.__new__(cls)
+        grafo.__dict__.update(contenido["grafo"])
+        if firma is not None and grafo.firma != firma:
+            return None
+        return grafo
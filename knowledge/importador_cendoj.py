@@ -0,0 +1,296 @@
+"""
+Importador de Jurisprudencia de CENDOJ
+Importa en streaming un volcado local de sentencias (XML/HTML/texto) a la base SQLite FTS5
+
+Uso:
+    python -m knowledge.importador_cendoj DIRECTORIO [--bd RUTA] [--workers N] [--lote N]
+
+La importación es reanudable: cada fichero procesado queda registrado junto con
+su fecha de modificación, y una nueva ejecución omite los ya importados.
+"""
+
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from .base_sentencias import BaseSentencias, RUTA_BD_JURISPRUDENCIA
+from .jurisprudencia import Jurisprudencia, Sentencia
+from .registro import obtener_codigo_penal
+
+
+EXTENSIONES_ADMITIDAS = (".xml", ".html", ".htm", ".txt")
+
+# Prefijo de la cita según el órgano
+PREFIJOS_TRIBUNAL = [
+    ("tribunal supremo", "STS"),
+    ("tribunal constitucional", "STC"),
+    ("tribunal superior de justicia", "STSJ"),
+    ("audiencia nacional", "SAN"),
+    ("audiencia provincial", "SAP"),
+]
+
+_RE_ORGANO = re.compile(r"[ÓO]rgano:\s*(.+)", re.IGNORECASE)
+_RE_RESOLUCION = re.compile(r"N[º°o]\.?\s*de\s*Resoluci[óo]n:\s*(\d+/\d{4})", re.IGNORECASE)
+# Roj completo: tipo de resolución, sede (salvo TS, TC y AN) y número, p. ej. "SAP M 1234/2020"
+_RE_ROJ = re.compile(r"Roj:\s*([A-Z]+(?:\s+[A-Z]{1,4})?\s+\d+/\d{4})")
+_RE_FECHA = re.compile(r"Fecha:\s*(\d{1,2})/(\d{1,2})/(\d{4})")
+_RE_PONENTE = re.compile(r"Ponente:\s*(.+)", re.IGNORECASE)
+_RE_ID_CENDOJ = re.compile(r"Id\s+Cendoj:\s*(\d+)", re.IGNORECASE)
+_RE_ANTECEDENTES = re.compile(r"(ANTECEDENTES DE HECHO|HECHOS PROBADOS)", re.IGNORECASE)
+_RE_FUNDAMENTOS = re.compile(r"FUNDAMENTOS DE DERECHO", re.IGNORECASE)
+
+# Registro devuelto por los workers: (ruta, mtime, clave, sentencia, texto)
+RegistroImportacion = Tuple[str, float, Optional[str], Optional[Sentencia], str]
+
+
+@dataclass
+class ResumenImportacion:
+    """Estadísticas de una importación"""
+    ficheros_vistos: int = 0
+    importados: int = 0
+    omitidos: int = 0
+    sin_datos: int = 0
+    segundos: float = 0.0
+
+
+class _ExtractorTexto(HTMLParser):
+    """Extrae el texto plano de un documento HTML/XML conservando los saltos de bloque"""
+
+    ETIQUETAS_BLOQUE = {"p", "br", "div", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6",
+                        "section", "parrafo", "title"}
+    ETIQUETAS_OMITIDAS = {"script", "style"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.partes: List[str] = []
+        self._omitir = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.ETIQUETAS_OMITIDAS:
+            self._omitir += 1
+        elif tag in self.ETIQUETAS_BLOQUE:
+            self.partes.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.ETIQUETAS_OMITIDAS and self._omitir:
+            self._omitir -= 1
+        elif tag in self.ETIQUETAS_BLOQUE:
+            self.partes.append("\n")
+
+    def handle_data(self, data):
+        if not self._omitir:
+            self.partes.append(data)
+
+
+def _leer_texto(ruta: str) -> str:
+    """Lee el fichero (UTF-8 o Latin-1, como exporta CENDOJ) y devuelve su texto plano"""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    try:
+        contenido = datos.decode("utf-8")
+    except UnicodeDecodeError:
+        contenido = datos.decode("latin-1")
+
+    if ruta.lower().endswith(".txt"):
+        return contenido
+
+    extractor = _ExtractorTexto()
+    extractor.feed(contenido)
+    extractor.close()
+    return "".join(extractor.partes)
+
+
+def _buscar(patron: re.Pattern, texto: str) -> Optional[str]:
+    """Primer grupo de la primera coincidencia, sin espacios sobrantes"""
+    coincidencia = patron.search(texto)
+    return coincidencia.group(1).strip() if coincidencia else None
+
+
+def _seccion(texto: str, patron: re.Pattern, longitud: int) -> str:
+    """Fragmento del texto que sigue al encabezado de sección indicado"""
+    coincidencia = patron.search(texto)
+    inicio = coincidencia.end() if coincidencia else 0
+    return " ".join(texto[inicio:inicio + longitud * 2].split())[:longitud]
+
+
+def extraer_sentencia(texto: str, origen: str = "") -> Tuple[Optional[str], Optional[Sentencia]]:
+    """
+    Extrae los datos de una sentencia del texto de un documento de CENDOJ
+
+    La clave es el Roj o, en su defecto, el Id Cendoj, que identifican la
+    resolución en todo CENDOJ. El número de resolución se repite entre
+    Audiencias Provinciales y TSJ, así que solo se usa como número de cita.
+
+    Args:
+        texto: Texto plano del documento
+        origen: Ruta del fichero, clave de último recurso si el documento
+            no trae Roj ni Id Cendoj
+
+    Returns:
+        (clave, sentencia), o (None, None) si el documento no parece una resolución
+    """
+    organo = _buscar(_RE_ORGANO, texto)
+    numero_resolucion = _buscar(_RE_RESOLUCION, texto)
+    roj = _buscar(_RE_ROJ, texto)
+    id_cendoj = _buscar(_RE_ID_CENDOJ, texto)
+
+    if not organo and not numero_resolucion and not roj and not id_cendoj:
+        return None, None
+
+    tribunal = organo or "No consta"
+    prefijo = next((p for nombre, p in PREFIJOS_TRIBUNAL if nombre in tribunal.lower()), "S")
+    if numero_resolucion:
+        numero = f"{prefijo} {numero_resolucion}"
+    else:
+        numero = " ".join(roj.split()) if roj else f"CENDOJ {id_cendoj or os.path.basename(origen)}"
+
+    if roj:
+        clave = "_".join(roj.split())
+    else:
+        clave = f"CENDOJ_{id_cendoj or origen}"
+
+    fecha_match = _RE_FECHA.search(texto)
+    fecha = ""
+    if fecha_match:
+        dia, mes, anio = fecha_match.groups()
+        fecha = f"{anio}-{int(mes):02d}-{int(dia):02d}"
+
+    ponente = _buscar(_RE_PONENTE, texto) or "No consta"
+
+    # Tipos penales detectados con el autómata de palabras clave del Código Penal
+    tipos = obtener_codigo_penal().identificar_tipos_por_palabras_clave(texto)
+    nombres_tipos = [tipo.nombre for tipo in tipos]
+
+    sentencia = Sentencia(
+        tribunal=tribunal,
+        numero=numero,
+        fecha=fecha,
+        ponente=ponente.title(),
+        materia=" / ".join(nombres_tipos),
+        tipo_penal=nombres_tipos[0] if nombres_tipos else "",
+        resumen=_seccion(texto, _RE_ANTECEDENTES, 500),
+        doctrina=_seccion(texto, _RE_FUNDAMENTOS, 1500),
+        enlace_cendoj=(f"https://www.poderjudicial.es/search/AN/openDocument/{id_cendoj}"
+                       if id_cendoj else ""),
+        palabras_clave=[]
+    )
+
+    return clave, sentencia
+
+
+def procesar_fichero(ruta: str) -> RegistroImportacion:
+    """Lee y analiza un fichero (se ejecuta en los procesos del pool)"""
+    mtime = os.path.getmtime(ruta)
+    try:
+        texto = _leer_texto(ruta)
+        clave, sentencia = extraer_sentencia(texto, ruta)
+    except (OSError, ValueError):
+        return ruta, mtime, None, None, ""
+    return ruta, mtime, clave, sentencia, texto if sentencia else ""
+
+
+def recorrer_ficheros(directorio: str) -> Iterator[str]:
+    """Recorre el directorio en profundidad sin materializar la lista de ficheros"""
+    pendientes = [directorio]
+    while pendientes:
+        actual = pendientes.pop()
+        with os.scandir(actual) as entradas:
+            for entrada in sorted(entradas, key=lambda e: e.name):
+                if entrada.is_dir(follow_symlinks=False):
+                    pendientes.append(entrada.path)
+                elif entrada.name.lower().endswith(EXTENSIONES_ADMITIDAS):
+                    yield entrada.path
+
+
+def importar_directorio(directorio: str, ruta_bd: str = None, workers: int = None,
+                        tamano_lote: int = 500) -> ResumenImportacion:
+    """
+    Importa un volcado de CENDOJ a la base de sentencias
+
+    Los ficheros se recorren en streaming y se procesan por lotes: el pool
+    analiza un lote mientras el anterior se inserta en una única transacción,
+    de modo que la memoria está acotada a dos lotes.
+
+    Args:
+        directorio: Directorio con los ficheros exportados
+        ruta_bd: Base SQLite de destino (por defecto RUTA_BD_JURISPRUDENCIA)
+        workers: Procesos de análisis (por defecto, núcleos disponibles)
+        tamano_lote: Ficheros por transacción
+    """
+    resumen = ResumenImportacion()
+    inicio = time.perf_counter()
+    base = BaseSentencias(ruta_bd or RUTA_BD_JURISPRUDENCIA)
+    workers = workers or os.cpu_count() or 1
+
+    def guardar(registros):
+        registros = list(registros)
+        base.insertar_lote(registros)
+        for _, _, clave, sentencia, _ in registros:
+            if sentencia is None:
+                resumen.sin_datos += 1
+            else:
+                resumen.importados += 1
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pendiente = None
+            rutas = recorrer_ficheros(directorio)
+
+            while True:
+                lote = list(islice(rutas, tamano_lote))
+                if not lote:
+                    break
+                resumen.ficheros_vistos += len(lote)
+
+                # Reanudación: omitir ficheros ya importados y no modificados
+                importados = base.ficheros_importados(lote)
+                nuevos = [r for r in lote if importados.get(r) != os.path.getmtime(r)]
+                resumen.omitidos += len(lote) - len(nuevos)
+
+                resultados = pool.map(procesar_fichero, nuevos,
+                                      chunksize=max(1, len(nuevos) // (workers * 4)))
+                if pendiente is not None:
+                    guardar(pendiente)
+                pendiente = resultados
+
+            if pendiente is not None:
+                guardar(pendiente)
+    finally:
+        base.cerrar()
+
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
+
+
+def main():
+    """Punto de entrada de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Importa un volcado local de CENDOJ")
+    parser.add_argument("directorio", help="Directorio con las sentencias exportadas")
+    parser.add_argument("--bd", default=None, help="Base SQLite de destino")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de análisis")
+    parser.add_argument("--lote", type=int, default=500, help="Ficheros por transacción")
+    args = parser.parse_args()
+
+    resumen = importar_directorio(args.directorio, args.bd, args.workers, args.lote)
+
+    # Modelo de similitud y grafo de citas persistidos junto al corpus
+    # para no reconstruirlos al consultar
+    jurisprudencia = Jurisprudencia(ruta_bd=args.bd or RUTA_BD_JURISPRUDENCIA)
+    jurisprudencia.actualizar_modelo_similitud()
+    jurisprudencia.actualizar_grafo_citas()
+
+    print(f"✓ Importación completada en {resumen.segundos:.1f} s")
+    print(f"  Ficheros vistos: {resumen.ficheros_vistos}")
+    print(f"  Sentencias importadas: {resumen.importados}")
+    print(f"  Omitidos (ya importados): {resumen.omitidos}")
+    print(f"  Sin datos de resolución: {resumen.sin_datos}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Índice Invertido con Ranking BM25
+Búsqueda de texto completo sobre documentos de la base de conocimiento
+"""
+
+import heapq
+import math
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from .normalizacion import tokenizar
+
+
+class IndiceBM25:
+    """
+    Índice invertido incremental con puntuación Okapi BM25
+
+    Los documentos se pueden añadir o reemplazar en cualquier momento; las
+    estadísticas globales (N, longitud media, df) se mantienen al día y el IDF
+    se calcula en el momento de la consulta.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._longitudes: Dict[Hashable, int] = {}
+        self._terminos: Dict[Hashable, List[str]] = {}
+        self._longitud_total = 0
+
+    def __len__(self) -> int:
+        return len(self._longitudes)
+
+    def agregar(self, doc_id: Hashable, campos: Iterable[Tuple[str, int]]):
+        """
+        Añade (o reemplaza) un documento
+
+        Args:
+            doc_id: Identificador del documento
+            campos: Pares (texto, peso); el peso multiplica la frecuencia de
+                los términos del campo (p. ej. el título cuenta doble)
+        """
+        if doc_id in self._longitudes:
+            self.eliminar(doc_id)
+
+        frecuencias = Counter()
+        for texto, peso in campos:
+            if texto:
+                for token in tokenizar(texto):
+                    frecuencias[token] += peso
+
+        for token, tf in frecuencias.items():
+            self._postings.setdefault(token, {})[doc_id] = tf
+
+        longitud = sum(frecuencias.values())
+        self._longitudes[doc_id] = longitud
+        self._terminos[doc_id] = list(frecuencias)
+        self._longitud_total += longitud
+
+    def eliminar(self, doc_id: Hashable):
+        """Elimina un documento del índice"""
+        longitud = self._longitudes.pop(doc_id, None)
+        if longitud is None:
+            return
+        self._longitud_total -= longitud
+
+        for token in self._terminos.pop(doc_id):
+            posting = self._postings[token]
+            del posting[doc_id]
+            if not posting:
+                del self._postings[token]
+
+    def buscar(self, consulta: str, k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Devuelve los k documentos mejor puntuados como pares (doc_id, puntuación)"""
+        num_docs = len(self._longitudes)
+        if not num_docs:
+            return []
+
+        longitud_media = self._longitud_total / num_docs
+        k1, b = self.k1, self.b
+        puntuaciones: Dict[Hashable, float] = {}
+
+        for token in set(tokenizar(consulta)):
+            posting = self._postings.get(token)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in posting.items():
+                norma = k1 * (1 - b + b * self._longitudes[doc_id] / longitud_media)
+                puntuaciones[doc_id] = puntuaciones.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norma)
+
+        return heapq.nlargest(k, puntuaciones.items(), key=lambda par: par[1])
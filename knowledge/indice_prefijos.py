@@ -0,0 +1,81 @@
+"""
+Índice Invertido con Búsqueda por Prefijo
+Postings por token normalizado con vocabulario ordenado para consultas de prefijo
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set
+
+from .normalizacion import tokenizar
+
+
+class IndicePrefijos:
+    """
+    Índice invertido de un campo de texto
+
+    Una consulta devuelve los documentos que contienen, para cada token de la
+    consulta, algún token que empiece por él. Es un superconjunto de los
+    documentos en los que la consulta aparece como subcadena a partir de un
+    inicio de palabra, de modo que basta verificar los candidatos.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._vocabulario: List[str] = []
+        self._ordenado = True
+
+    def agregar(self, doc_id: int, texto: str):
+        """Indexa el texto de un documento"""
+        for token in set(tokenizar(texto, eliminar_stopwords=False)):
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+                self._vocabulario.append(token)
+                self._ordenado = False
+            posting.add(doc_id)
+
+    def quitar(self, doc_id: int, texto: str):
+        """Retira un documento de los postings de los tokens del texto con el que se indexó"""
+        for token in set(tokenizar(texto, eliminar_stopwords=False)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(doc_id)
+            if not posting:
+                del self._postings[token]
+                self._vocabulario.remove(token)
+
+    def _documentos_con_prefijo(self, prefijo: str) -> Set[int]:
+        """Unión de los postings de todos los tokens que empiezan por el prefijo"""
+        if not self._ordenado:
+            self._vocabulario.sort()
+            self._ordenado = True
+
+        vocabulario = self._vocabulario
+        i = bisect_left(vocabulario, prefijo)
+        documentos = set()
+        while i < len(vocabulario) and vocabulario[i].startswith(prefijo):
+            documentos |= self._postings[vocabulario[i]]
+            i += 1
+        return documentos
+
+    def candidatos(self, consulta: str) -> Optional[Set[int]]:
+        """
+        Documentos candidatos para la consulta
+
+        Returns:
+            Conjunto de doc_ids, o None si la consulta no tiene tokens
+            (en cuyo caso todos los documentos son candidatos)
+        """
+        tokens = tokenizar(consulta, eliminar_stopwords=False)
+        if not tokens:
+            return None
+
+        resultado = None
+        # Los tokens más largos son más selectivos: se intersecan primero
+        for token in sorted(set(tokens), key=len, reverse=True):
+            documentos = self._documentos_con_prefijo(token)
+            resultado = documentos if resultado is None else resultado & documentos
+            if not resultado:
+                break
+        return resultado
@@ -3,10 +3,20 @@ Sistema de Jurisprudencia del Tribunal Supremo y Tribunal Constitucional
 Base de sentencias relevantes y doctrina jurisprudencial
 """
 
-from typing import Dict, List, Optional
+import copy
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
+from .almacen_textos import CampoTextoMapeado, ProxyTextosMapeados
+from .grafo_citas import GrafoCitas, extraer_citas
+from .indice_prefijos import IndicePrefijos
+from .normalizacion import normalizar, tokenizar
+from .similitud import ModeloTFIDF
+from .snapshot import cargar_seccion
+
 
 @dataclass
 class Sentencia:
@@ -23,14 +33,160 @@ class Sentencia:
     palabras_clave: List[str]
 
 
+def _es_palabra_unica(consulta_norm: str) -> bool:
+    """Indica si la consulta normalizada es exactamente una palabra"""
+    return bool(consulta_norm) and tokenizar(consulta_norm, eliminar_stopwords=False) == [consulta_norm]
+
+
+class SentenciaMapeada(ProxyTextosMapeados, Sentencia):
+    """Sentencia cuyo resumen y doctrina residen en el almacén de textos mapeado"""
+    resumen = CampoTextoMapeado()
+    doctrina = CampoTextoMapeado()
+
+
 class Jurisprudencia:
     """
     Base de datos de jurisprudencia penal española
     Sentencias del TS, TC y Audiencias Provinciales relevantes
     """
 
-    def __init__(self):
-        self.sentencias = self._cargar_sentencias()
+    # Máximo de sentencias que se añaden desde la base importada en cada búsqueda
+    LIMITE_RESULTADOS_BD = 50
+
+    def __init__(self, usar_snapshot: bool = True, ruta_bd: Optional[str] = None):
+        """
+        Args:
+            usar_snapshot: Cargar la base precompilada si está vigente
+            ruta_bd: Base SQLite de sentencias importadas de CENDOJ
+                (knowledge.importador_cendoj). Por defecto se usa
+                RUTA_BD_JURISPRUDENCIA si existe.
+        """
+        datos = cargar_seccion("jurisprudencia") if usar_snapshot else None
+
+        if datos:
+            self.sentencias = datos["sentencias"]
+            self.__dict__.update(datos["indices"])
+        else:
+            self.sentencias = self._cargar_sentencias()
+            self._construir_indices()
+
+        self.base_importada = self._abrir_base_importada(ruta_bd)
+        self._grafo_citas_completo: Optional[GrafoCitas] = None
+        self._modelo_similitud: Optional[ModeloTFIDF] = None
+        # La instancia compartida del registro no admite altas (ver knowledge.registro)
+        self.solo_lectura = False
+
+    @staticmethod
+    def _abrir_base_importada(ruta_bd: Optional[str]):
+        """Abre la base de sentencias importadas, si existe"""
+        from .base_sentencias import BaseSentencias, RUTA_BD_JURISPRUDENCIA
+
+        ruta = ruta_bd or RUTA_BD_JURISPRUDENCIA
+        if ruta_bd is None and not os.path.exists(ruta):
+            return None
+        return BaseSentencias(ruta)
+
+    def _buscar_en_base_importada(self, consulta: str, resultados: List[Sentencia],
+                                  columnas: List[str] = None) -> List[Sentencia]:
+        """Completa los resultados con sentencias de la base importada"""
+        if self.base_importada is None:
+            return resultados
+
+        numeros = {sentencia.numero for sentencia in resultados}
+        for _, sentencia in self.base_importada.buscar(consulta, self.LIMITE_RESULTADOS_BD, columnas):
+            if sentencia.numero not in numeros:
+                numeros.add(sentencia.numero)
+                resultados.append(sentencia)
+        return resultados
+
+    def _construir_indices(self):
+        """Construye los índices por campo (materia, tipo penal y palabras clave)"""
+        self._claves: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._indice_materia = IndicePrefijos()
+        self._indice_tipo_penal = IndicePrefijos()
+        self._indice_palabras_clave = IndicePrefijos()
+        self._grafo_citas = GrafoCitas()
+
+        for clave, sentencia in self.sentencias.items():
+            self._indexar_sentencia(clave, sentencia)
+
+        # Autoridad precalculada (se guarda en el snapshot con el resto de índices)
+        self._grafo_citas.recalcular()
+
+    def estado_indices(self) -> Dict:
+        """Estado de los índices por campo, para serializarlo en el snapshot"""
+        return {
+            "_claves": self._claves,
+            "_ids": self._ids,
+            "_indice_materia": self._indice_materia,
+            "_indice_tipo_penal": self._indice_tipo_penal,
+            "_indice_palabras_clave": self._indice_palabras_clave,
+            "_grafo_citas": self._grafo_citas,
+        }
+
+    def _indexar_sentencia(self, clave: str, sentencia: Sentencia):
+        """Añade una sentencia a los índices por campo y al grafo de citas"""
+        doc_id = self._ids.get(clave)
+        if doc_id is None:
+            doc_id = self._ids[clave] = len(self._claves)
+            self._claves.append(clave)
+
+        self._indice_materia.agregar(doc_id, sentencia.materia)
+        self._indice_tipo_penal.agregar(doc_id, sentencia.tipo_penal)
+        for palabra in sentencia.palabras_clave:
+            self._indice_palabras_clave.agregar(doc_id, palabra)
+
+        self._grafo_citas.agregar(sentencia.numero,
+                                  extraer_citas(f"{sentencia.resumen} {sentencia.doctrina}"))
+
+    def _desindexar_sentencia(self, clave: str, sentencia: Sentencia):
+        """Retira de los índices por campo y del grafo de citas lo indexado para una sentencia"""
+        doc_id = self._ids[clave]
+        self._indice_materia.quitar(doc_id, sentencia.materia)
+        self._indice_tipo_penal.quitar(doc_id, sentencia.tipo_penal)
+        for palabra in sentencia.palabras_clave:
+            self._indice_palabras_clave.quitar(doc_id, palabra)
+        self._grafo_citas.quitar(sentencia.numero)
+
+    def agregar_sentencia(self, clave: str, sentencia: Sentencia):
+        """
+        Añade o reemplaza una sentencia y actualiza los índices
+
+        Al reemplazar, las entradas de la sentencia anterior se retiran antes de
+        indexar la nueva. La autoridad se recalcula de forma incremental en la
+        siguiente consulta; el modelo de similitud se descarta.
+
+        Raises:
+            TypeError: Si es la instancia compartida del registro
+        """
+        if self.solo_lectura:
+            raise TypeError("La jurisprudencia compartida es de solo lectura; use una Jurisprudencia propia")
+        anterior = self.sentencias.get(clave)
+        if anterior is not None:
+            self._desindexar_sentencia(clave, anterior)
+        self.sentencias[clave] = sentencia
+        self._indexar_sentencia(clave, sentencia)
+        # El modelo de similitud se reconstruye (o se carga, si su firma
+        # coincide) en la siguiente consulta
+        self._modelo_similitud = None
+        if self._grafo_citas_completo is not None:
+            if anterior is not None:
+                self._grafo_citas_completo.quitar(anterior.numero)
+            self._grafo_citas_completo.agregar(
+                sentencia.numero, extraer_citas(f"{sentencia.resumen} {sentencia.doctrina}")
+            )
+
+    def _candidatos(self, consulta: str, indices: List[IndicePrefijos]) -> List[Sentencia]:
+        """Sentencias candidatas según los índices, en orden de inserción"""
+        doc_ids = set()
+        for indice in indices:
+            candidatos = indice.candidatos(consulta)
+            if candidatos is None:
+                return list(self.sentencias.values())
+            doc_ids |= candidatos
+
+        return [self.sentencias[self._claves[doc_id]] for doc_id in sorted(doc_ids)]
 
     def _cargar_sentencias(self) -> Dict[str, Sentencia]:
         """Carga sentencias relevantes por materia"""
@@ -220,37 +376,58 @@ class Jurisprudencia:
 
         return sentencias
 
-    def buscar_por_materia(self, materia: str) -> List[Sentencia]:
-        """Busca sentencias por materia"""
-        resultados = []
-        materia_lower = materia.lower()
+    def buscar_por_materia(self, materia: str, por_autoridad: bool = False) -> List[Sentencia]:
+        """
+        Busca sentencias por materia
 
-        for sentencia in self.sentencias.values():
-            if (materia_lower in sentencia.materia.lower() or
-                materia_lower in sentencia.tipo_penal.lower() or
-                any(materia_lower in palabra for palabra in sentencia.palabras_clave)):
-                resultados.append(sentencia)
-
-        return resultados
-
-    def buscar_por_tipo_penal(self, tipo_penal: str) -> List[Sentencia]:
+        Args:
+            materia: Materia, tipo penal o palabra clave
+            por_autoridad: Ordenar por autoridad (citas recibidas) en lugar
+                de por orden de inserción y relevancia en la base importada
+        """
+        resultados = []
+        materia_norm = normalizar(materia)
+
+        # Los índices acotan los candidatos; la subcadena se verifica sobre ellos
+        candidatos = self._candidatos(materia, [
+            self._indice_materia, self._indice_tipo_penal, self._indice_palabras_clave
+        ])
+
+        # Una consulta de una sola palabra que prefija un token ya es subcadena
+        if _es_palabra_unica(materia_norm):
+            resultados = candidatos
+        else:
+            for sentencia in candidatos:
+                if (materia_norm in normalizar(sentencia.materia) or
+                    materia_norm in normalizar(sentencia.tipo_penal) or
+                    any(materia_norm in normalizar(palabra) for palabra in sentencia.palabras_clave)):
+                    resultados.append(sentencia)
+
+        resultados = self._buscar_en_base_importada(materia, resultados)
+        return self.ordenar_por_autoridad(resultados) if por_autoridad else resultados
+
+    def buscar_por_tipo_penal(self, tipo_penal: str, por_autoridad: bool = False) -> List[Sentencia]:
         """Busca sentencias sobre un tipo penal específico"""
-        return self.buscar_por_materia(tipo_penal)
+        return self.buscar_por_materia(tipo_penal, por_autoridad)
 
     def buscar_por_palabra_clave(self, palabra: str) -> List[Sentencia]:
         """Busca sentencias por palabra clave"""
         resultados = []
-        palabra_lower = palabra.lower()
+        palabra_norm = normalizar(palabra)
 
-        for sentencia in self.sentencias.values():
-            if any(palabra_lower in palabra_clave for palabra_clave in sentencia.palabras_clave):
-                resultados.append(sentencia)
+        candidatos = self._candidatos(palabra, [self._indice_palabras_clave])
+        if _es_palabra_unica(palabra_norm):
+            resultados = candidatos
+        else:
+            for sentencia in candidatos:
+                if any(palabra_norm in normalizar(palabra_clave) for palabra_clave in sentencia.palabras_clave):
+                    resultados.append(sentencia)
 
-        return resultados
+        return self._buscar_en_base_importada(palabra, resultados, ["palabras_clave"])
 
     def obtener_doctrina(self, materia: str) -> str:
-        """Obtiene la doctrina jurisprudencial consolidada sobre una materia"""
-        sentencias = self.buscar_por_materia(materia)
+        """Obtiene la doctrina jurisprudencial consolidada sobre una materia, de más a menos citada"""
+        sentencias = self.buscar_por_materia(materia, por_autoridad=True)
 
         if not sentencias:
             return f"No se encontró jurisprudencia específica sobre '{materia}'"
@@ -267,9 +444,151 @@ class Jurisprudencia:
 
         return doctrina_consolidada
 
+    def _ruta_modelo_similitud(self) -> Optional[str]:
+        """Fichero del modelo TF-IDF persistido junto a la base importada"""
+        return self.base_importada.ruta + ".tfidf" if self.base_importada is not None else None
+
+    def _firma_corpus(self):
+        """
+        Identifica el corpus actual para detectar modelos obsoletos
+
+        Incluye un resumen del texto de las sentencias en memoria, de modo
+        que reemplazar una sentencia con la misma clave también cambia la firma.
+        """
+        firma_bd = self.base_importada.firma() if self.base_importada is not None else None
+        contenido = hashlib.sha256()
+        for clave, sentencia in self.sentencias.items():
+            for parte in (clave, sentencia.resumen, sentencia.doctrina):
+                contenido.update(parte.encode("utf-8"))
+                contenido.update(b"\0")
+        return (len(self.sentencias), tuple(self.sentencias), firma_bd, contenido.hexdigest()[:16])
+
+    def _documentos_similitud(self):
+        """Recorre los pares (clave, resumen + doctrina) de todo el corpus"""
+        for clave, sentencia in self.sentencias.items():
+            yield clave, f"{sentencia.resumen} {sentencia.doctrina}"
+        if self.base_importada is not None:
+            yield from self.base_importada.iterar_textos()
+
+    def actualizar_modelo_similitud(self) -> ModeloTFIDF:
+        """Reconstruye el modelo TF-IDF del corpus y lo persiste junto a la base importada"""
+        firma = self._firma_corpus()
+        self._modelo_similitud = ModeloTFIDF.construir(self._documentos_similitud(), firma)
+        ruta = self._ruta_modelo_similitud()
+        if ruta:
+            self._modelo_similitud.guardar(ruta)
+        return self._modelo_similitud
+
+    @property
+    def modelo_similitud(self) -> ModeloTFIDF:
+        """Modelo TF-IDF del corpus (se carga del disco o se construye la primera vez)"""
+        modelo = self._modelo_similitud
+        if modelo is None:
+            ruta = self._ruta_modelo_similitud()
+            modelo = ModeloTFIDF.cargar(ruta, self._firma_corpus()) if ruta else None
+            if modelo is None:
+                return self.actualizar_modelo_similitud()
+            self._modelo_similitud = modelo
+        return modelo
+
+    def _ruta_grafo_citas(self) -> Optional[str]:
+        """Fichero del grafo de citas persistido junto a la base importada"""
+        return self.base_importada.ruta + ".citas" if self.base_importada is not None else None
+
+    def actualizar_grafo_citas(self) -> GrafoCitas:
+        """
+        Actualiza el grafo de citas con la base importada y lo persiste
+
+        Si hay un grafo persistido y desde entonces solo se han añadido
+        sentencias, se incorporan únicamente las nuevas y la autoridad se
+        recalcula partiendo de las puntuaciones anteriores. En otro caso
+        (sentencias reemplazadas o base distinta) se reconstruye.
+        """
+        firma = self._firma_corpus()
+        ruta = self._ruta_grafo_citas()
+        grafo = GrafoCitas.cargar(ruta) if ruta else None
+        desde_id = 0
+
+        if grafo is not None and grafo.firma is not None and grafo.firma[2] is not None:
+            total_previo, max_id_previo = grafo.firma[2]
+            nuevas = len(self.base_importada) - total_previo
+            if nuevas == self.base_importada.contar(desde_id=max_id_previo):
+                desde_id = max_id_previo
+            else:
+                grafo = None
+
+        if grafo is None:
+            grafo = copy.deepcopy(self._grafo_citas)
+
+        for sentencia in self.sentencias.values():
+            grafo.agregar(sentencia.numero, extraer_citas(f"{sentencia.resumen} {sentencia.doctrina}"))
+        if self.base_importada is not None:
+            for numero, citas in self.base_importada.iterar_citas(desde_id):
+                grafo.agregar(numero, citas)
+
+        grafo.recalcular()
+        grafo.firma = firma
+        if ruta:
+            grafo.guardar(ruta)
+        self._grafo_citas_completo = grafo
+        return grafo
+
+    @property
+    def grafo_citas(self) -> GrafoCitas:
+        """Grafo de citas de todo el corpus, incluida la base importada"""
+        if self.base_importada is None:
+            return self._grafo_citas
+
+        grafo = self._grafo_citas_completo
+        if grafo is None:
+            ruta = self._ruta_grafo_citas()
+            grafo = GrafoCitas.cargar(ruta, self._firma_corpus())
+            if grafo is None:
+                return self.actualizar_grafo_citas()
+            self._grafo_citas_completo = grafo
+        return grafo
+
+    def autoridad(self, sentencia: Sentencia) -> float:
+        """Puntuación de autoridad de una sentencia según las citas que recibe"""
+        return self.grafo_citas.autoridad(sentencia.numero)
+
+    def ordenar_por_autoridad(self, sentencias: List[Sentencia]) -> List[Sentencia]:
+        """Ordena las sentencias de más a menos autoridad (estable ante empates)"""
+        grafo = self.grafo_citas
+        return sorted(sentencias, key=lambda sentencia: -grafo.autoridad(sentencia.numero))
+
+    def obtener_sentencia(self, clave: str) -> Optional[Sentencia]:
+        """Obtiene una sentencia por clave (base en memoria o importada)"""
+        sentencia = self.sentencias.get(clave)
+        if sentencia is None and self.base_importada is not None:
+            sentencia = self.base_importada.obtener(clave)
+        return sentencia
+
+    def similares(self, texto_o_clave: str, k: int = 5) -> List[Tuple[Sentencia, float]]:
+        """
+        Sentencias más parecidas a una sentencia o a un relato de hechos
+
+        Args:
+            texto_o_clave: Clave de una sentencia del corpus (p. ej. "STS_234/2021")
+                o texto libre con los hechos
+            k: Número de resultados
+
+        Returns:
+            Lista de (sentencia, similitud coseno) de mayor a menor
+        """
+        modelo = self.modelo_similitud
+        doc = modelo.indice_de(texto_o_clave)
+
+        if doc is not None:
+            resultados = modelo.similares(modelo.vector_documento(doc), k, excluir=doc)
+        else:
+            resultados = modelo.similares(modelo.vector_texto(texto_o_clave), k)
+
+        return [(self.obtener_sentencia(clave), similitud) for clave, similitud in resultados]
+
     def generar_cita_jurisprudencial(self, clave_sentencia: str) -> str:
         """Genera una cita formal de una sentencia"""
-        sentencia = self.sentencias.get(clave_sentencia)
+        sentencia = self.obtener_sentencia(clave_sentencia)
         if not sentencia:
             return ""
 
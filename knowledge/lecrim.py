@@ -6,6 +6,8 @@ Procedimientos penales, plazos, recursos y tramitación
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+from .snapshot import cargar_seccion
+
 
 @dataclass
 class FaseProcesal:
@@ -36,10 +38,17 @@ class LECrim:
     Procedimientos, plazos y recursos procesales
     """
 
-    def __init__(self):
-        self.fases = self._cargar_fases()
-        self.recursos = self._cargar_recursos()
-        self.plazos = self._cargar_plazos()
+    def __init__(self, usar_snapshot: bool = True):
+        datos = cargar_seccion("lecrim") if usar_snapshot else None
+
+        if datos:
+            self.fases = datos["fases"]
+            self.recursos = datos["recursos"]
+            self.plazos = datos["plazos"]
+        else:
+            self.fases = self._cargar_fases()
+            self.recursos = self._cargar_recursos()
+            self.plazos = self._cargar_plazos()
 
     def _cargar_fases(self) -> Dict[str, FaseProcesal]:
         """Carga las fases del procedimiento penal"""
@@ -0,0 +1,181 @@
+"""
+Normalización de Texto Jurídico
+Plegado de acentos, tokenización, palabras vacías del español y búsqueda de términos por palabra completa
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from .automata import AutomataAhoCorasick
+
+
+STOPWORDS_ES = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aquel aquella aquellas
+aquello aquellos aqui asi aun aunque bajo bien cada como con contra cual cuales
+cualquier cuando de del desde donde dos e el ella ellas ello ellos en entre era
+eran es esa esas ese eso esos esta estaba estado estan estar estas este esto estos
+fue fueron ha haber habia han hasta hay la las le les lo los mas me mi mientras
+muy nada ni no nos o otra otras otro otros para pero poco por porque que quien
+quienes se segun ser si sido sin sino sobre solo su sus tal tambien tan tanto
+te tiene tienen todo todos tras tu u un una unas uno unos y ya
+""".split())
+
+_PATRON_TOKEN = re.compile(r"\w+")
+
+
+def _construir_tabla_plegado() -> Dict[int, str]:
+    """Tabla de traducción de letras latinas acentuadas a su forma base (salvo ñ/Ñ)"""
+    tabla = {}
+    for codigo in range(0xC0, 0x250):
+        caracter = chr(codigo)
+        if caracter in "ñÑ":
+            continue
+        base = "".join(c for c in unicodedata.normalize("NFD", caracter)
+                       if not unicodedata.combining(c))
+        if base and base != caracter:
+            tabla[codigo] = base
+    return tabla
+
+
+_TABLA_PLEGADO = _construir_tabla_plegado()
+
+
+def plegar_acentos(texto: str) -> str:
+    """Elimina tildes y diéresis conservando la 'ñ' ('agresión' -> 'agresion')"""
+    return texto.translate(_TABLA_PLEGADO)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y plegado de acentos"""
+    return plegar_acentos(texto.lower())
+
+
+def tokenizar(texto: str, eliminar_stopwords: bool = True) -> List[str]:
+    """Tokeniza un texto normalizado en palabras, opcionalmente sin palabras vacías"""
+    tokens = _PATRON_TOKEN.findall(normalizar(texto))
+    if eliminar_stopwords:
+        return [t for t in tokens if t not in STOPWORDS_ES]
+    return tokens
+
+
+@lru_cache(maxsize=4096)
+def _tokens_termino(termino: str) -> Tuple[str, ...]:
+    """Tokens normalizados de un término de búsqueda"""
+    return tuple(_PATRON_TOKEN.findall(normalizar(termino)))
+
+
+def _frase(tokens: Iterable[str]) -> str:
+    """Secuencia de tokens delimitada por espacios, para buscar locuciones como subcadena"""
+    return " " + " ".join(tokens) + " "
+
+
+@dataclass(frozen=True)
+class DocumentoNormalizado:
+    """
+    Texto normalizado una sola vez para todas las consultas posteriores
+
+    Conserva las palabras vacías para poder buscar locuciones ('acabar con la
+    vida'). Las posiciones son (inicio, fin) de cada token en el texto
+    normalizado, que coinciden con las del original salvo en caracteres cuya
+    minúscula cambia de longitud.
+
+    Los términos se buscan como palabras completas (o secuencias de palabras)
+    sin tildes ni mayúsculas, sin raíces ni prefijos: cada forma admitida de
+    un término ('confeso', 'confesion') debe figurar en la lista que se busca.
+    Así 'sufria' no encuentra 'sufrimiento' ni 'reconocimiento' encuentra
+    'reconocer'.
+    """
+    texto: str
+    tokens: Tuple[str, ...]
+    posiciones: Tuple[Tuple[int, int], ...]
+    conjunto_tokens: FrozenSet[str]
+    _frase_tokens: str
+
+    @classmethod
+    def desde_texto(cls, texto: str) -> "DocumentoNormalizado":
+        """Normaliza y tokeniza el texto"""
+        normalizado = normalizar(texto)
+        tokens, posiciones = [], []
+        for coincidencia in _PATRON_TOKEN.finditer(normalizado):
+            tokens.append(coincidencia.group())
+            posiciones.append(coincidencia.span())
+        return cls(
+            texto=normalizado,
+            tokens=tuple(tokens),
+            posiciones=tuple(posiciones),
+            conjunto_tokens=frozenset(tokens),
+            _frase_tokens=_frase(tokens),
+        )
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def contiene(self, termino: str) -> bool:
+        """Si el término aparece en el texto como palabra completa o, si es una locución, como secuencia de palabras"""
+        tokens = _tokens_termino(termino)
+        if not tokens:
+            return False
+        if len(tokens) > 1:
+            return _frase(tokens) in self._frase_tokens
+        return tokens[0] in self.conjunto_tokens
+
+    def contiene_alguno(self, terminos: Iterable[str]) -> bool:
+        """Si aparece alguno de los términos"""
+        return any(self.contiene(termino) for termino in terminos)
+
+
+@dataclass(frozen=True)
+class ConjuntoTerminos:
+    """
+    Términos precompilados como palabras sueltas y locuciones
+
+    Comprobar si alguno aparece en un documento es una intersección de
+    conjuntos de palabras más, en su caso, la búsqueda de las pocas locuciones.
+    Aplica la misma regla que DocumentoNormalizado.contiene.
+    """
+    palabras: FrozenSet[str]
+    frases: Tuple[str, ...] = ()
+
+    @classmethod
+    def desde_terminos(cls, terminos: Iterable[str]) -> "ConjuntoTerminos":
+        """Compila palabras y locuciones"""
+        palabras, frases = set(), []
+        for termino in terminos:
+            tokens = _tokens_termino(termino)
+            if len(tokens) == 1:
+                palabras.add(tokens[0])
+            elif tokens:
+                frases.append(_frase(tokens))
+        return cls(frozenset(palabras), tuple(frases))
+
+    def presente_en(self, documento: DocumentoNormalizado) -> bool:
+        """Si alguno de los términos aparece en el documento"""
+        return (not self.palabras.isdisjoint(documento.conjunto_tokens)
+                or any(frase in documento._frase_tokens for frase in self.frases))
+
+
+class BuscadorTerminos:
+    """
+    Conjunto fijo de términos compilado para buscarlos todos de una vez
+
+    Aplica la misma regla que DocumentoNormalizado.contiene, pero con un único
+    autómata sobre la secuencia de tokens del documento: el coste de una
+    búsqueda depende de la longitud del texto, no del número de términos.
+    """
+
+    def __init__(self, terminos: Iterable[str]):
+        self.terminos: List[str] = list(terminos)
+        patrones, self._termino_de_patron = [], []
+        for indice, termino in enumerate(self.terminos):
+            tokens = _tokens_termino(termino)
+            if tokens:
+                patrones.append(_frase(tokens))
+                self._termino_de_patron.append(indice)
+        self._automata = AutomataAhoCorasick(patrones)
+
+    def buscar(self, documento: DocumentoNormalizado) -> Set[int]:
+        """Índices (en self.terminos) de los términos presentes en el documento"""
+        return {self._termino_de_patron[p] for p in self._automata.buscar(documento._frase_tokens)}
@@ -0,0 +1,303 @@
+"""
+Determinación de la Pena
+Representación numérica de los marcos penales y reglas de los arts. 66, 68 y 70 CP
+"""
+
+import re
+from array import array
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# Cómputo en días con meses de 30 días y años de 12 meses, de modo que las
+# duraciones resultantes se expresan de nuevo sin restos artificiales
+DIAS_MES = 30
+DIAS_ANIO = 12 * DIAS_MES
+
+PRISION = "prision"
+MULTA = "multa"
+TRABAJOS_COMUNIDAD = "trabajos_beneficio_comunidad"
+PRIVACION_DERECHO = "privacion_derecho"
+
+_CLASES_POR_PALABRA = [
+    ("multa", MULTA),
+    ("tbc", TRABAJOS_COMUNIDAD),
+    ("trabajos", TRABAJOS_COMUNIDAD),
+    ("privaci", PRIVACION_DERECHO),
+    ("prisi", PRISION),
+]
+
+_UNIDADES = {"año": DIAS_ANIO, "años": DIAS_ANIO, "mes": DIAS_MES, "meses": DIAS_MES, "día": 1, "días": 1}
+
+_RE_SEGMENTO = re.compile(r"\s+o\s+|,|\+")
+_RE_DURACION = re.compile(r"(\d+)(?:\s*-\s*(\d+))?\s*(años|año|meses|mes|días|día)\b")
+
+
+@dataclass(frozen=True)
+class MarcoPenal:
+    """
+    Marco de una clase de pena
+
+    La duración se expresa en días; en la multa, en cuotas diarias
+    (días-multa), de modo que "multa de 6 meses" son 180 cuotas.
+    """
+    clase: str
+    minimo: int
+    maximo: int
+
+    def superior_en_grado(self) -> "MarcoPenal":
+        """Pena superior en grado (art. 70.1.1ª): del máximo + 1 día al máximo incrementado en su mitad"""
+        return replace(self, minimo=self.maximo + 1, maximo=self.maximo + self.maximo // 2)
+
+    def inferior_en_grado(self) -> "MarcoPenal":
+        """Pena inferior en grado (art. 70.1.2ª): de la mitad del mínimo al mínimo - 1 día"""
+        return replace(self, minimo=max(1, self.minimo // 2), maximo=max(1, self.minimo - 1))
+
+    def mitad_inferior(self) -> "MarcoPenal":
+        """Mitad inferior del marco (art. 66.1.1ª)"""
+        return replace(self, maximo=(self.minimo + self.maximo) // 2)
+
+    def mitad_superior(self) -> "MarcoPenal":
+        """Mitad superior del marco (art. 66.1.3ª)"""
+        return replace(self, minimo=(self.minimo + self.maximo + 1) // 2)
+
+    def _cantidad(self, valor: int) -> str:
+        """Un extremo del marco expresado con su unidad"""
+        if self.clase == MULTA:
+            return f"multa de {valor} cuotas diarias"
+        if self.clase == TRABAJOS_COMUNIDAD:
+            return f"{valor} días de trabajos en beneficio de la comunidad"
+        nombre = "prisión" if self.clase == PRISION else "privación del derecho"
+        return f"{formatear_duracion(valor)} de {nombre}"
+
+    def extremos(self) -> Tuple[str, str]:
+        """Mínimo y máximo del marco expresados con su unidad"""
+        return self._cantidad(self.minimo), self._cantidad(self.maximo)
+
+    def describir(self) -> str:
+        """Descripción legible del marco"""
+        if self.clase == MULTA:
+            return f"multa de {self.minimo} a {self.maximo} cuotas diarias"
+        if self.clase == TRABAJOS_COMUNIDAD:
+            return f"trabajos en beneficio de la comunidad de {self.minimo} a {self.maximo} días"
+        nombre = "prisión" if self.clase == PRISION else "privación del derecho"
+        return f"{nombre} de {formatear_duracion(self.minimo)} a {formatear_duracion(self.maximo)}"
+
+
+@dataclass(frozen=True)
+class PenaCalculada:
+    """Resultado de aplicar las reglas de determinación de la pena a un tipo"""
+    marcos: Tuple[MarcoPenal, ...]
+    reglas: Tuple[str, ...]
+
+    def marco(self, clase: str = PRISION) -> Optional[MarcoPenal]:
+        """Marco resultante de una clase de pena"""
+        return next((m for m in self.marcos if m.clase == clase), None)
+
+    def describir(self) -> str:
+        """Descripción legible de todos los marcos"""
+        return "; ".join(marco.describir() for marco in self.marcos)
+
+
+def formatear_duracion(dias: int) -> str:
+    """Expresa una duración en días como años, meses y días"""
+    anios, resto = divmod(dias, DIAS_ANIO)
+    meses, dias = divmod(resto, DIAS_MES)
+    partes = []
+    if anios:
+        partes.append(f"{anios} año" + ("s" if anios > 1 else ""))
+    if meses:
+        partes.append(f"{meses} mes" + ("es" if meses > 1 else ""))
+    if dias or not partes:
+        partes.append(f"{dias} día" + ("s" if dias != 1 else ""))
+    return partes[0] if len(partes) == 1 else ", ".join(partes[:-1]) + " y " + partes[-1]
+
+
+def _duraciones_por_clase(texto: str) -> Dict[str, List[int]]:
+    """Duraciones (en días) mencionadas en un texto de pena, agrupadas por clase"""
+    duraciones: Dict[str, List[int]] = {}
+
+    for segmento in _RE_SEGMENTO.split(texto.lower()):
+        # Un segmento sin clase explícita ("o 3-6 años") es de prisión
+        clase = next((c for palabra, c in _CLASES_POR_PALABRA if palabra in segmento), PRISION)
+        for desde, hasta, unidad in _RE_DURACION.findall(segmento):
+            dias = _UNIDADES[unidad]
+            duraciones.setdefault(clase, []).append(int(desde) * dias)
+            if hasta:
+                duraciones[clase].append(int(hasta) * dias)
+
+    return duraciones
+
+
+def interpretar_pena(pena_minima: str, pena_maxima: str) -> Tuple[MarcoPenal, ...]:
+    """
+    Convierte los textos de pena mínima y máxima de un tipo en marcos numéricos
+
+    Cada clase de pena mencionada (prisión, multa, TBC, privación de derechos)
+    da lugar a un marco: el mínimo es la menor duración del texto de pena mínima
+    y el máximo la mayor del texto de pena máxima. Las menciones sin duración
+    ("+ multa", "privación armas") se omiten.
+    """
+    minimas = _duraciones_por_clase(pena_minima)
+    maximas = _duraciones_por_clase(pena_maxima)
+
+    marcos = []
+    for clase in list(minimas) + [c for c in maximas if c not in minimas]:
+        valores_min = minimas.get(clase) or maximas[clase]
+        valores_max = maximas.get(clase) or minimas[clase]
+        minimo, maximo = min(valores_min), max(valores_max)
+        marcos.append(MarcoPenal(clase, minimo, max(minimo, maximo)))
+    return tuple(marcos)
+
+
+def _rebajar_uno_o_dos_grados(marco: MarcoPenal) -> MarcoPenal:
+    """Rango que cubre la pena inferior en uno o en dos grados"""
+    un_grado = marco.inferior_en_grado()
+    dos_grados = un_grado.inferior_en_grado()
+    return replace(marco, minimo=dos_grados.minimo, maximo=un_grado.maximo)
+
+
+def aplicar_reglas(marcos: Tuple[MarcoPenal, ...], atenuantes: int, agravantes: int,
+                   eximentes_incompletas: int = 0) -> PenaCalculada:
+    """
+    Aplica las reglas de determinación de la pena
+
+    Args:
+        marcos: Marcos penales del tipo
+        atenuantes: Número de atenuantes genéricas (art. 21.2ª a 7ª)
+        agravantes: Número de agravantes (art. 22)
+        eximentes_incompletas: Eximentes incompletas (art. 21.1ª), que rebajan
+            la pena en uno o dos grados (art. 68) antes de aplicar el art. 66
+
+    La concurrencia de atenuantes y agravantes (art. 66.1.7ª) se resuelve
+    compensándolas por número; la valoración cualitativa queda al tribunal.
+    """
+    reglas = []
+
+    if eximentes_incompletas:
+        marcos = tuple(_rebajar_uno_o_dos_grados(m) for m in marcos)
+        reglas.append("Art. 68: inferior en uno o dos grados por eximente incompleta")
+
+    if atenuantes and agravantes:
+        reglas.append("Art. 66.1.7ª: compensación racional de atenuantes y agravantes")
+        atenuantes, agravantes = max(atenuantes - agravantes, 0), max(agravantes - atenuantes, 0)
+
+    if atenuantes == 1:
+        marcos = tuple(m.mitad_inferior() for m in marcos)
+        reglas.append("Art. 66.1.1ª: mitad inferior")
+    elif atenuantes >= 2:
+        marcos = tuple(_rebajar_uno_o_dos_grados(m) for m in marcos)
+        reglas.append("Art. 66.1.2ª: inferior en uno o dos grados")
+    elif agravantes in (1, 2):
+        marcos = tuple(m.mitad_superior() for m in marcos)
+        reglas.append("Art. 66.1.3ª: mitad superior")
+    elif agravantes >= 3:
+        marcos = tuple(m.superior_en_grado().mitad_inferior() for m in marcos)
+        reglas.append("Art. 66.1.4ª: superior en grado, en su mitad inferior")
+    elif not reglas:
+        reglas.append("Art. 66.1.6ª: extensión completa del marco")
+
+    return PenaCalculada(marcos=marcos, reglas=tuple(reglas))
+
+
+class TablaEscenariosPena:
+    """
+    Marcos penales resultantes para cada combinación de circunstancias candidatas
+
+    Cada combinación se codifica como máscara de bits sobre `circunstancias`
+    (el bit i indica que se aprecia circunstancias[i]). Por máscara solo se
+    guarda el índice del resultado en `resultados`, que contiene los cálculos
+    distintos: las reglas dependen del número de circunstancias de cada clase,
+    no de cuáles sean, y muchas combinaciones comparten marco.
+    """
+
+    def __init__(self, tipo: str, circunstancias: Sequence[str],
+                 indices: array, resultados: List[PenaCalculada]):
+        self.tipo = tipo
+        self.circunstancias = tuple(circunstancias)
+        self.indices = indices
+        self.resultados = resultados
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def mascara(self, claves: Iterable[str]) -> int:
+        """Máscara de una combinación de claves (las que no son candidatas se ignoran)"""
+        claves = set(claves)
+        return sum(1 << i for i, clave in enumerate(self.circunstancias) if clave in claves)
+
+    def circunstancias_de(self, mascara: int) -> Tuple[str, ...]:
+        """Claves apreciadas en una máscara"""
+        return tuple(clave for i, clave in enumerate(self.circunstancias) if mascara >> i & 1)
+
+    def pena(self, mascara: int) -> PenaCalculada:
+        """Pena resultante de una combinación"""
+        return self.resultados[self.indices[mascara]]
+
+    def filas(self) -> Iterator[Tuple[int, PenaCalculada]]:
+        """Recorre las combinaciones como (máscara, pena)"""
+        for mascara, indice in enumerate(self.indices):
+            yield mascara, self.resultados[indice]
+
+    def extremos(self, clase: str = PRISION) -> Tuple[int, int]:
+        """Máscaras de la combinación más favorable y de la más gravosa para una clase de pena"""
+        def clave_orden(mascara):
+            marco = self.pena(mascara).marco(clase)
+            return (marco.maximo, marco.minimo) if marco else (0, 0)
+        mascaras = range(len(self.indices))
+        return min(mascaras, key=clave_orden), max(mascaras, key=clave_orden)
+
+    def formatear(self, nombres: Dict[str, str] = None, clase: str = PRISION) -> str:
+        """
+        Tabla de texto con una fila por combinación
+
+        Args:
+            nombres: Nombre a mostrar por clave de circunstancia
+            clase: Clase de pena cuyo marco se muestra
+        """
+        nombres = nombres or {}
+        columnas = [nombres.get(clave, clave) for clave in self.circunstancias]
+        anchos = [max(len(col), 3) for col in columnas]
+
+        lineas = [" | ".join(col.ljust(ancho) for col, ancho in zip(columnas, anchos)) + " | Pena"]
+        lineas.append("-+-".join("-" * ancho for ancho in anchos) + "-+-" + "-" * 30)
+        for mascara, pena in self.filas():
+            marcas = ["✓" if mascara >> i & 1 else "" for i in range(len(self.circunstancias))]
+            marco = pena.marco(clase)
+            lineas.append(
+                " | ".join(marca.ljust(ancho) for marca, ancho in zip(marcas, anchos)) +
+                " | " + (marco.describir() if marco else pena.describir())
+            )
+        return "\n".join(lineas)
+
+
+def _contar_bits(valor: int) -> int:
+    """Número de bits a 1"""
+    return bin(valor).count("1")
+
+
+def construir_escenarios(tipo: str, marcos: Tuple[MarcoPenal, ...], circunstancias: Sequence[str],
+                         mascara_atenuantes: int, mascara_agravantes: int,
+                         mascara_incompletas: int) -> TablaEscenariosPena:
+    """
+    Calcula la tabla de escenarios de un tipo
+
+    Las máscaras de clase indican qué bits son atenuantes, agravantes y
+    eximentes incompletas. Cada combinación se reduce a sus recuentos por
+    clase y las reglas se aplican una sola vez por recuento distinto.
+    """
+    resultados: List[PenaCalculada] = []
+    posiciones: Dict[Tuple[int, int, int], int] = {}
+    indices = array("H")
+
+    for mascara in range(1 << len(circunstancias)):
+        recuento = (_contar_bits(mascara & mascara_atenuantes),
+                    _contar_bits(mascara & mascara_agravantes),
+                    _contar_bits(mascara & mascara_incompletas))
+        posicion = posiciones.get(recuento)
+        if posicion is None:
+            posicion = posiciones[recuento] = len(resultados)
+            resultados.append(aplicar_reglas(marcos, *recuento))
+        indices.append(posicion)
+
+    return TablaEscenariosPena(tipo, circunstancias, indices, resultados)
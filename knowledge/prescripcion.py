@@ -0,0 +1,252 @@
+"""
+Prescripción del Delito
+Interpretación de los plazos y cómputo de la fecha de prescripción (arts. 131 y 132 CP)
+"""
+
+import re
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+
+FORMATOS_FECHA = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%y")
+
+_RE_PLAZO = re.compile(r"(\d+)(?:\s*-\s*(\d+))?\s*(años|año|meses|mes)\b")
+
+Fecha = Union[date, str]
+Periodo = Tuple[Fecha, Fecha]
+
+
+@dataclass(frozen=True)
+class PlazoPrescripcion:
+    """
+    Plazo de prescripción en meses
+
+    Algunos tipos tienen un plazo que depende de la modalidad ("5-10 años");
+    en ese caso mínimo y máximo difieren.
+    """
+    minimo_meses: int
+    maximo_meses: int
+
+    def describir(self) -> str:
+        """Descripción legible del plazo"""
+        def meses_a_texto(meses):
+            if meses % 12 == 0:
+                anios = meses // 12
+                return f"{anios} año" + ("s" if anios != 1 else "")
+            return f"{meses} mes" + ("es" if meses != 1 else "")
+        if self.minimo_meses == self.maximo_meses:
+            return meses_a_texto(self.minimo_meses)
+        return f"{meses_a_texto(self.minimo_meses)} a {meses_a_texto(self.maximo_meses)}"
+
+
+@dataclass(frozen=True)
+class ResultadoPrescripcion:
+    """Cómputo de la prescripción de un delito"""
+    plazo: PlazoPrescripcion
+    inicio_computo: date
+    dias_suspendidos: int
+    fecha_prescripcion_minima: date
+    fecha_prescripcion_maxima: date
+    fecha_referencia: date
+
+    @property
+    def estado(self) -> str:
+        """Estado de la prescripción a la fecha de referencia"""
+        if self.fecha_referencia >= self.fecha_prescripcion_maxima:
+            return "Prescrito"
+        if self.fecha_referencia >= self.fecha_prescripcion_minima:
+            return "Posiblemente prescrito (depende del plazo aplicable a la modalidad)"
+        dias = (self.fecha_prescripcion_minima - self.fecha_referencia).days
+        return f"No prescrito (quedan {dias} días)"
+
+    def describir_fecha(self) -> str:
+        """Fecha (o intervalo de fechas) de prescripción"""
+        minima = self.fecha_prescripcion_minima.strftime("%d/%m/%Y")
+        if self.fecha_prescripcion_minima == self.fecha_prescripcion_maxima:
+            return minima
+        return f"entre {minima} y {self.fecha_prescripcion_maxima.strftime('%d/%m/%Y')}"
+
+
+def interpretar_plazo(texto: str) -> Optional[PlazoPrescripcion]:
+    """Convierte un plazo textual ("15 años", "5-10 años") en meses; None si no contiene plazo"""
+    valores = []
+    for desde, hasta, unidad in _RE_PLAZO.findall(texto.lower()):
+        factor = 12 if unidad.startswith("a") else 1
+        valores.append(int(desde) * factor)
+        if hasta:
+            valores.append(int(hasta) * factor)
+    if not valores:
+        return None
+    return PlazoPrescripcion(min(valores), max(valores))
+
+
+def interpretar_fecha(valor: Fecha) -> Optional[date]:
+    """Acepta una fecha o un texto DD/MM/AAAA (también AAAA-MM-DD); None si no es válida"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = (valor or "").strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def sumar_meses(fecha: date, meses: int) -> date:
+    """Suma meses de fecha a fecha (el 29/02 pasa al último día del mes si no existe)"""
+    indice = fecha.month - 1 + meses
+    anio, mes = fecha.year + indice // 12, indice % 12 + 1
+    return date(anio, mes, min(fecha.day, monthrange(anio, mes)[1]))
+
+
+def _fusionar_periodos(periodos: Iterable[Periodo]) -> List[Tuple[date, date]]:
+    """Periodos válidos ordenados, con los que se solapan o se tocan fusionados"""
+    validos = []
+    for desde, hasta in periodos:
+        desde, hasta = interpretar_fecha(desde), interpretar_fecha(hasta)
+        if desde and hasta and hasta > desde:
+            validos.append((desde, hasta))
+
+    fusionados: List[Tuple[date, date]] = []
+    for desde, hasta in sorted(validos):
+        if fusionados and desde <= fusionados[-1][1]:
+            fusionados[-1] = (fusionados[-1][0], max(fusionados[-1][1], hasta))
+        else:
+            fusionados.append((desde, hasta))
+    return fusionados
+
+
+def _vencimiento(inicio: date, meses: int, suspensiones: Sequence[Tuple[date, date]]) -> Tuple[date, int]:
+    """
+    Fecha en que vence un plazo que empieza a correr en `inicio`
+
+    Una suspensión solo cuenta si empieza antes de que el plazo haya vencido
+    (contando las suspensiones anteriores), y solo por sus días posteriores
+    al inicio.
+
+    Returns:
+        (fecha de vencimiento, días suspendidos)
+    """
+    vencimiento = sumar_meses(inicio, meses)
+    dias_suspendidos = 0
+    for desde, hasta in suspensiones:
+        if hasta <= inicio:
+            continue
+        desde = max(desde, inicio)
+        if desde >= vencimiento:
+            break
+        dias = (hasta - desde).days
+        dias_suspendidos += dias
+        vencimiento = date.fromordinal(vencimiento.toordinal() + dias)
+    return vencimiento, dias_suspendidos
+
+
+def _computar(meses: int, fecha_hechos: date, interrupciones: Sequence[date],
+              suspensiones: Sequence[Tuple[date, date]]) -> Tuple[date, date, int]:
+    """
+    Cómputo de un plazo con sus interrupciones y suspensiones
+
+    Las interrupciones se aplican por orden de fecha y solo mientras el plazo
+    en curso no ha vencido: una vez prescrito el delito, un acto posterior ya
+    no reinicia el cómputo.
+
+    Returns:
+        (inicio del cómputo, fecha de prescripción, días suspendidos)
+    """
+    inicio = fecha_hechos
+    vencimiento, dias_suspendidos = _vencimiento(inicio, meses, suspensiones)
+    for interrupcion in interrupciones:
+        if interrupcion <= inicio:
+            continue
+        if interrupcion >= vencimiento:
+            break
+        inicio = interrupcion
+        vencimiento, dias_suspendidos = _vencimiento(inicio, meses, suspensiones)
+    return inicio, vencimiento, dias_suspendidos
+
+
+def calcular(plazo: PlazoPrescripcion, fecha_hechos: date,
+             interrupciones: Iterable[Fecha] = (), suspensiones: Iterable[Periodo] = (),
+             fecha_referencia: Optional[date] = None) -> ResultadoPrescripcion:
+    """
+    Calcula la fecha de prescripción del delito
+
+    Args:
+        plazo: Plazo de prescripción del tipo
+        fecha_hechos: Día de comisión, desde el que se computa el plazo (art. 132.1)
+        interrupciones: Fechas en que el procedimiento contra el responsable se
+            paraliza o termina sin condena; el plazo se reinicia desde cada una
+            de ellas, salvo que el delito ya hubiera prescrito (art. 132.2)
+        suspensiones: Periodos (inicio, fin) que no computan, como el que media
+            desde la presentación de la querella o denuncia hasta su admisión
+            (art. 132.2.1ª). Solo cuentan los días posteriores al inicio del
+            cómputo y anteriores a la prescripción; los periodos solapados se
+            cuentan una sola vez.
+        fecha_referencia: Fecha a la que se evalúa el estado (hoy por defecto)
+
+    El cómputo se hace por separado para el plazo mínimo y el máximo; el
+    inicio del cómputo y los días suspendidos del resultado son los del
+    plazo mínimo.
+    """
+    fechas_interrupcion = sorted(f for f in (interpretar_fecha(i) for i in interrupciones) if f)
+    periodos = _fusionar_periodos(suspensiones)
+
+    inicio, fecha_minima, dias_suspendidos = _computar(
+        plazo.minimo_meses, fecha_hechos, fechas_interrupcion, periodos)
+    if plazo.maximo_meses == plazo.minimo_meses:
+        fecha_maxima = fecha_minima
+    else:
+        _, fecha_maxima, _ = _computar(plazo.maximo_meses, fecha_hechos, fechas_interrupcion, periodos)
+
+    return ResultadoPrescripcion(
+        plazo=plazo,
+        inicio_computo=inicio,
+        dias_suspendidos=dias_suspendidos,
+        fecha_prescripcion_minima=fecha_minima,
+        fecha_prescripcion_maxima=fecha_maxima,
+        fecha_referencia=fecha_referencia or date.today(),
+    )
+
+
+def calcular_lote(plazos: Dict[str, PlazoPrescripcion],
+                  filas: Iterable[Sequence], fecha_referencia: Optional[date] = None
+                  ) -> List[Optional[ResultadoPrescripcion]]:
+    """
+    Calcula la prescripción de muchos asuntos en una sola pasada
+
+    Args:
+        plazos: Plazo por clave de tipo penal
+        filas: Secuencias (tipo, fecha_hechos[, interrupciones[, suspensiones]])
+        fecha_referencia: Fecha común a la que se evalúa el estado
+
+    Returns:
+        Un resultado por fila, en el mismo orden; None si el tipo o la fecha
+        de los hechos no son válidos
+    """
+    fecha_referencia = fecha_referencia or date.today()
+    fechas: Dict[Fecha, Optional[date]] = {}
+    resultados = []
+
+    def fecha_de(valor):
+        # Las fechas textuales se repiten mucho entre asuntos: se interpretan una vez
+        if valor not in fechas:
+            fechas[valor] = interpretar_fecha(valor)
+        return fechas[valor]
+
+    for fila in filas:
+        plazo = plazos.get(fila[0])
+        fecha = fecha_de(fila[1])
+        if plazo is None or fecha is None:
+            resultados.append(None)
+            continue
+
+        interrupciones = [fecha_de(f) for f in fila[2]] if len(fila) > 2 else ()
+        suspensiones = [(fecha_de(d), fecha_de(h)) for d, h in fila[3]] if len(fila) > 3 else ()
+        resultados.append(calcular(plazo, fecha, interrupciones, suspensiones, fecha_referencia))
+
+    return resultados
@@ -0,0 +1,84 @@
+"""
+Numeración y Remisiones entre Artículos
+Orden natural de los números de artículo (bis, ter...), rangos y remisiones en el texto
+"""
+
+import re
+import sys
+from typing import List, Optional, Tuple
+
+
+# Sufijos latinos de los artículos intercalados, en su orden
+SUFIJOS = ["bis", "ter", "quater", "quinquies", "sexies", "septies", "octies", "nonies", "decies"]
+_ORDEN_SUFIJO = {sufijo: posicion for posicion, sufijo in enumerate(SUFIJOS, 1)}
+
+_PATRON_NUMERO = r"\d+(?:\s*(?:" + "|".join(SUFIJOS) + r")\b)?"
+_RE_NUMERO = re.compile(r"(\d+)\s*(" + "|".join(SUFIJOS) + r")?\b(?:\.(\d+))?", re.IGNORECASE)
+_RE_RANGO = re.compile(r"^\s*(" + _PATRON_NUMERO + r")\s*(?:-|a|al|hasta)\s*(" + _PATRON_NUMERO + r")\s*$",
+                       re.IGNORECASE)
+_RE_REMISION = re.compile(
+    r"\bart(?:[íi]culos?|s?\.)\s*((?:" + _PATRON_NUMERO + r")(?:\.\d+)*"
+    r"(?:\s*(?:,|y|e|o|a)\s*(?:" + _PATRON_NUMERO + r")(?:\.\d+)*)*)",
+    re.IGNORECASE
+)
+_RE_REMISION_RELATIVA = re.compile(r"\bart[íi]culo\s+(anterior|siguiente)\b", re.IGNORECASE)
+
+ClaveOrden = Tuple[int, int, int]
+
+
+def clave_orden(numero: str) -> Optional[ClaveOrden]:
+    """
+    Clave de ordenación natural de un número de artículo
+
+    "10" < "138" < "147" < "147 bis" < "147 ter" < "148"; un apartado
+    ("147.1") se ordena tras el artículo. None si no es un número de artículo.
+    """
+    coincidencia = _RE_NUMERO.fullmatch(numero.strip())
+    if not coincidencia:
+        return None
+    base, sufijo, apartado = coincidencia.groups()
+    return (int(base), _ORDEN_SUFIJO[sufijo.lower()] if sufijo else 0, int(apartado) if apartado else 0)
+
+
+def normalizar_numero(numero: str) -> str:
+    """Forma canónica de un número de artículo sin apartado ("147bis" -> "147 bis", "147.1" -> "147")"""
+    coincidencia = _RE_NUMERO.match(numero.strip())
+    if not coincidencia:
+        return numero.strip()
+    base, sufijo, _ = coincidencia.groups()
+    return f"{base} {sufijo.lower()}" if sufijo else base
+
+
+def interpretar_rango(texto: str) -> Optional[Tuple[ClaveOrden, ClaveOrden]]:
+    """Interpreta un rango de artículos ("138-143", "147 a 148 bis"); None si no lo es"""
+    coincidencia = _RE_RANGO.match(texto)
+    if not coincidencia:
+        return None
+    desde, hasta = clave_orden(coincidencia.group(1)), clave_orden(coincidencia.group(2))
+    if desde is None or hasta is None:
+        return None
+    # El extremo superior incluye todos los apartados del último artículo
+    return (desde, (hasta[0], hasta[1], sys.maxsize))
+
+
+def extraer_remisiones(contenido: str) -> Tuple[List[str], List[str]]:
+    """
+    Remisiones a otros artículos contenidas en un texto
+
+    Returns:
+        (números citados en forma canónica, remisiones relativas 'anterior'/'siguiente')
+    """
+    numeros = []
+    for coincidencia in _RE_REMISION.finditer(contenido):
+        for numero in re.findall(_PATRON_NUMERO + r"(?:\.\d+)*", coincidencia.group(1), re.IGNORECASE):
+            numero = normalizar_numero(numero)
+            if numero not in numeros:
+                numeros.append(numero)
+
+    relativas = []
+    for relativa in _RE_REMISION_RELATIVA.findall(contenido):
+        relativa = relativa.lower()
+        if relativa not in relativas:
+            relativas.append(relativa)
+
+    return numeros, relativas
@@ -0,0 +1,70 @@
+"""
+Registro de la Base de Conocimiento
+Proporciona una única instancia compartida de CodigoPenal, Jurisprudencia y LECrim por proceso
+"""
+
+import threading
+from typing import Callable, Dict, TypeVar
+
+from .codigo_penal import CodigoPenal
+from .jurisprudencia import Jurisprudencia
+from .lecrim import LECrim
+
+
+T = TypeVar("T")
+
+_instancias: Dict[type, object] = {}
+_lock = threading.Lock()
+
+
+def _obtener(clase: Callable[[], T]) -> T:
+    """
+    Devuelve la instancia compartida de la clase, construyéndola la primera vez
+
+    Las clases que admiten altas (atributo `solo_lectura`) se bloquean antes de
+    publicar la instancia: un cambio alteraría a todos los consumidores y
+    dejaría obsoletas sus cachés.
+    """
+    instancia = _instancias.get(clase)
+    if instancia is None:
+        with _lock:
+            instancia = _instancias.get(clase)
+            if instancia is None:
+                instancia = clase()
+                if hasattr(instancia, "solo_lectura"):
+                    instancia.solo_lectura = True
+                _instancias[clase] = instancia
+    return instancia
+
+
+def obtener_codigo_penal() -> CodigoPenal:
+    """
+    Instancia compartida del Código Penal
+
+    La instancia es común a todos los consumidores del proceso y es de solo
+    lectura: agregar_articulo lanza TypeError.
+    """
+    return _obtener(CodigoPenal)
+
+
+def obtener_jurisprudencia() -> Jurisprudencia:
+    """Instancia compartida de la base de jurisprudencia (solo lectura: agregar_sentencia lanza TypeError)"""
+    return _obtener(Jurisprudencia)
+
+
+def obtener_lecrim() -> LECrim:
+    """Instancia compartida de la LECrim (solo lectura)"""
+    return _obtener(LECrim)
+
+
+def precargar():
+    """Construye todas las instancias compartidas (útil antes de crear workers con fork)"""
+    obtener_codigo_penal()
+    obtener_jurisprudencia()
+    obtener_lecrim()
+
+
+def reiniciar_registro():
+    """Descarta las instancias compartidas; la próxima petición las reconstruye"""
+    with _lock:
+        _instancias.clear()
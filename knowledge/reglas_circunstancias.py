@@ -0,0 +1,154 @@
+"""
+Reglas de Detección de Circunstancias Modificativas
+Tabla declarativa de indicios por circunstancia y detector compilado en una sola pasada
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from .normalizacion import BuscadorTerminos, DocumentoNormalizado
+
+
+@dataclass(frozen=True)
+class ReglaCircunstancia:
+    """
+    Indicios de una circunstancia en el relato de hechos
+
+    La regla se cumple si aparece alguna de las `palabras` y, además, al menos
+    un término de cada grupo de `requiere`; o bien si el contexto del caso
+    tiene activada la marca `contexto`, que basta por sí sola.
+
+    Los términos se buscan como palabras completas o locuciones, sin tildes
+    (ver DocumentoNormalizado.contiene): cada forma admitida se escribe en la
+    tabla. Los indicios genéricos ('pago', 'reconocer', 'sufrimiento') solo
+    figuran dentro de la locución que los liga a la circunstancia.
+    """
+    palabras: Tuple[str, ...] = ()
+    requiere: Tuple[Tuple[str, ...], ...] = ()
+    contexto: Optional[str] = None
+
+
+# Reglas por clave de CodigoPenal.circunstancias; el orden es el de presentación
+REGLAS_CIRCUNSTANCIAS: Dict[str, ReglaCircunstancia] = {
+    # Atenuantes
+    "atenuante_arrebato": ReglaCircunstancia(
+        palabras=("arrebato", "obcecacion", "obcecado", "obcecada", "ira", "calentura", "impulso")),
+    "atenuante_confesion": ReglaCircunstancia(
+        palabras=("confesar", "confeso", "confesado", "confesion", "confesiones",
+                  "reconocio los hechos", "reconocio su culpa", "reconocio la autoria",
+                  "reconocio su participacion", "reconocer los hechos",
+                  "admitio los hechos", "admitio su culpa", "admitio la autoria",
+                  "admitio su participacion", "admitir los hechos")),
+    "atenuante_reparacion": ReglaCircunstancia(
+        palabras=("reparar el daño", "reparo el daño", "reparacion del daño",
+                  "devolver", "devolvio", "devuelto", "restituyo", "restitucion",
+                  "indemnizar", "indemnizo", "indemnizado", "pago de la indemnizacion",
+                  "pago la indemnizacion", "pago los daños")),
+    "atenuante_adiccion": ReglaCircunstancia(
+        palabras=("adiccion", "adicto", "adicta", "drogadicto", "drogadicta", "drogodependiente",
+                  "drogodependencia", "alcoholico", "alcoholica", "alcoholismo",
+                  "dependencia del alcohol", "dependencia de las drogas", "dependencia a las drogas")),
+
+    # Agravantes
+    "agravante_alevosa": ReglaCircunstancia(
+        palabras=("alevosia", "por sorpresa", "de sorpresa", "indefension", "indefenso", "indefensa",
+                  "dormido", "dormida", "mientras dormia", "por la espalda", "en la espalda")),
+    "agravante_ensanamiento": ReglaCircunstancia(
+        palabras=("ensañamiento", "se ensaño", "sadismo", "crueldad", "cruelmente", "tortura", "torturas",
+                  "torturo", "torturado", "torturada", "sufrimiento innecesario",
+                  "sufrimientos innecesarios", "aumentar el sufrimiento", "aumento el sufrimiento",
+                  "causar sufrimiento", "causandole sufrimiento")),
+    "agravante_precio": ReglaCircunstancia(
+        palabras=("por precio", "mediante precio", "precio pactado", "a cambio de un precio",
+                  "recompensa", "promesa de pago", "sicario", "sicaria", "sicarios", "a sueldo",
+                  "le pago para", "le pagaron para", "cobro un precio", "cobro por matar")),
+    "agravante_abuso_superioridad": ReglaCircunstancia(
+        palabras=("superioridad", "entre varios", "varios agresores", "varios individuos",
+                  "en grupo", "grupo de varios", "indefension", "indefenso", "indefensa")),
+    "agravante_discriminacion": ReglaCircunstancia(
+        palabras=("racista", "racistas", "racismo", "xenofobo", "xenofoba", "xenofobos", "xenofobia",
+                  "homofobo", "homofoba", "homofobos", "homofobia", "machista", "machistas", "machismo",
+                  "discriminacion", "discriminatorio", "discriminatoria", "discriminar")),
+    "agravante_abuso_confianza": ReglaCircunstancia(
+        palabras=("confianza", "amigo", "amiga", "amigos", "familiar", "familiares", "empleado", "empleada")),
+    "agravante_reincidencia": ReglaCircunstancia(
+        palabras=("antecedentes",), contexto="antecedentes"),
+
+    # Eximentes
+    "eximente_legitima_defensa": ReglaCircunstancia(
+        requiere=(("legitima defensa", "agresion", "agresiones", "agresion ilegitima"),
+                  ("legitima defensa", "defensa", "defender", "defenderse", "defendio", "defendia",
+                   "defendiendose"))),
+    "eximente_anomalia_psiquica": ReglaCircunstancia(
+        palabras=("esquizofrenia", "esquizofrenico", "esquizofrenica", "psicosis", "brote psicotico",
+                  "trastorno mental", "demencia", "incapaz de comprender")),
+    "eximente_estado_necesidad": ReglaCircunstancia(
+        palabras=("estado de necesidad", "necesidad extrema", "extrema necesidad", "evitar un mal",
+                  "evitar mal", "hambre extrema")),
+    "eximente_miedo_insuperable": ReglaCircunstancia(
+        palabras=("miedo insuperable", "terror", "aterrorizado", "aterrorizada", "amenaza grave")),
+}
+
+
+class DetectorCircunstancias:
+    """
+    Tabla de reglas compilada en un único buscador de términos
+
+    Todos los términos de todas las reglas se localizan en una sola pasada
+    sobre el documento; después solo se evalúan las reglas que tienen algún
+    término presente o cuya marca de contexto está activada.
+    """
+
+    def __init__(self, reglas: Dict[str, ReglaCircunstancia]):
+        self.claves: List[str] = list(reglas)
+        terminos: Dict[str, int] = {}
+
+        def indice(termino):
+            return terminos.setdefault(termino, len(terminos))
+
+        # Por regla: términos que la activan y grupos de términos exigidos
+        self._activadores: List[frozenset] = []
+        self._grupos: List[Tuple[frozenset, ...]] = []
+        self._reglas_por_termino: Dict[int, List[int]] = {}
+        self._reglas_por_contexto: Dict[str, List[int]] = {}
+
+        for posicion, regla in enumerate(reglas.values()):
+            activadores = frozenset(indice(t) for t in regla.palabras or regla.requiere[0])
+            self._activadores.append(activadores)
+            self._grupos.append(tuple(frozenset(indice(t) for t in grupo) for grupo in regla.requiere))
+            for termino in activadores:
+                self._reglas_por_termino.setdefault(termino, []).append(posicion)
+            if regla.contexto:
+                self._reglas_por_contexto.setdefault(regla.contexto, []).append(posicion)
+
+        self._buscador = BuscadorTerminos(terminos)
+
+    def terminos_presentes(self, documento: DocumentoNormalizado) -> Set[int]:
+        """
+        Términos de las reglas que aparecen en el documento
+
+        Los de fragmentos sucesivos de un mismo texto pueden acumularse por
+        unión y evaluarse al final (ver `evaluar`).
+        """
+        return self._buscador.buscar(documento)
+
+    def evaluar(self, presentes: Set[int], contexto: Dict = None) -> List[str]:
+        """Claves de las circunstancias que se cumplen con esos términos y contexto, en el orden de la tabla"""
+        candidatas = set()
+        for termino in presentes:
+            candidatas.update(self._reglas_por_termino.get(termino, ()))
+
+        cumplidas = set()
+        for marca, posiciones in self._reglas_por_contexto.items():
+            if contexto and contexto.get(marca):
+                cumplidas.update(posiciones)
+
+        for posicion in candidatas - cumplidas:
+            if all(grupo & presentes for grupo in self._grupos[posicion]):
+                cumplidas.add(posicion)
+
+        return [self.claves[posicion] for posicion in sorted(cumplidas)]
+
+    def detectar(self, documento: DocumentoNormalizado, contexto: Dict = None) -> List[str]:
+        """Claves de las circunstancias cuyos indicios concurren, en el orden de la tabla"""
+        return self.evaluar(self.terminos_presentes(documento), contexto)
@@ -0,0 +1,175 @@
+"""
+Similitud entre Sentencias (TF-IDF)
+Matriz dispersa TF-IDF sobre resumen y doctrina con búsqueda de las k más similares por coseno
+"""
+
+import heapq
+import math
+import os
+import pickle
+from array import array
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .normalizacion import tokenizar
+
+
+VERSION_MODELO = 1
+
+
+def _terminos(texto: str) -> Counter:
+    """Frecuencias de los términos significativos del texto"""
+    return Counter(t for t in tokenizar(texto) if len(t) > 2 and not t.isdigit())
+
+
+class ModeloTFIDF:
+    """
+    Matriz TF-IDF dispersa, normalizada por filas (L2)
+
+    Se guarda en doble formato compacto (arrays tipados):
+    - por documento (CSR), para obtener el vector de un documento del corpus
+    - por término (CSC), para acumular productos escalares solo sobre los
+      documentos que comparten términos con la consulta
+    """
+
+    def __init__(self):
+        self.claves: List[Hashable] = []
+        self.firma: Optional[Tuple] = None
+        self._posiciones: Dict[Hashable, int] = {}
+        self._vocabulario: Dict[str, int] = {}
+        self._idf = array("f")
+        # Filas (CSR)
+        self._fila_inicio = array("l", [0])
+        self._fila_terminos = array("i")
+        self._fila_pesos = array("f")
+        # Columnas (CSC)
+        self._col_inicio = array("l")
+        self._col_docs = array("i")
+        self._col_pesos = array("f")
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    @classmethod
+    def construir(cls, documentos: Iterable[Tuple[Hashable, str]], firma: Tuple = None) -> "ModeloTFIDF":
+        """
+        Construye el modelo a partir de pares (clave, texto)
+
+        El corpus se recorre una sola vez; solo se retienen las frecuencias por documento.
+        """
+        modelo = cls()
+        modelo.firma = firma
+        frecuencias: List[Dict[int, int]] = []
+        df = Counter()
+
+        for clave, texto in documentos:
+            conteo = {}
+            for termino, tf in _terminos(texto).items():
+                indice = modelo._vocabulario.setdefault(termino, len(modelo._vocabulario))
+                conteo[indice] = tf
+            df.update(conteo.keys())
+            frecuencias.append(conteo)
+            modelo._posiciones[clave] = len(modelo.claves)
+            modelo.claves.append(clave)
+
+        num_docs = len(frecuencias)
+        modelo._idf = array("f", [
+            math.log((1 + num_docs) / (1 + df[i])) + 1 for i in range(len(modelo._vocabulario))
+        ])
+
+        # Filas normalizadas
+        columnas: List[List[Tuple[int, float]]] = [[] for _ in range(len(modelo._vocabulario))]
+        for doc, conteo in enumerate(frecuencias):
+            pesos = {t: (1 + math.log(tf)) * modelo._idf[t] for t, tf in conteo.items()}
+            norma = math.sqrt(sum(p * p for p in pesos.values())) or 1.0
+            for termino in sorted(pesos):
+                peso = pesos[termino] / norma
+                modelo._fila_terminos.append(termino)
+                modelo._fila_pesos.append(peso)
+                columnas[termino].append((doc, peso))
+            modelo._fila_inicio.append(len(modelo._fila_terminos))
+
+        # Transpuesta
+        for entradas in columnas:
+            modelo._col_inicio.append(len(modelo._col_docs))
+            for doc, peso in entradas:
+                modelo._col_docs.append(doc)
+                modelo._col_pesos.append(peso)
+        modelo._col_inicio.append(len(modelo._col_docs))
+
+        return modelo
+
+    def vector_texto(self, texto: str) -> Dict[int, float]:
+        """Vector TF-IDF normalizado de un texto libre (solo términos del vocabulario)"""
+        pesos = {}
+        for termino, tf in _terminos(texto).items():
+            indice = self._vocabulario.get(termino)
+            if indice is not None:
+                pesos[indice] = (1 + math.log(tf)) * self._idf[indice]
+        norma = math.sqrt(sum(p * p for p in pesos.values())) or 1.0
+        return {t: p / norma for t, p in pesos.items()}
+
+    def vector_documento(self, doc: int) -> Dict[int, float]:
+        """Vector (fila) de un documento del corpus"""
+        inicio, fin = self._fila_inicio[doc], self._fila_inicio[doc + 1]
+        return dict(zip(self._fila_terminos[inicio:fin], self._fila_pesos[inicio:fin]))
+
+    def similares(self, vector: Dict[int, float], k: int = 5, excluir: int = None,
+                  max_terminos: int = 40) -> List[Tuple[Hashable, float]]:
+        """
+        Los k documentos más similares por coseno
+
+        Args:
+            vector: Vector de consulta normalizado
+            k: Número de resultados
+            excluir: Documento a excluir (el propio documento de consulta)
+            max_terminos: Solo se usan los términos de mayor peso de la consulta,
+                que concentran casi todo el coseno y acotan el coste
+
+        Returns:
+            Lista de (clave, similitud) de mayor a menor
+        """
+        terminos = heapq.nlargest(max_terminos, vector.items(), key=lambda par: par[1])
+        puntuaciones: Dict[int, float] = {}
+
+        for termino, peso in terminos:
+            inicio, fin = self._col_inicio[termino], self._col_inicio[termino + 1]
+            for doc, peso_doc in zip(self._col_docs[inicio:fin], self._col_pesos[inicio:fin]):
+                puntuaciones[doc] = puntuaciones.get(doc, 0.0) + peso * peso_doc
+
+        puntuaciones.pop(excluir, None)
+        mejores = heapq.nlargest(k, puntuaciones.items(), key=lambda par: par[1])
+        return [(self.claves[doc], puntuacion) for doc, puntuacion in mejores]
+
+    def indice_de(self, clave: Hashable) -> Optional[int]:
+        """Posición de un documento en el modelo"""
+        return self._posiciones.get(clave)
+
+    def guardar(self, ruta: str):
+        """Persiste el modelo (escritura atómica)"""
+        estado = dict(self.__dict__)
+        estado.pop("_posiciones", None)
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            pickle.dump({"version": VERSION_MODELO, "modelo": estado}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str, firma: Tuple = None) -> Optional["ModeloTFIDF"]:
+        """Carga un modelo persistido; None si no existe, es incompatible o no corresponde a la firma"""
+        try:
+            with open(ruta, "rb") as f:
+                contenido = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        if contenido.get("version") != VERSION_MODELO:
+            return None
+
+        modelo = cls.__new__(cls)
+        modelo.__dict__.update(contenido["modelo"])
+        modelo._posiciones = {clave: i for i, clave in enumerate(modelo.claves)}
+        if firma is not None and modelo.firma != firma:
+            return None
+        return modelo
@@ -0,0 +1,192 @@
+"""
+Snapshot precompilado de la Base de Conocimiento
+Serializa el Código Penal, la Jurisprudencia y la LECrim ya construidos en un único fichero versionado
+
+Uso (paso de construcción):
+    python -m knowledge [ruta_snapshot]
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+from typing import Dict, Optional
+
+from .almacen_textos import EscritorAlmacenTextos, abrir_almacen
+
+
+FORMATO_SNAPSHOT = "base_conocimiento"
+VERSION_SNAPSHOT = 10
+
+RUTA_SNAPSHOT = os.environ.get(
+    "ASISTENTE_LEGAL_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "base_conocimiento.snapshot")
+)
+
+# Contenido del snapshot leído en este proceso (una sola lectura por proceso).
+# Las secciones se guardan serializadas: cada instancia deserializa su propia
+# copia y el estado compartido se obtiene solo a través de knowledge.registro
+_cache: Dict[str, Optional[Dict]] = {}
+
+# Firma del código de knowledge/ en este proceso (se calcula una sola vez)
+_firma: Optional[str] = None
+
+
+def firma_codigo() -> str:
+    """
+    Firma del contenido de todos los módulos de knowledge/
+
+    Se guarda en la cabecera del snapshot: cualquier cambio en los literales
+    o en las clases serializadas (índices, proxies, dataclasses) lo invalida,
+    con independencia de las fechas de modificación de los ficheros.
+    """
+    global _firma
+    if _firma is None:
+        resumen = hashlib.sha256()
+        for fuente in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+            with open(fuente, "rb") as f:
+                resumen.update(f"{os.path.basename(fuente)}:".encode())
+                resumen.update(f.read())
+        _firma = resumen.hexdigest()[:16]
+    return _firma
+
+
+def _leer_snapshot(ruta: str) -> Optional[Dict]:
+    """Lee y valida el snapshot; devuelve None si no existe o no es compatible"""
+    if ruta in _cache:
+        return _cache[ruta]
+
+    datos = None
+    try:
+        with open(ruta, "rb") as f:
+            contenido = pickle.load(f)
+        if (isinstance(contenido, dict) and
+                contenido.get("formato") == FORMATO_SNAPSHOT and
+                contenido.get("version") == VERSION_SNAPSHOT and
+                contenido.get("firma_codigo") == firma_codigo()):
+            datos = contenido
+            # Abrir el almacén de textos junto con el snapshot para que ambos
+            # correspondan a la misma construcción
+            if contenido.get("almacen_textos"):
+                abrir_almacen(contenido["almacen_textos"])
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        datos = None
+
+    _cache[ruta] = datos
+    return datos
+
+
+def snapshot_vigente(ruta: str = None) -> bool:
+    """Indica si el snapshot existe, es compatible y se construyó con el código actual de knowledge/"""
+    return _leer_snapshot(ruta or RUTA_SNAPSHOT) is not None
+
+
+def cargar_seccion(seccion: str, ruta: str = None) -> Optional[Dict]:
+    """
+    Devuelve los datos precompilados de una sección del snapshot
+
+    Args:
+        seccion: 'codigo_penal', 'jurisprudencia' o 'lecrim'
+        ruta: Ruta del snapshot (por defecto RUTA_SNAPSHOT)
+
+    Returns:
+        Diccionario de atributos de la sección, o None si hay que recurrir
+        a los constructores literales (snapshot ausente, obsoleto o incompatible).
+        Cada llamada devuelve objetos nuevos, independientes de los de llamadas anteriores.
+    """
+    datos = _leer_snapshot(ruta or RUTA_SNAPSHOT)
+    if not datos:
+        return None
+
+    serializada = datos["secciones"].get(seccion)
+    if serializada is None:
+        return None
+    return pickle.loads(serializada)
+
+
+def construir_snapshot(ruta: str = None, textos_mapeados: bool = True) -> str:
+    """
+    Construye la base de conocimiento desde los literales y la serializa
+
+    Args:
+        ruta: Ruta del snapshot (por defecto RUTA_SNAPSHOT)
+        textos_mapeados: Si es True, los textos largos (ArticuloCP.contenido,
+            Sentencia.resumen y Sentencia.doctrina) se guardan en un almacén
+            mapeado en memoria ('<ruta>.textos') compartido entre procesos
+
+    Returns:
+        Ruta del snapshot generado
+    """
+    from .codigo_penal import CodigoPenal, ArticuloCPMapeado
+    from .jurisprudencia import Jurisprudencia, SentenciaMapeada
+    from .lecrim import LECrim
+
+    ruta = ruta or RUTA_SNAPSHOT
+
+    codigo_penal = CodigoPenal(usar_snapshot=False)
+    jurisprudencia = Jurisprudencia(usar_snapshot=False)
+    lecrim = LECrim(usar_snapshot=False)
+
+    articulos = codigo_penal.articulos
+    articulos_historicos = codigo_penal.articulos_historicos
+    sentencias = jurisprudencia.sentencias
+    ruta_textos = None
+
+    if textos_mapeados:
+        ruta_textos = os.path.abspath(ruta) + ".textos"
+        escritor = EscritorAlmacenTextos(ruta_textos)
+        articulos = {
+            numero: ArticuloCPMapeado.desde(articulo, escritor)
+            for numero, articulo in articulos.items()
+        }
+        articulos_historicos = [
+            ArticuloCPMapeado.desde(articulo, escritor)
+            for articulo in articulos_historicos
+        ]
+        sentencias = {
+            clave: SentenciaMapeada.desde(sentencia, escritor)
+            for clave, sentencia in sentencias.items()
+        }
+        escritor.cerrar()
+
+    secciones = {
+        "codigo_penal": {
+            "articulos": articulos,
+            "articulos_historicos": articulos_historicos,
+            "tipos_penales": codigo_penal.tipos_penales,
+            "circunstancias": codigo_penal.circunstancias,
+            "indice_articulos": codigo_penal.indice_articulos,
+            "marcos_penales": codigo_penal.marcos_penales,
+            "plazos_prescripcion": codigo_penal.plazos_prescripcion,
+            "remisiones_articulos": codigo_penal.remisiones_articulos,
+        },
+        "jurisprudencia": {
+            "sentencias": sentencias,
+            "indices": jurisprudencia.estado_indices(),
+        },
+        "lecrim": {
+            "fases": lecrim.fases,
+            "recursos": lecrim.recursos,
+            "plazos": lecrim.plazos,
+        },
+    }
+    contenido = {
+        "formato": FORMATO_SNAPSHOT,
+        "version": VERSION_SNAPSHOT,
+        "firma_codigo": firma_codigo(),
+        "almacen_textos": ruta_textos,
+        "secciones": {
+            nombre: pickle.dumps(seccion, protocol=pickle.HIGHEST_PROTOCOL)
+            for nombre, seccion in secciones.items()
+        },
+    }
+
+    # Escritura atómica para no dejar un snapshot a medias si se interrumpe
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        pickle.dump(contenido, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, ruta)
+
+    _cache.pop(ruta, None)
+    return ruta
+
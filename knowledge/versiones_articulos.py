@@ -0,0 +1,78 @@
+"""
+Versiones de los Artículos
+Historial de redacciones de cada artículo con sus intervalos de vigencia
+"""
+
+from bisect import bisect_right
+from dataclasses import replace
+from datetime import date
+from typing import Dict, List, Optional
+
+
+def _ordinal(fecha_iso: Optional[str], defecto: int) -> int:
+    """Ordinal de una fecha ISO (AAAA-MM-DD); el valor por defecto si no consta"""
+    return date.fromisoformat(fecha_iso).toordinal() if fecha_iso else defecto
+
+
+class HistorialArticulo:
+    """
+    Redacciones sucesivas de un artículo, ordenadas por inicio de vigencia
+
+    Cada versión es un ArticuloCP con `vigente_desde` y `vigente_hasta`
+    (fechas ISO; None significa desde la entrada en vigor del Código o hasta
+    hoy). La versión aplicable a una fecha se localiza por bisección sobre
+    los inicios de vigencia.
+    """
+
+    def __init__(self):
+        self._inicios: List[int] = []
+        self._fines: List[int] = []
+        self.versiones: List = []
+
+    def __len__(self) -> int:
+        return len(self.versiones)
+
+    def agregar(self, articulo, textos: Dict[str, str] = None):
+        """
+        Añade una versión manteniendo el orden por inicio de vigencia
+
+        Returns:
+            La versión tal como queda almacenada (con el texto compartido)
+
+        Args:
+            articulo: Versión del artículo
+            textos: Reserva de textos compartida; si el contenido ya existe en
+                ella (redacción no modificada) se reutiliza el mismo objeto.
+                Los artículos del almacén mapeado ya comparten los textos
+                repetidos y se añaden tal cual.
+        """
+        if textos is not None and "contenido" in vars(articulo):
+            compartido = textos.setdefault(articulo.contenido, articulo.contenido)
+            if compartido is not articulo.contenido:
+                articulo = replace(articulo, contenido=compartido)
+
+        inicio = _ordinal(articulo.vigente_desde, 0)
+        fin = _ordinal(articulo.vigente_hasta, date.max.toordinal())
+        posicion = bisect_right(self._inicios, inicio)
+
+        # Una versión con el mismo inicio de vigencia sustituye a la existente
+        if posicion and self._inicios[posicion - 1] == inicio:
+            self._fines[posicion - 1] = fin
+            self.versiones[posicion - 1] = articulo
+        else:
+            self._inicios.insert(posicion, inicio)
+            self._fines.insert(posicion, fin)
+            self.versiones.insert(posicion, articulo)
+        return articulo
+
+    def vigente_en(self, fecha: date):
+        """Versión vigente en la fecha indicada, o None si no había ninguna"""
+        ordinal = fecha.toordinal()
+        posicion = bisect_right(self._inicios, ordinal) - 1
+        if posicion < 0 or ordinal > self._fines[posicion]:
+            return None
+        return self.versiones[posicion]
+
+    def actual(self):
+        """Última versión"""
+        return self.versiones[-1] if self.versiones else None
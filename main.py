@@ -15,7 +15,9 @@ from datetime import datetime
 from knowledge.codigo_penal import CodigoPenal
 from knowledge.jurisprudencia import Jurisprudencia
 from knowledge.lecrim import LECrim
+from knowledge.registro import obtener_codigo_penal, obtener_jurisprudencia, obtener_lecrim
 
+from analysis.cache_resultados import CacheResultados
 from analysis.case_analyzer import CaseAnalyzer
 from analysis.legal_reasoning import LegalReasoning
 from analysis.strategic_advisor import StrategicAdvisor
@@ -35,13 +37,14 @@ class AsistenteLegalCLI:
     Interfaz CLI del Asistente Legal Penal Español
     """
 
-    def __init__(self):
-        # Inicializar módulos
-        self.codigo_penal = CodigoPenal()
-        self.jurisprudencia = Jurisprudencia()
-        self.lecrim = LECrim()
+    def __init__(self, codigo_penal: CodigoPenal = None,
+                 jurisprudencia: Jurisprudencia = None, lecrim: LECrim = None):
+        # Inicializar módulos (por defecto, instancias compartidas del registro)
+        self.codigo_penal = codigo_penal or obtener_codigo_penal()
+        self.jurisprudencia = jurisprudencia or obtener_jurisprudencia()
+        self.lecrim = lecrim or obtener_lecrim()
 
-        self.case_analyzer = CaseAnalyzer()
+        self.case_analyzer = CaseAnalyzer(self.codigo_penal, cache=CacheResultados())
         self.legal_reasoning = LegalReasoning()
         self.strategic_advisor = StrategicAdvisor()
 
@@ -134,16 +137,7 @@ class AsistenteLegalCLI:
         self.case_id = f"caso_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
         print("Por favor, describa los HECHOS del caso de forma detallada:")
-        print("(Presione Enter dos veces para finalizar)\n")
-
-        lineas = []
-        while True:
-            linea = input()
-            if linea == "" and lineas and lineas[-1] == "":
-                break
-            lineas.append(linea)
-
-        hechos = "\n".join(lineas).strip()
+        hechos = self._leer_hechos()
 
         if not hechos:
             print("❌ No se ingresaron hechos. Operación cancelada.")
@@ -179,7 +173,8 @@ class AsistenteLegalCLI:
 
         # Analizar caso
         print("\n⚖️  Analizando caso... Por favor espere.\n")
-        analisis = self.case_analyzer.analizar_caso(hechos, contexto)
+        # (el estado del caso se conserva para poder añadir hechos después)
+        analisis = self.case_analyzer.analizar_incremental(self.case_id, hechos, contexto)
 
         # Generar respuesta
         respuesta = self._generar_informe_analisis(analisis)
@@ -220,6 +215,11 @@ class AsistenteLegalCLI:
         # Calificación jurídica
         if analisis.tipo_principal:
             informe += analisis.calificacion_juridica + "\n"
+            # Peso relativo frente a las demás calificaciones, no una probabilidad de acierto
+            peso = analisis.puntuacion_relativa_tipos.get(analisis.tipo_principal.nombre)
+            if peso is not None and len(analisis.puntuacion_relativa_tipos) > 1:
+                informe += (f"**Puntuación relativa de la calificación:** {peso:.2f} "
+                            f"(sobre 1, repartido entre las calificaciones candidatas)\n\n")
         else:
             informe += "⚠️ No se ha podido determinar un tipo penal claro a partir de los hechos descritos.\n\n"
             return informe
@@ -235,6 +235,8 @@ class AsistenteLegalCLI:
             informe += f"- Prescripción de la pena: {analisis.prescripcion.get('pena', 'No determinado')}\n"
             if analisis.prescripcion.get('estado'):
                 informe += f"- Estado: {analisis.prescripcion['estado']}\n"
+            if analisis.prescripcion.get('fecha_prescripcion'):
+                informe += f"- Fecha de prescripción: {analisis.prescripcion['fecha_prescripcion']}\n"
             informe += "\n"
 
         # Advertencias
@@ -253,6 +255,45 @@ class AsistenteLegalCLI:
 
         return informe
 
+    def _leer_hechos(self) -> str:
+        """Lee un texto de varias líneas, terminado con dos Enter"""
+        print("(Presione Enter dos veces para finalizar)\n")
+
+        lineas = []
+        while True:
+            linea = input()
+            if linea == "" and lineas and lineas[-1] == "":
+                break
+            lineas.append(linea)
+
+        return "\n".join(lineas).strip()
+
+    def _ampliar_hechos_caso(self):
+        """Añade hechos al caso en curso y actualiza el análisis (solo se procesan los hechos nuevos)"""
+        print("\nDescriba los HECHOS ADICIONALES:")
+        hechos = self._leer_hechos()
+        if not hechos:
+            print("❌ No se ingresaron hechos.")
+            return
+
+        self.conversation_history.guardar_mensaje(self.case_id, "user", hechos)
+        analisis = self.case_analyzer.analizar_incremental(self.case_id, hechos)
+        respuesta = self._generar_informe_analisis(analisis)
+
+        print("\n" + "="*80)
+        print(respuesta)
+        print("="*80 + "\n")
+
+        self.conversation_history.guardar_mensaje(
+            self.case_id, "assistant", respuesta,
+            {
+                "tipo": "analisis_caso",
+                "tipo_penal": analisis.tipo_principal.nombre if analisis.tipo_principal else None
+            }
+        )
+
+        self._ofrecer_acciones_posteriores(analisis)
+
     def _ofrecer_acciones_posteriores(self, analisis):
         """Ofrece acciones posteriores al análisis"""
         print("\n¿Qué desea hacer ahora?\n")
@@ -260,9 +301,10 @@ class AsistenteLegalCLI:
         print("2. Consultar jurisprudencia aplicable")
         print("3. Obtener asesoramiento estratégico")
         print("4. Generar documento legal")
-        print("5. Volver al menú principal")
+        print("5. Añadir hechos al caso")
+        print("6. Volver al menú principal")
 
-        opcion = input("\nSeleccione una opción (1-5): ").strip()
+        opcion = input("\nSeleccione una opción (1-6): ").strip()
 
         if opcion == "1":
             print("\n" + "="*80)
@@ -272,7 +314,8 @@ class AsistenteLegalCLI:
 
         elif opcion == "2":
             if analisis.tipo_principal:
-                sentencias = self.jurisprudencia.buscar_por_tipo_penal(analisis.tipo_principal.nombre)
+                sentencias = self.jurisprudencia.buscar_por_tipo_penal(analisis.tipo_principal.nombre,
+                                                                        por_autoridad=True)
                 if sentencias:
                     print(f"\n📚 Jurisprudencia sobre {analisis.tipo_principal.nombre}:\n")
                     for sent in sentencias[:3]:
@@ -289,6 +332,9 @@ class AsistenteLegalCLI:
         elif opcion == "4":
             self._generar_documento_caso(analisis)
 
+        elif opcion == "5":
+            self._ampliar_hechos_caso()
+
     def _asesoramiento_estrategico_caso(self, analisis):
         """Proporciona asesoramiento estratégico"""
         print("\n¿Cuál es su rol en este caso?")
@@ -319,8 +365,69 @@ class AsistenteLegalCLI:
                 print(f"  ⚠️  {riesgo}")
             print("\n" + "-"*80 + "\n")
 
+        self._mostrar_escenarios_pena(analisis, rol)
+        self._plantear_hipotesis_circunstancias(analisis)
+
         input("\nPresione Enter para continuar...")
 
+    def _mostrar_escenarios_pena(self, analisis, rol: str):
+        """Muestra la pena resultante de cada combinación de circunstancias candidatas"""
+        if not analisis.tipo_principal:
+            return
+
+        apreciadas = [
+            self.codigo_penal.clave_circunstancia(c)
+            for c in analisis.circunstancias_atenuantes + analisis.circunstancias_agravantes
+        ]
+        candidatas = list(apreciadas)
+        if rol == "defensa":
+            candidatas += self.strategic_advisor.ATENUANTES_POSTDELICTUALES
+
+        tabla = self.codigo_penal.escenarios_pena(analisis.tipo_principal, candidatas)
+        if not tabla or not tabla.circunstancias:
+            return
+
+        nombres = {clave: self.codigo_penal.circunstancias[clave].nombre for clave in tabla.circunstancias}
+        print(f"## ⚖️  ESCENARIOS DE PENA ({analisis.tipo_principal.nombre})\n")
+        for conclusion in self.strategic_advisor.interpretar_escenarios_pena(tabla, apreciadas, nombres):
+            print(f"  • {conclusion}")
+        if len(tabla) <= 32:
+            print("\n" + tabla.formatear(nombres))
+        print("\n" + "-"*80 + "\n")
+
+    def _plantear_hipotesis_circunstancias(self, analisis):
+        """Pena y calificación si se acreditan o excluyen circunstancias (solo se recalculan esas etapas)"""
+        etapas = self.case_analyzer.etapas_caso(self.case_id)
+        if etapas is None or not analisis.tipo_principal:
+            return
+        if input("¿Desea plantear una hipótesis con otras circunstancias? (s/n): ").strip().lower() != "s":
+            return
+
+        circunstancias = list(self.codigo_penal.circunstancias.values())
+        apreciadas = {c.nombre for c in analisis.circunstancias_atenuantes +
+                      analisis.circunstancias_agravantes + analisis.circunstancias_eximentes}
+        print()
+        for i, circunstancia in enumerate(circunstancias, 1):
+            marca = "✓" if circunstancia.nombre in apreciadas else " "
+            print(f"  [{marca}] {i}. {circunstancia.nombre} ({circunstancia.tipo})")
+
+        eleccion = input("\nNúmeros a acreditar o excluir, separados por comas: ")
+        for numero in eleccion.replace(",", " ").split():
+            if numero.isdigit() and 1 <= int(numero) <= len(circunstancias):
+                apreciadas ^= {circunstancias[int(numero) - 1].nombre}
+
+        # Copia de las etapas del caso con las circunstancias impuestas
+        hipotesis = etapas.derivar()
+        hipotesis.fijar("circunstancias", tuple(
+            [c for c in circunstancias if c.nombre in apreciadas and c.tipo == tipo]
+            for tipo in ("atenuante", "agravante", "eximente")
+        ))
+
+        print("\n## 🔀 HIPÓTESIS\n")
+        print(hipotesis["calificacion_juridica"])
+        print(hipotesis["pena_estimada"])
+        print("\n" + "-"*80 + "\n")
+
     def _generar_documento_caso(self, analisis):
         """Genera un documento legal basado en el caso"""
         print("\n¿Qué tipo de documento desea generar?\n")
@@ -492,31 +599,46 @@ class AsistenteLegalCLI:
         print("2. Buscar tipo penal")
         print("3. Consultar circunstancias modificativas")
         print("4. Información sobre procedimiento (LECrim)")
+        print("5. Buscar en el texto del Código Penal")
         print("0. Volver")
 
-        opcion = input("\nSeleccione (0-4): ").strip()
+        opcion = input("\nSeleccione (0-5): ").strip()
 
         if opcion == "0":
             return
 
         elif opcion == "1":
-            numero = input("\nNúmero de artículo del CP: ").strip()
-            articulo = self.codigo_penal.buscar_articulo(numero)
+            numero = input("\nNúmero de artículo del CP (o rango, p. ej. 138-143): ").strip()
 
-            if articulo:
-                print(f"\n{'='*80}")
-                print(f"Artículo {articulo.numero} - {articulo.titulo}")
-                print(f"{'='*80}\n")
-                print(f"**Libro:** {articulo.libro} - {articulo.titulo_grupo}")
-                print(f"**Capítulo:** {articulo.capitulo}")
-                if articulo.seccion:
-                    print(f"**Sección:** {articulo.seccion}")
-                print(f"\n**Contenido:**\n{articulo.contenido}\n")
-                if articulo.ultima_modificacion:
-                    print(f"**Última modificación:** {articulo.ultima_modificacion}")
-                print(f"**Vigencia:** {articulo.vigencia}")
+            en_rango = self.codigo_penal.articulos_en_rango(numero)
+            if en_rango:
+                print(f"\n📋 Artículos {numero}:\n")
+                for articulo in en_rango:
+                    print(f"  Art. {articulo.numero} - {articulo.titulo}")
             else:
-                print(f"\n❌ No se encontró el artículo {numero}")
+                fecha = input("Redacción vigente a fecha (DD/MM/AAAA) [Enter para la actual]: ").strip()
+                articulo, remitidos = self.codigo_penal.buscar_articulo_con_remisiones(numero, fecha=fecha or None)
+
+                if articulo:
+                    print(f"\n{'='*80}")
+                    print(f"Artículo {articulo.numero} - {articulo.titulo}")
+                    print(f"{'='*80}\n")
+                    print(f"**Libro:** {articulo.libro} - {articulo.titulo_grupo}")
+                    print(f"**Capítulo:** {articulo.capitulo}")
+                    if articulo.seccion:
+                        print(f"**Sección:** {articulo.seccion}")
+                    print(f"\n**Contenido:**\n{articulo.contenido}\n")
+                    if articulo.ultima_modificacion:
+                        print(f"**Última modificación:** {articulo.ultima_modificacion}")
+                    print(f"**Vigencia:** {articulo.vigencia}")
+                    if articulo.notas:
+                        print(f"**Notas:** {articulo.notas}")
+                    if remitidos:
+                        print(f"\n**Artículos a los que remite:**")
+                        for remitido in remitidos:
+                            print(f"  → Art. {remitido.numero} - {remitido.titulo}")
+                else:
+                    print(f"\n❌ No se encontró el artículo {numero}" + (f" vigente a {fecha}" if fecha else ""))
 
         elif opcion == "2":
             print("\nTipos penales disponibles:")
@@ -610,6 +732,19 @@ class AsistenteLegalCLI:
                 print("- Recurso de casación (interposición): 20 días")
                 print("- Recurso de amparo: 30 días")
 
+        elif opcion == "5":
+            consulta = input("\nTérminos a buscar (p. ej. 'agresión ilegítima'): ").strip()
+            resultados = self.codigo_penal.buscar_texto_articulos(consulta, k=5)
+
+            if resultados:
+                print(f"\n📚 Artículos más relevantes para '{consulta}':\n")
+                for articulo, puntuacion in resultados:
+                    print(f"- Art. {articulo.numero} - {articulo.titulo} (relevancia: {puntuacion:.2f})")
+                    print(f"  {articulo.contenido[:200]}...")
+                    print()
+            else:
+                print(f"\n❌ No se encontraron artículos que contengan '{consulta}'")
+
         input("\nPresione Enter para continuar...")
 
     def opcion_consultar_jurisprudencia(self):
@@ -618,7 +753,7 @@ class AsistenteLegalCLI:
 
         materia = input("Ingrese la materia o tipo penal a buscar: ").strip()
 
-        sentencias = self.jurisprudencia.buscar_por_materia(materia)
+        sentencias = self.jurisprudencia.buscar_por_materia(materia, por_autoridad=True)
 
         if sentencias:
             print(f"\n📚 Se encontraron {len(sentencias)} sentencia(s) sobre '{materia}':\n")
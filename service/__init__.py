@@ -0,0 +1,8 @@
+"""
+Módulo de Servicio
+Servicio HTTP/JSON concurrente sobre el analizador y la base de conocimiento
+"""
+
+from .analysis_service import AnalysisService
+
+__all__ = ['AnalysisService']
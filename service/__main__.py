@@ -0,0 +1,33 @@
+"""
+Arranque del servicio de análisis
+
+Uso:
+    python -m service [--host 127.0.0.1] [--puerto 8080] [--workers N] [--max-cola 100] [--timeout 30]
+"""
+
+import argparse
+import asyncio
+
+from .analysis_service import (HOST_DEFECTO, MAX_COLA_DEFECTO, PUERTO_DEFECTO, TIMEOUT_DEFECTO,
+                               AnalysisService)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON del asistente legal penal")
+    parser.add_argument("--host", default=HOST_DEFECTO)
+    parser.add_argument("--puerto", type=int, default=PUERTO_DEFECTO)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos trabajadores (por defecto, uno por CPU)")
+    parser.add_argument("--max-cola", type=int, default=MAX_COLA_DEFECTO,
+                        help="Peticiones en espera antes de responder 503")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_DEFECTO, help="Tiempo máximo por petición (s)")
+    args = parser.parse_args()
+
+    servicio = AnalysisService(args.host, args.puerto, args.workers, args.max_cola, args.timeout)
+    try:
+        asyncio.run(servicio.servir())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
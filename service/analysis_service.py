@@ -0,0 +1,359 @@
+"""
+Servicio HTTP/JSON de Análisis
+Expone el análisis de casos, la consulta de normativa y jurisprudencia y la
+redacción de documentos a clientes concurrentes (asyncio + procesos trabajadores)
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, is_dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.registro import obtener_codigo_penal, obtener_jurisprudencia, precargar
+
+
+HOST_DEFECTO = "127.0.0.1"
+PUERTO_DEFECTO = 8080
+MAX_COLA_DEFECTO = 100
+TIMEOUT_DEFECTO = 30.0
+
+# Tamaño máximo del cuerpo de una petición (bytes)
+MAX_CUERPO = 1024 * 1024
+
+DOCUMENTOS = ("querella", "denuncia", "recurso_apelacion", "recurso_casacion",
+              "escrito_defensa", "informe_juridico")
+
+MENSAJES_ESTADO = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class ErrorPeticion(Exception):
+    """Error atribuible a la petición, con su código HTTP"""
+
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# --- Trabajadores ---------------------------------------------------------------
+
+# Analizador y generador de cada proceso trabajador, creados al arrancarlo
+_analizador = None
+_generador = None
+
+
+def _inicializar_trabajador():
+    """Carga la base de conocimiento en el proceso trabajador (una sola vez)"""
+    global _analizador, _generador
+    from analysis.case_analyzer import CaseAnalyzer
+    from drafting.document_generator import DocumentGenerator
+
+    precargar()
+    _analizador = CaseAnalyzer()
+    _generador = DocumentGenerator()
+
+
+def _calentar() -> int:
+    """Tarea vacía para arrancar los trabajadores antes de la primera petición"""
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def _a_json(valor) -> bytes:
+    """JSON de un resultado; las dataclasses y los resultados de análisis se serializan campo a campo"""
+    def convertir(objeto):
+        if is_dataclass(objeto):
+            return asdict(objeto)
+        if hasattr(objeto, "como_dict"):
+            return objeto.como_dict()
+        raise TypeError(f"No serializable: {type(objeto).__name__}")
+    return json.dumps(valor, ensure_ascii=False, default=convertir).encode("utf-8")
+
+
+def _tarea_analizar(hechos: str, contexto: Dict, salidas: Optional[List[str]] = None) -> bytes:
+    if salidas:
+        return _a_json(_analizador.analizar_salidas(hechos, contexto, salidas))
+    return _a_json(_analizador.analizar_caso(hechos, contexto))
+
+
+def _tarea_articulo(numero: str, fecha: Optional[str]) -> Optional[bytes]:
+    articulo = obtener_codigo_penal().buscar_articulo(numero, fecha=fecha)
+    return _a_json(articulo) if articulo else None
+
+
+def _tarea_materia(materia: str, por_autoridad: bool) -> bytes:
+    return _a_json(obtener_jurisprudencia().buscar_por_materia(materia, por_autoridad=por_autoridad))
+
+
+def _tarea_documento(tipo: str, datos: Dict) -> bytes:
+    ruta = getattr(_generador, f"generar_{tipo}")(datos)
+    with open(ruta, encoding="utf-8") as f:
+        return _a_json({"tipo": tipo, "ruta": ruta, "contenido": f.read()})
+
+
+# --- Servicio -------------------------------------------------------------------
+
+class AnalysisService:
+    """
+    Servicio HTTP/JSON sobre asyncio
+
+    Rutas:
+        POST /analizar                 {"hechos": ..., "contexto": {...}, "salidas": [...]}
+        GET  /articulos/<numero>       ?fecha=DD/MM/AAAA
+        GET  /jurisprudencia           ?materia=...&por_autoridad=1
+        POST /documentos/<tipo>        datos del documento (ver DocumentGenerator)
+        GET  /estado                   contadores del servicio
+
+    El trabajo de CPU se ejecuta en un pool de procesos que se arranca y
+    calienta al iniciar el servicio. Como mucho `workers` peticiones se
+    ejecutan a la vez; el resto esperan en cola, y más allá de `max_cola`
+    peticiones en espera se responde 503. Cada petición tiene un tiempo
+    máximo (espera más ejecución); al agotarse se responde 504. Una petición
+    que aún no había empezado a ejecutarse se retira del pool; una que ya
+    estaba en un trabajador termina allí y su resultado se descarta, pero
+    conserva su plaza hasta terminar, de modo que nunca hay más de `workers`
+    tareas en ejecución.
+    """
+
+    def __init__(self, host: str = HOST_DEFECTO, puerto: int = PUERTO_DEFECTO,
+                 workers: Optional[int] = None, max_cola: int = MAX_COLA_DEFECTO,
+                 timeout: float = TIMEOUT_DEFECTO):
+        self.host = host
+        self.puerto = puerto
+        self.workers = workers or os.cpu_count() or 1
+        self.max_cola = max_cola
+        self.timeout = timeout
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._plazas: Optional[asyncio.Semaphore] = None
+        self._pendientes = 0
+        self._en_ejecucion = 0
+        self._pico_en_ejecucion = 0
+        self.contadores = {"atendidas": 0, "rechazadas": 0, "expiradas": 0, "errores": 0}
+
+    async def iniciar(self):
+        """Arranca y calienta los trabajadores y abre el puerto"""
+        loop = asyncio.get_event_loop()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_inicializar_trabajador)
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _calentar) for _ in range(self.workers)))
+
+        self._plazas = asyncio.Semaphore(self.workers)
+        self._servidor = await asyncio.start_server(self._atender_conexion, self.host, self.puerto)
+        # Con puerto 0 el sistema asigna uno libre
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+
+    async def detener(self):
+        """Cierra el puerto y el pool de trabajadores"""
+        if self._servidor:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._pool:
+            self._pool.shutdown(wait=True)
+
+    async def servir(self):
+        """Inicia el servicio y atiende peticiones hasta que se cancela"""
+        await self.iniciar()
+        print(f"Servicio de análisis en http://{self.host}:{self.puerto} "
+              f"({self.workers} trabajadores, cola máxima {self.max_cola})")
+        try:
+            await self._servidor.serve_forever()
+        finally:
+            await self.detener()
+
+    def estado(self) -> Dict:
+        """Contadores del servicio"""
+        return dict(self.contadores, pendientes=self._pendientes, en_ejecucion=self._en_ejecucion,
+                    pico_en_ejecucion=self._pico_en_ejecucion, workers=self.workers,
+                    max_cola=self.max_cola, timeout=self.timeout)
+
+    # --- Ejecución con cola y tiempo máximo ---
+
+    async def _ejecutar(self, funcion, *args) -> bytes:
+        """Ejecuta una tarea en el pool respetando la cola y el tiempo máximo"""
+        if self._pendientes >= self.workers + self.max_cola:
+            self.contadores["rechazadas"] += 1
+            raise ErrorPeticion(503, "Servicio saturado; reintente más tarde")
+
+        self._pendientes += 1
+        try:
+            return await asyncio.wait_for(self._en_pool(funcion, *args), self.timeout)
+        except asyncio.TimeoutError:
+            self.contadores["expiradas"] += 1
+            raise ErrorPeticion(504, f"Tiempo máximo de {self.timeout:g} s agotado")
+        finally:
+            self._pendientes -= 1
+
+    async def _en_pool(self, funcion, *args):
+        """
+        Ejecuta la tarea en el pool ocupando una plaza
+
+        La plaza se libera cuando termina (o se cancela) la tarea en el pool,
+        no cuando deja de esperarla la petición: si expira el tiempo máximo,
+        el trabajador sigue ocupado y la plaza con él.
+        """
+        loop = asyncio.get_event_loop()
+        await self._plazas.acquire()
+        try:
+            futuro = self._pool.submit(funcion, *args)
+        except BaseException:
+            self._plazas.release()
+            raise
+
+        self._en_ejecucion += 1
+        self._pico_en_ejecucion = max(self._pico_en_ejecucion, self._en_ejecucion)
+
+        def liberar(_):
+            try:
+                loop.call_soon_threadsafe(self._liberar_plaza)
+            except RuntimeError:
+                pass  # el bucle ya se cerró
+
+        futuro.add_done_callback(liberar)
+        return await asyncio.wrap_future(futuro)
+
+    def _liberar_plaza(self):
+        self._en_ejecucion -= 1
+        self._plazas.release()
+
+    # --- HTTP ---
+
+    async def _despachar(self, metodo: str, destino: str, cuerpo: bytes) -> bytes:
+        """Resuelve la ruta y devuelve el cuerpo JSON de la respuesta"""
+        partes = urlsplit(destino)
+        ruta = [unquote(p) for p in partes.path.split("/") if p]
+        consulta = {clave: valores[0] for clave, valores in parse_qs(partes.query).items()}
+
+        if ruta == ["estado"] and metodo == "GET":
+            return _a_json(self.estado())
+
+        if ruta == ["analizar"]:
+            self._exigir_metodo(metodo, "POST")
+            datos = self._leer_json(cuerpo)
+            hechos = datos.get("hechos")
+            if not isinstance(hechos, str) or not hechos.strip():
+                raise ErrorPeticion(400, "Falta el campo 'hechos'")
+            contexto = datos.get("contexto") or {}
+            if not isinstance(contexto, dict):
+                raise ErrorPeticion(400, "'contexto' debe ser un objeto JSON")
+            return await self._ejecutar(_tarea_analizar, hechos, contexto,
+                                        self._validar_salidas(datos.get("salidas")))
+
+        if len(ruta) == 2 and ruta[0] == "articulos":
+            self._exigir_metodo(metodo, "GET")
+            respuesta = await self._ejecutar(_tarea_articulo, ruta[1], consulta.get("fecha"))
+            if respuesta is None:
+                raise ErrorPeticion(404, f"Artículo {ruta[1]} no encontrado")
+            return respuesta
+
+        if ruta == ["jurisprudencia"]:
+            self._exigir_metodo(metodo, "GET")
+            if not consulta.get("materia"):
+                raise ErrorPeticion(400, "Falta el parámetro 'materia'")
+            por_autoridad = consulta.get("por_autoridad", "").lower() in ("1", "true", "si", "sí")
+            return await self._ejecutar(_tarea_materia, consulta["materia"], por_autoridad)
+
+        if len(ruta) == 2 and ruta[0] == "documentos":
+            self._exigir_metodo(metodo, "POST")
+            if ruta[1] not in DOCUMENTOS:
+                raise ErrorPeticion(404, f"Tipo de documento desconocido; disponibles: {', '.join(DOCUMENTOS)}")
+            try:
+                return await self._ejecutar(_tarea_documento, ruta[1], self._leer_json(cuerpo))
+            except KeyError as e:
+                raise ErrorPeticion(400, f"Falta el dato {e} del documento")
+
+        raise ErrorPeticion(404, f"Ruta no encontrada: {partes.path}")
+
+    @staticmethod
+    def _validar_salidas(salidas) -> Optional[List[str]]:
+        """Campos pedidos del resultado (solo se calculan las etapas que necesitan); None para todos"""
+        if salidas is None:
+            return None
+        from analysis.case_analyzer import CaseAnalyzer
+
+        if not isinstance(salidas, list) or not all(isinstance(s, str) for s in salidas):
+            raise ErrorPeticion(400, "'salidas' debe ser una lista de nombres de campo")
+        desconocidas = [s for s in salidas if s not in CaseAnalyzer.SALIDAS]
+        if desconocidas:
+            raise ErrorPeticion(400, f"Salidas desconocidas: {', '.join(desconocidas)}")
+        return salidas
+
+    @staticmethod
+    def _exigir_metodo(metodo: str, esperado: str):
+        if metodo != esperado:
+            raise ErrorPeticion(405, f"Método {metodo} no permitido; use {esperado}")
+
+    @staticmethod
+    def _leer_json(cuerpo: bytes) -> Dict:
+        try:
+            datos = json.loads(cuerpo or b"{}")
+        except ValueError:
+            raise ErrorPeticion(400, "El cuerpo no es JSON válido")
+        if not isinstance(datos, dict):
+            raise ErrorPeticion(400, "El cuerpo debe ser un objeto JSON")
+        return datos
+
+    async def _responder(self, metodo: str, destino: str, cuerpo: bytes) -> Tuple[int, bytes]:
+        """Código de estado y cuerpo de la respuesta; los errores se devuelven como JSON"""
+        try:
+            respuesta = await self._despachar(metodo, destino, cuerpo)
+            self.contadores["atendidas"] += 1
+            return 200, respuesta
+        except ErrorPeticion as e:
+            return e.estado, _a_json({"error": str(e)})
+        except Exception as e:
+            self.contadores["errores"] += 1
+            return 500, _a_json({"error": f"{type(e).__name__}: {e}"})
+
+    async def _atender_conexion(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        """Atiende las peticiones de una conexión (HTTP/1.1 con keep-alive)"""
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                metodo, destino, version = linea.decode("latin-1").split()
+
+                cabeceras = {}
+                while True:
+                    cabecera = await lector.readline()
+                    if cabecera in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = cabecera.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+
+                longitud = int(cabeceras.get("content-length", 0))
+                if longitud > MAX_CUERPO:
+                    estado, respuesta = 413, _a_json({"error": "Cuerpo demasiado grande"})
+                    mantener = False
+                else:
+                    cuerpo = await lector.readexactly(longitud) if longitud else b""
+                    estado, respuesta = await self._responder(metodo.upper(), destino, cuerpo)
+                    mantener = (version == "HTTP/1.1" and
+                                cabeceras.get("connection", "").lower() != "close")
+
+                cabecera_respuesta = (
+                    f"HTTP/1.1 {estado} {MENSAJES_ESTADO.get(estado, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(respuesta)}\r\n"
+                    + ("Retry-After: 1\r\n" if estado == 503 else "")
+                    + f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n"
+                )
+                escritor.write(cabecera_respuesta.encode("latin-1") + respuesta)
+                await escritor.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            escritor.close()
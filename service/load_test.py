@@ -0,0 +1,146 @@
+"""
+Prueba de Carga del Servicio de Análisis
+Lanza clientes concurrentes contra el servicio y mide la latencia (p50/p99)
+
+Uso:
+    python -m service.load_test                      # arranca un servicio local
+    python -m service.load_test --url http://127.0.0.1:8080
+    python -m service.load_test --timeout 0.01       # peticiones que expiran (504)
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .analysis_service import TIMEOUT_DEFECTO, AnalysisService
+
+
+HECHOS_PRUEBA = [
+    "Juan mató a Pedro por la espalda con alevosía mientras dormía y luego confesó.",
+    "El acusado robó con violencia el bolso a una mujer y después devolvió el dinero.",
+    "Se defendió de una agresión ilegítima golpeando al agresor.",
+    "Mediante engaño obtuvo una transferencia de 5.000 euros con ánimo de lucro.",
+    "Conducía bajo la influencia del alcohol a velocidad excesiva.",
+]
+
+
+def percentil(valores: Sequence[float], p: float) -> float:
+    """Percentil por rango más cercano sobre valores ordenados"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+async def _peticion(lector, escritor, host: str, cuerpo: bytes) -> int:
+    """Envía un POST /analizar por la conexión abierta y devuelve el código de estado"""
+    escritor.write(
+        f"POST /analizar HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(cuerpo)}\r\n\r\n".encode("latin-1") + cuerpo
+    )
+    await escritor.drain()
+
+    estado = int((await lector.readline()).split()[1])
+    longitud = 0
+    while True:
+        cabecera = await lector.readline()
+        if cabecera in (b"\r\n", b""):
+            break
+        nombre, _, valor = cabecera.decode("latin-1").partition(":")
+        if nombre.strip().lower() == "content-length":
+            longitud = int(valor)
+    await lector.readexactly(longitud)
+    return estado
+
+
+async def _cliente(host: str, puerto: int, peticiones: int, desfase: int,
+                   resultados: List[Tuple[int, float]]):
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    try:
+        for i in range(peticiones):
+            hechos = HECHOS_PRUEBA[(desfase + i) % len(HECHOS_PRUEBA)]
+            cuerpo = json.dumps({"hechos": hechos, "contexto": {"fecha_hechos": "01/03/2020"}}).encode()
+            inicio = time.perf_counter()
+            estado = await _peticion(lector, escritor, host, cuerpo)
+            resultados.append((estado, time.perf_counter() - inicio))
+    finally:
+        escritor.close()
+
+
+async def _esperar_trabajadores(servicio: AnalysisService, limite: float = 60.0):
+    """Espera a que terminen las tareas que siguen en los trabajadores tras expirar sus peticiones"""
+    fin = time.perf_counter() + limite
+    while servicio.estado()["en_ejecucion"] and time.perf_counter() < fin:
+        await asyncio.sleep(0.05)
+
+
+async def ejecutar(clientes: int, peticiones: int, url: Optional[str] = None,
+                   workers: Optional[int] = None, max_cola: int = 100,
+                   timeout: float = TIMEOUT_DEFECTO) -> str:
+    """
+    Ejecuta la prueba y devuelve el informe
+
+    Con un servicio local y un `timeout` menor que lo que tarda un análisis,
+    las peticiones expiran (504) con la tarea aún en el trabajador; el informe
+    indica entonces si en algún momento hubo más tareas en ejecución que
+    trabajadores.
+    """
+    servicio = None
+    if url:
+        partes = urlsplit(url)
+        host, puerto = partes.hostname, partes.port or 80
+    else:
+        servicio = AnalysisService(puerto=0, workers=workers, max_cola=max_cola, timeout=timeout)
+        await servicio.iniciar()
+        host, puerto = servicio.host, servicio.puerto
+
+    resultados: List[Tuple[int, float]] = []
+    estado_servicio = None
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(_cliente(host, puerto, peticiones, c, resultados) for c in range(clientes)))
+    finally:
+        duracion = time.perf_counter() - inicio
+        if servicio:
+            await _esperar_trabajadores(servicio)
+            estado_servicio = servicio.estado()
+            await servicio.detener()
+
+    estados = Counter(estado for estado, _ in resultados)
+    latencias = sorted(latencia for estado, latencia in resultados if estado == 200)
+    ms = lambda segundos: f"{segundos * 1000:.1f} ms"
+    lineas = [
+        f"Clientes concurrentes: {clientes} ({peticiones} peticiones cada uno)",
+        f"Peticiones: {len(resultados)} en {duracion:.2f} s ({len(resultados) / duracion:.1f} por segundo)",
+        "Códigos: " + ", ".join(f"{estado}={n}" for estado, n in sorted(estados.items())),
+        f"Latencia (200): p50 {ms(percentil(latencias, 50))}, p90 {ms(percentil(latencias, 90))}, "
+        f"p99 {ms(percentil(latencias, 99))}, máx {ms(latencias[-1] if latencias else 0)}",
+    ]
+    if estado_servicio:
+        pico, plazas = estado_servicio["pico_en_ejecucion"], estado_servicio["workers"]
+        lineas.append(f"Tareas en ejecución: pico {pico} de {plazas} trabajadores"
+                      + (" (¡se superó el número de trabajadores!)" if pico > plazas else "")
+                      + f"; expiradas {estado_servicio['expiradas']}")
+    return "\n".join(lineas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de análisis")
+    parser.add_argument("--url", help="Servicio ya en marcha (por defecto se arranca uno local)")
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=20, help="Peticiones por cliente")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-cola", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_DEFECTO,
+                        help="Tiempo máximo por petición del servicio local (s)")
+    args = parser.parse_args()
+    print(asyncio.run(ejecutar(args.clientes, args.peticiones, args.url, args.workers,
+                               args.max_cola, args.timeout)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Pruebas del resultado del análisis de casos
+"""
+
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis import case_analyzer
+from analysis.cache_resultados import CacheResultados
+from analysis.case_analyzer import CaseAnalyzer, ResultadoAnalisis
+from knowledge.codigo_penal import CodigoPenal
+
+
+HECHOS = "Juan mató a Pedro por la espalda con alevosía mientras dormía y luego confesó."
+AVISO_FECHA = "⚠️ Para verificar prescripción, es necesario indicar la fecha de los hechos"
+
+
+class TestResultadoAnalisis(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analizador = CaseAnalyzer(max_tipos_analizados=2)
+
+    def test_modificar_el_contexto_del_llamante_no_cambia_los_textos(self):
+        contexto = {"lugar": "Madrid"}
+        resultado = self.analizador.analizar_caso(HECHOS, contexto)
+        contexto["fecha_hechos"] = "01/01/2000"
+        self.assertEqual(resultado.contexto, {"lugar": "Madrid"})
+        self.assertIn(AVISO_FECHA, resultado.advertencias)
+
+    def test_textos_iguales_tras_serializar(self):
+        resultado = self.analizador.analizar_caso(HECHOS, {"fecha_hechos": "01/03/2020"})
+        copia = pickle.loads(pickle.dumps(resultado))
+        self.assertFalse(any(copia.redactado(campo) for campo in ResultadoAnalisis.TEXTOS))
+
+        self.assertEqual(copia.como_dict(), resultado.como_dict())
+        self.assertEqual(copia, resultado)
+
+    def test_se_redacta_con_la_configuracion_del_analizador(self):
+        resultado = self.analizador.analizar_caso(HECHOS)
+        copia = pickle.loads(pickle.dumps(resultado))
+        copia.fundamentacion
+        redactor = case_analyzer._analizadores_compartidos[self.analizador.configuracion()]
+        self.assertEqual(redactor.max_tipos_analizados, 2)
+
+    def test_codigo_penal_propio_redacta_antes_de_serializar(self):
+        analizador = CaseAnalyzer(codigo_penal=CodigoPenal())
+        self.assertIsNone(analizador.configuracion())
+        resultado = analizador.analizar_caso(HECHOS)
+        copia = pickle.loads(pickle.dumps(resultado))
+        self.assertTrue(all(copia.redactado(campo) for campo in ResultadoAnalisis.TEXTOS))
+        self.assertEqual(copia.como_dict(), resultado.como_dict())
+
+
+class TestCacheIncremental(unittest.TestCase):
+    """El primer fragmento de un caso incremental usa la caché de resultados"""
+
+    AMPLIACION = "Después se llevó la cartera de la víctima."
+
+    def setUp(self):
+        self.analizador = CaseAnalyzer(max_tipos_analizados=2, cache=CacheResultados())
+        self.sin_cache = CaseAnalyzer(max_tipos_analizados=2)
+
+    def test_caso_nuevo_guarda_en_la_cache(self):
+        incremental = self.analizador.analizar_incremental("caso", HECHOS)
+        self.assertEqual(self.analizador.cache.estadisticas["fallos"], 1)
+        completo = self.analizador.analizar_caso(HECHOS)
+        self.assertEqual(self.analizador.cache.estadisticas["aciertos_memoria"], 1)
+        self.assertEqual(completo.como_dict(), incremental.como_dict())
+
+    def test_caso_nuevo_se_sirve_de_la_cache(self):
+        self.analizador.analizar_caso(HECHOS)
+        incremental = self.analizador.analizar_incremental("caso", HECHOS)
+        self.assertEqual(self.analizador.cache.estadisticas["aciertos_memoria"], 1)
+        self.assertEqual(incremental.como_dict(), self.sin_cache.analizar_caso(HECHOS).como_dict())
+
+        # El turno siguiente parte del estado acumulado
+        ampliado = self.analizador.analizar_incremental("caso", self.AMPLIACION)
+        esperado = self.sin_cache.analizar_caso(f"{HECHOS}\n{self.AMPLIACION}")
+        self.assertEqual(ampliado.como_dict(), esperado.como_dict())
+        self.assertEqual(self.analizador.cache.estadisticas["aciertos_memoria"], 1)
+
+
+class TestPuntuacionRelativaTipos(unittest.TestCase):
+    """La puntuación de los candidatos se publica como relativa, no como confianza"""
+
+    HECHOS_AMBIGUOS = "Juan robó con violencia el móvil a Pedro, golpeándole."
+
+    def test_reparte_la_unidad_entre_los_candidatos(self):
+        analizador = CaseAnalyzer(max_tipos_analizados=3, cache=CacheResultados())
+        resultado = analizador.analizar_caso(self.HECHOS_AMBIGUOS)
+        self.assertGreater(len(resultado.puntuacion_relativa_tipos), 1)
+        self.assertEqual(set(resultado.puntuacion_relativa_tipos),
+                         {tipo.nombre for tipo in resultado.tipos_penales_identificados})
+        self.assertAlmostEqual(sum(resultado.puntuacion_relativa_tipos.values()), 1.0)
+        self.assertNotIn("confianza_tipos", ResultadoAnalisis.CAMPOS)
+
+        salidas = analizador.analizar_salidas(self.HECHOS_AMBIGUOS, salidas=["puntuacion_relativa_tipos"])
+        self.assertEqual(salidas["puntuacion_relativa_tipos"], resultado.puntuacion_relativa_tipos)
+        restaurado = analizador.analizar_caso(self.HECHOS_AMBIGUOS)
+        self.assertEqual(analizador.cache.estadisticas["aciertos_memoria"], 1)
+        self.assertEqual(restaurado.puntuacion_relativa_tipos, resultado.puntuacion_relativa_tipos)
+
+
+class TestCircunstanciasDelAnalisis(unittest.TestCase):
+    """Las palabras genéricas de los hechos no se toman por indicios de circunstancias"""
+
+    FALSOS_INDICIOS = {
+        "Sufría esquizofrenia y golpeó a su vecino.": "Ensañamiento",
+        "El acusado sufría una depresión cuando robó la cartera.": "Ensañamiento",
+        "La víctima reconoció al acusado en rueda de reconocimiento.": "Confesión",
+        "El acusado fue reconocido por testigos tras el robo.": "Confesión",
+        "Pagó con una tarjeta robada.": "Reparación del daño",
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analizador = CaseAnalyzer()
+
+    @staticmethod
+    def _circunstancias(resultado):
+        return {c.nombre for c in resultado.circunstancias_atenuantes + resultado.circunstancias_agravantes}
+
+    def test_analisis_completo(self):
+        for hechos, circunstancia in self.FALSOS_INDICIOS.items():
+            self.assertNotIn(circunstancia, self._circunstancias(self.analizador.analizar_caso(hechos)), hechos)
+
+    def test_analisis_incremental(self):
+        for numero, (hechos, circunstancia) in enumerate(self.FALSOS_INDICIOS.items()):
+            caso = f"falsos-indicios-{numero}"
+            mitad = len(hechos) // 2
+            self.analizador.analizar_incremental(caso, hechos[:mitad])
+            resultado = self.analizador.analizar_incremental(caso, hechos[mitad:])
+            self.assertNotIn(circunstancia, self._circunstancias(resultado), hechos)
+            self.analizador.olvidar_caso(caso)
+
+
+if __name__ == "__main__":
+    unittest.main()
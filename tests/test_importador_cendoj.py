@@ -0,0 +1,58 @@
+"""
+Pruebas de la importación de sentencias de CENDOJ
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.base_sentencias import BaseSentencias
+from knowledge.importador_cendoj import extraer_sentencia
+
+
+def documento(organo: str, roj: str, id_cendoj: str) -> str:
+    return (f"Roj: {roj} - ECLI:ES:AP:2020:1\n"
+            f"Id Cendoj: {id_cendoj}\n"
+            f"Órgano: {organo}\n"
+            "Nº de Resolución: 123/2020\n"
+            "Fecha: 14/02/2020\n"
+            "HECHOS PROBADOS\nEl acusado sustrajo la cartera de la víctima.\n")
+
+
+MADRID = documento("Audiencia Provincial de Madrid", "SAP M 2456/2020", "28079370012020100123")
+SEVILLA = documento("Audiencia Provincial de Sevilla", "SAP SE 811/2020", "41091370042020100123")
+
+
+class TestClaveDeImportacion(unittest.TestCase):
+
+    def test_mismo_numero_de_resolucion_en_distintas_audiencias(self):
+        clave_madrid, madrid = extraer_sentencia(MADRID)
+        clave_sevilla, sevilla = extraer_sentencia(SEVILLA)
+        self.assertEqual((clave_madrid, clave_sevilla), ("SAP_M_2456/2020", "SAP_SE_811/2020"))
+        self.assertEqual(madrid.numero, "SAP 123/2020")
+        self.assertEqual(sevilla.numero, "SAP 123/2020")
+
+    def test_sin_roj_se_usa_el_id_cendoj(self):
+        clave, sentencia = extraer_sentencia(MADRID.replace("Roj: SAP M 2456/2020", ""))
+        self.assertEqual(clave, "CENDOJ_28079370012020100123")
+        self.assertEqual(sentencia.numero, "SAP 123/2020")
+
+    def test_ambas_sentencias_se_conservan_en_la_base(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            base = BaseSentencias(os.path.join(directorio, "sentencias.sqlite"))
+            try:
+                registros = [(f"{nombre}.txt", 0.0, *extraer_sentencia(texto), texto)
+                             for nombre, texto in (("madrid", MADRID), ("sevilla", SEVILLA))]
+                base.insertar_lote(registros)
+                self.assertEqual(base.contar(), 2)
+                self.assertEqual(base.obtener("SAP_M_2456/2020").tribunal, "Audiencia Provincial de Madrid")
+                self.assertEqual(base.obtener("SAP_SE_811/2020").tribunal, "Audiencia Provincial de Sevilla")
+            finally:
+                base.cerrar()
+
+
+if __name__ == "__main__":
+    unittest.main()
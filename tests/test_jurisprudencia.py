@@ -0,0 +1,97 @@
+"""
+Pruebas de los índices de la base de jurisprudencia
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.indice_prefijos import IndicePrefijos
+from knowledge.jurisprudencia import Jurisprudencia
+
+
+CLAVE = "STS_531/2022"
+
+
+class TestReemplazarSentencia(unittest.TestCase):
+
+    def setUp(self):
+        self.jurisprudencia = Jurisprudencia(usar_snapshot=False)
+        self.original = self.jurisprudencia.sentencias[CLAVE]
+
+    def _reemplazar(self, **cambios):
+        self.jurisprudencia.agregar_sentencia(CLAVE, replace(self.original, **cambios))
+
+    def test_materia_anterior_deja_de_encontrarse(self):
+        self._reemplazar(materia="Contrabando", tipo_penal="Contrabando", palabras_clave=["aduana"])
+        numeros = [s.numero for s in self.jurisprudencia.buscar_por_materia("Homicidio")]
+        self.assertNotIn(self.original.numero, numeros)
+        numeros = [s.numero for s in self.jurisprudencia.buscar_por_materia("Contrabando")]
+        self.assertIn(self.original.numero, numeros)
+
+    def test_palabra_clave_anterior_deja_de_encontrarse(self):
+        self._reemplazar(palabras_clave=["aduana"])
+        numeros = [s.numero for s in self.jurisprudencia.buscar_por_palabra_clave("dolo")]
+        self.assertNotIn(self.original.numero, numeros)
+        numeros = [s.numero for s in self.jurisprudencia.buscar_por_palabra_clave("aduana")]
+        self.assertEqual(numeros, [self.original.numero])
+
+    def test_citas_anteriores_salen_del_grafo(self):
+        grafo = self.jurisprudencia.grafo_citas
+        autoridad_inicial = grafo.autoridad("STS 234/2021")
+
+        self._reemplazar(doctrina="Sigue el criterio de la STS 234/2021.")
+        self.assertEqual(grafo.citada_por("STS 234/2021"), [self.original.numero])
+        self.assertGreater(grafo.autoridad("STS 234/2021"), autoridad_inicial)
+
+        self._reemplazar(doctrina="Sin citas.")
+        self.assertEqual(grafo.citada_por("STS 234/2021"), [])
+        self.assertAlmostEqual(grafo.autoridad("STS 234/2021"), autoridad_inicial, places=5)
+
+    def test_similares_refleja_el_texto_nuevo(self):
+        consulta = "contrabando de tabaco ocultado en un contenedor en la aduana del puerto"
+        anterior = [s.numero for s, _ in self.jurisprudencia.similares(consulta, k=3)]
+        self.assertNotIn(self.original.numero, anterior)
+
+        self._reemplazar(resumen="Contrabando de tabaco ocultado en un contenedor.",
+                         doctrina="Contrabando en la aduana del puerto.")
+        similares = self.jurisprudencia.similares(consulta, k=3)
+        self.assertEqual(similares[0][0].numero, self.original.numero)
+
+    def test_no_se_carga_el_modelo_persistido_del_texto_anterior(self):
+        consulta = "contrabando de tabaco ocultado en un contenedor en la aduana del puerto"
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta_bd = os.path.join(directorio, "sentencias.sqlite")
+            Jurisprudencia(usar_snapshot=False, ruta_bd=ruta_bd).actualizar_modelo_similitud()
+
+            jurisprudencia = Jurisprudencia(usar_snapshot=False, ruta_bd=ruta_bd)
+            jurisprudencia.agregar_sentencia(CLAVE, replace(
+                self.original, resumen="Contrabando de tabaco ocultado en un contenedor.",
+                doctrina="Contrabando en la aduana del puerto."))
+            similares = jurisprudencia.similares(consulta, k=3)
+            jurisprudencia.base_importada.cerrar()
+        self.assertEqual(similares[0][0].numero, self.original.numero)
+
+    def test_firma_del_corpus_cambia_al_reemplazar(self):
+        firma = self.jurisprudencia._firma_corpus()
+        self._reemplazar(doctrina="Sin citas.")
+        self.assertNotEqual(self.jurisprudencia._firma_corpus(), firma)
+
+
+class TestIndicePrefijos(unittest.TestCase):
+
+    def test_quitar_conserva_los_demas_documentos(self):
+        indice = IndicePrefijos()
+        indice.agregar(0, "dolo eventual")
+        indice.agregar(1, "dolo directo")
+        indice.quitar(0, "dolo eventual")
+        self.assertEqual(indice.candidatos("dolo"), {1})
+        self.assertEqual(indice.candidatos("eventual"), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Pruebas de la normalización de texto y la búsqueda de términos
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.normalizacion import (BuscadorTerminos, ConjuntoTerminos, DocumentoNormalizado, normalizar,
+                                     tokenizar)
+
+
+def documento(texto: str) -> DocumentoNormalizado:
+    return DocumentoNormalizado.desde_texto(texto)
+
+
+class TestNormalizacion(unittest.TestCase):
+
+    def test_minusculas_sin_tildes_conservando_la_enie(self):
+        self.assertEqual(normalizar("Agresión con ENSAÑAMIENTO"), "agresion con ensañamiento")
+
+    def test_tokenizar_sin_palabras_vacias(self):
+        self.assertEqual(tokenizar("Actuó en legítima defensa"), ["actuo", "legitima", "defensa"])
+
+
+class TestBusquedaPorPalabraCompleta(unittest.TestCase):
+
+    def test_forma_exacta_sin_tildes(self):
+        self.assertTrue(documento("Luego confesó el crimen").contiene("confeso"))
+        self.assertTrue(documento("Actuó con alevosía").contiene("alevosia"))
+
+    def test_otras_formas_de_la_palabra_no_coinciden(self):
+        self.assertFalse(documento("Luego confesó el crimen").contiene("confesar"))
+        self.assertFalse(documento("Sufría esquizofrenia").contiene("sufrimiento"))
+        self.assertFalse(documento("En rueda de reconocimiento").contiene("reconocer"))
+        self.assertFalse(documento("Fue reconocido por testigos").contiene("reconocer"))
+        self.assertFalse(documento("Pagó con una tarjeta robada").contiene("pagar"))
+
+    def test_sin_busqueda_por_prefijo(self):
+        self.assertFalse(documento("Una agresión ilegítima").contiene("agresi"))
+        self.assertFalse(documento("Retiró el dinero").contiene("ira"))
+
+    def test_locuciones_como_secuencia_de_palabras(self):
+        hechos = documento("El acusado reconoció los hechos ante el juez")
+        self.assertTrue(hechos.contiene("reconocio los hechos"))
+        self.assertFalse(hechos.contiene("reconocio su culpa"))
+        self.assertFalse(documento("Reconoció al acusado; los hechos").contiene("reconocio los hechos"))
+
+
+class TestTerminosCompilados(unittest.TestCase):
+    """ConjuntoTerminos y BuscadorTerminos aplican la misma regla que contiene"""
+
+    TERMINOS = ("confeso", "pago de la indemnizacion", "sufrimiento innecesario", "ira")
+    TEXTOS = (
+        "Luego confesó.",
+        "Sufría esquizofrenia y se retiró.",
+        "Se hizo cargo del pago de la indemnización.",
+        "Pagó con una tarjeta robada.",
+        "Le causó un sufrimiento innecesario, llevado por la ira.",
+    )
+
+    def test_misma_regla_que_contiene(self):
+        buscador = BuscadorTerminos(self.TERMINOS)
+        for texto in self.TEXTOS:
+            hechos = documento(texto)
+            esperados = {i for i, termino in enumerate(self.TERMINOS) if hechos.contiene(termino)}
+            self.assertEqual(buscador.buscar(hechos), esperados, texto)
+            self.assertEqual(ConjuntoTerminos.desde_terminos(self.TERMINOS).presente_en(hechos),
+                             bool(esperados), texto)
+
+    def test_resultados_esperados(self):
+        buscador = BuscadorTerminos(self.TERMINOS)
+        self.assertEqual([buscador.buscar(documento(texto)) for texto in self.TEXTOS],
+                         [{0}, set(), {1}, set(), {2, 3}])
+
+
+if __name__ == "__main__":
+    unittest.main()
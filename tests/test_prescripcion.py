@@ -0,0 +1,68 @@
+"""
+Pruebas del cómputo de la prescripción (arts. 131 y 132 CP)
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge import prescripcion
+from knowledge.prescripcion import PlazoPrescripcion
+
+
+CINCO_ANIOS = PlazoPrescripcion(60, 60)
+HOY = date(2026, 10, 16)
+
+
+class TestInterrupciones(unittest.TestCase):
+
+    def test_interrupcion_posterior_a_la_prescripcion_no_reinicia_el_plazo(self):
+        resultado = prescripcion.calcular(CINCO_ANIOS, date(2000, 1, 1), ["01/01/2024"],
+                                          fecha_referencia=HOY)
+        self.assertEqual(resultado.inicio_computo, date(2000, 1, 1))
+        self.assertEqual(resultado.fecha_prescripcion_minima, date(2005, 1, 1))
+        self.assertEqual(resultado.estado, "Prescrito")
+
+    def test_interrupciones_desordenadas_se_aplican_por_fecha(self):
+        resultado = prescripcion.calcular(CINCO_ANIOS, date(2000, 1, 1), ["01/01/2008", "01/01/2004"],
+                                          fecha_referencia=HOY)
+        # La de 2004 reinicia el plazo hasta 2009; la de 2008 cae dentro y lo reinicia hasta 2013
+        self.assertEqual(resultado.inicio_computo, date(2008, 1, 1))
+        self.assertEqual(resultado.fecha_prescripcion_minima, date(2013, 1, 1))
+
+    def test_interrupcion_tras_vencer_el_plazo_reiniciado(self):
+        resultado = prescripcion.calcular(CINCO_ANIOS, date(2000, 1, 1), ["01/01/2004", "01/06/2009"],
+                                          fecha_referencia=HOY)
+        self.assertEqual(resultado.inicio_computo, date(2004, 1, 1))
+        self.assertEqual(resultado.fecha_prescripcion_minima, date(2009, 1, 1))
+
+    def test_plazo_variable_se_computa_por_separado(self):
+        plazo = PlazoPrescripcion(60, 120)
+        resultado = prescripcion.calcular(plazo, date(2000, 1, 1), ["01/01/2007"], fecha_referencia=HOY)
+        # Con cinco años ya había prescrito en 2007; con diez, la interrupción reinicia el plazo
+        self.assertEqual(resultado.fecha_prescripcion_minima, date(2005, 1, 1))
+        self.assertEqual(resultado.fecha_prescripcion_maxima, date(2017, 1, 1))
+
+
+class TestSuspensiones(unittest.TestCase):
+
+    def test_suspensiones_solapadas_se_cuentan_una_vez(self):
+        resultado = prescripcion.calcular(
+            CINCO_ANIOS, date(2020, 1, 1),
+            suspensiones=[("01/01/2021", "01/03/2021"), ("01/02/2021", "01/04/2021")],
+            fecha_referencia=HOY,
+        )
+        self.assertEqual(resultado.dias_suspendidos, (date(2021, 4, 1) - date(2021, 1, 1)).days)
+
+    def test_suspension_posterior_a_la_prescripcion_no_cuenta(self):
+        resultado = prescripcion.calcular(CINCO_ANIOS, date(2000, 1, 1),
+                                          suspensiones=[("01/01/2010", "01/01/2011")], fecha_referencia=HOY)
+        self.assertEqual(resultado.dias_suspendidos, 0)
+        self.assertEqual(resultado.fecha_prescripcion_minima, date(2005, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
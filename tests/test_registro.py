@@ -0,0 +1,51 @@
+"""
+Pruebas del registro de instancias compartidas de la base de conocimiento
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.case_analyzer import CaseAnalyzer
+from knowledge.codigo_penal import ArticuloCP, CodigoPenal
+from knowledge.jurisprudencia import Sentencia
+from knowledge.registro import obtener_codigo_penal, obtener_jurisprudencia
+
+
+ARTICULO = ArticuloCP(numero="999", titulo="Artículo de prueba", contenido="Conducta zarandajosa inexistente",
+                      libro="II", titulo_grupo="Prueba", capitulo="Prueba")
+
+
+class TestInstanciasCompartidas(unittest.TestCase):
+
+    def test_codigo_penal_compartido_no_admite_altas(self):
+        codigo = obtener_codigo_penal()
+        with self.assertRaises(TypeError):
+            codigo.agregar_articulo(ARTICULO)
+        self.assertNotIn("999", codigo.articulos)
+
+        propio = CodigoPenal()
+        propio.agregar_articulo(ARTICULO)
+        self.assertIn("999", propio.articulos)
+
+    def test_jurisprudencia_compartida_no_admite_altas(self):
+        jurisprudencia = obtener_jurisprudencia()
+        with self.assertRaises(TypeError):
+            jurisprudencia.agregar_sentencia("STS_PRUEBA", Sentencia(
+                tribunal="TS", numero="STS 9999/2099", fecha="01/01/2099", ponente="Prueba",
+                materia="Zarandajas", tipo_penal="Prueba", resumen="", doctrina="",
+                enlace_cendoj="", palabras_clave=["zarandaja"],
+            ))
+        self.assertNotIn("STS_PRUEBA", jurisprudencia.sentencias)
+
+    def test_analizador_con_la_instancia_del_registro_es_compartido(self):
+        # Como hace la CLI: el Código Penal se pasa explícitamente
+        analizador = CaseAnalyzer(obtener_codigo_penal(), max_tipos_analizados=2)
+        self.assertEqual(analizador.configuracion(), (("max_tipos_analizados", 2),))
+        self.assertIsNone(CaseAnalyzer(CodigoPenal()).configuracion())
+
+
+if __name__ == "__main__":
+    unittest.main()
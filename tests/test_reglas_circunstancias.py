@@ -0,0 +1,106 @@
+"""
+Pruebas de la detección de circunstancias modificativas (tabla de reglas)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.normalizacion import DocumentoNormalizado
+from knowledge.reglas_circunstancias import REGLAS_CIRCUNSTANCIAS, DetectorCircunstancias
+
+
+# Detector original de CaseAnalyzer (búsqueda de subcadenas en los hechos en
+# minúsculas), como referencia de lo que la tabla debe seguir detectando
+_INDICIOS_ORIGINALES = {
+    "atenuante_arrebato": ["arrebato", "obcecacion", "ira", "calentura", "impulso"],
+    "atenuante_confesion": ["confesar", "confesion", "reconocer", "admitir"],
+    "atenuante_reparacion": ["reparar", "reparacion", "devolver", "indemnizar", "pagar"],
+    "atenuante_adiccion": ["adiccion", "drogadicto", "alcoholico", "dependencia"],
+    "agravante_alevosa": ["alevosia", "sorpresa", "indefens", "dormid", "espalda"],
+    "agravante_ensanamiento": ["ensañamiento", "sadismo", "crueldad", "tortura", "sufrimiento"],
+    "agravante_precio": ["precio", "recompensa", "pago", "contrato", "sicario"],
+    "agravante_abuso_superioridad": ["varios", "grupo", "superioridad", "indefens"],
+    "agravante_discriminacion": ["racista", "xenofob", "homofob", "machista", "discrimin"],
+    "agravante_abuso_confianza": ["confianza", "amigo", "familiar", "empleado"],
+    "eximente_anomalia_psiquica": ["esquizofrenia", "psicosis", "trastorno mental", "demencia", "incapaz"],
+    "eximente_estado_necesidad": ["necesidad", "evitar mal", "hambre extrema"],
+    "eximente_miedo_insuperable": ["miedo insuperable", "terror", "amenaza grave"],
+}
+
+
+def deteccion_original(hechos: str, contexto: dict = None) -> set:
+    hechos = hechos.lower()
+    claves = {clave for clave, palabras in _INDICIOS_ORIGINALES.items()
+              if any(palabra in hechos for palabra in palabras)}
+    if (contexto or {}).get("antecedentes") or "antecedentes" in hechos:
+        claves.add("agravante_reincidencia")
+    if any(palabra in hechos for palabra in ("defensa", "defender", "agresi", "atacar", "repeler")):
+        if "legitima defensa" in hechos or ("agresi" in hechos and "defens" in hechos):
+            claves.add("eximente_legitima_defensa")
+    return claves
+
+
+class TestTablaDeReglas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.detector = DetectorCircunstancias(REGLAS_CIRCUNSTANCIAS)
+
+    def detectar(self, hechos: str, contexto: dict = None) -> set:
+        return set(self.detector.detectar(DocumentoNormalizado.desde_texto(hechos), contexto))
+
+    def test_coincide_con_el_detector_original(self):
+        """Relatos sin tildes en los indicios: la tabla detecta lo mismo que el detector original"""
+        casos = [
+            ("Actuo en un arrebato de ira y con obcecacion", {}),
+            ("El acusado decidio confesar y presto confesion ante el juez", {}),
+            ("Se comprometio a reparar el daño y a indemnizar a la victima", {}),
+            ("Tiene una adiccion grave; es drogadicto y alcoholico", {}),
+            ("Le ataco por sorpresa y por la espalda, estando la victima indefensa", {}),
+            ("Actuo con crueldad y sadismo, con tortura", {}),
+            ("Lo hizo por precio y recompensa; era un sicario", {}),
+            ("Un grupo de varios agresores con superioridad numerica", {}),
+            ("Agresion racista y machista", {}),
+            ("Aprovecho la confianza de su amigo, empleado de la tienda", {}),
+            ("Tiene antecedentes por robo", {}),
+            ("Robo sin violencia", {"antecedentes": True}),
+            ("Actuo en legitima defensa", {}),
+            ("Sufre esquizofrenia y psicosis; trastorno mental", {}),
+            ("Robo comida por hambre extrema", {}),
+            ("Actuo por miedo insuperable ante una amenaza grave", {}),
+            ("Le golpeo en la cabeza", {}),
+        ]
+        for hechos, contexto in casos:
+            self.assertEqual(self.detectar(hechos, contexto), deteccion_original(hechos, contexto), hechos)
+
+    def test_formas_flexionadas_y_con_tildes(self):
+        """Formas que el detector original no veía (tildes, flexión) y la tabla recoge explícitamente"""
+        self.assertEqual(self.detectar("Le mató mientras dormía y luego confesó"),
+                         {"agravante_alevosa", "atenuante_confesion"})
+        self.assertEqual(self.detectar("Se defendió de una agresión ilegítima"), {"eximente_legitima_defensa"})
+        self.assertEqual(self.detectar("Actuó en legítima defensa"), {"eximente_legitima_defensa"})
+        self.assertEqual(self.detectar("El acusado reconoció los hechos y pagó la indemnización"),
+                         {"atenuante_confesion", "atenuante_reparacion"})
+        self.assertEqual(self.detectar("Le causó un sufrimiento innecesario"), {"agravante_ensanamiento"})
+
+    def test_indicios_genericos_no_activan_circunstancias(self):
+        """Relatos en los que ni el detector original ni la tabla ven circunstancias"""
+        for hechos in (
+            "Sufría esquizofrenia y golpeó a su vecino",
+            "El acusado sufría una depresión cuando robó la cartera",
+            "La víctima reconoció al acusado en rueda de reconocimiento",
+            "El acusado fue reconocido por testigos tras el robo",
+            "Pagó con una tarjeta robada",
+        ):
+            self.assertEqual(deteccion_original(hechos) - {"eximente_anomalia_psiquica"},
+                             set(), hechos)
+            self.assertEqual(self.detectar(hechos) - {"eximente_anomalia_psiquica"}, set(), hechos)
+
+        self.assertEqual(self.detectar("Sufría esquizofrenia"), {"eximente_anomalia_psiquica"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Pruebas del servicio HTTP/JSON de análisis
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.analysis_service import AnalysisService, ErrorPeticion
+
+
+def _responder(servicio: AnalysisService, metodo: str, destino: str, datos) -> tuple:
+    estado, cuerpo = asyncio.run(servicio._responder(metodo, destino, json.dumps(datos).encode()))
+    return estado, json.loads(cuerpo)
+
+
+class TestValidacion(unittest.TestCase):
+    """Las peticiones mal formadas se rechazan con 400 antes de llegar a los trabajadores"""
+
+    def setUp(self):
+        self.servicio = AnalysisService(workers=1)
+
+    def test_contexto_que_no_es_objeto(self):
+        for contexto in (["a"], "fecha", 3):
+            estado, respuesta = _responder(self.servicio, "POST", "/analizar",
+                                           {"hechos": "Juan mató a Pedro", "contexto": contexto})
+            self.assertEqual(estado, 400, contexto)
+            self.assertIn("contexto", respuesta["error"])
+        self.assertEqual(self.servicio.contadores["errores"], 0)
+
+    def test_salidas_desconocidas(self):
+        estado, _ = _responder(self.servicio, "POST", "/analizar",
+                               {"hechos": "Juan mató a Pedro", "salidas": ["inventada"]})
+        self.assertEqual(estado, 400)
+
+
+class TestPlazas(unittest.TestCase):
+    """Una petición expirada conserva su plaza mientras la tarea sigue en el trabajador"""
+
+    def test_plaza_ocupada_hasta_que_termina_la_tarea(self):
+        liberar_tarea = threading.Event()
+
+        def tarea_lenta():
+            liberar_tarea.wait(5)
+            return b"lenta"
+
+        async def escenario():
+            servicio = AnalysisService(workers=1, timeout=0.2)
+            servicio._pool = ThreadPoolExecutor(max_workers=1)
+            servicio._plazas = asyncio.Semaphore(1)
+            try:
+                with self.assertRaises(ErrorPeticion) as error:
+                    await servicio._ejecutar(tarea_lenta)
+                self.assertEqual(error.exception.estado, 504)
+                self.assertEqual(servicio.estado()["en_ejecucion"], 1)
+
+                # La siguiente petición espera a que termine la tarea expirada
+                siguiente = asyncio.ensure_future(servicio._ejecutar(time.monotonic))
+                await asyncio.sleep(0.02)
+                self.assertFalse(siguiente.done())
+                liberada = time.monotonic()
+                liberar_tarea.set()
+                self.assertGreaterEqual(await siguiente, liberada)
+                self.assertEqual(servicio.estado()["pico_en_ejecucion"], 1)
+            finally:
+                liberar_tarea.set()
+                servicio._pool.shutdown(wait=True)
+
+        asyncio.run(escenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Pruebas del snapshot precompilado de la base de conocimiento
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge import snapshot
+from knowledge.codigo_penal import ArticuloCP, CodigoPenal
+from knowledge.jurisprudencia import Jurisprudencia, Sentencia
+
+
+class TestSnapshot(unittest.TestCase):
+    """Validez del snapshot e independencia de las instancias construidas desde él"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.mkdtemp()
+        cls.ruta_original = snapshot.RUTA_SNAPSHOT
+        snapshot.RUTA_SNAPSHOT = snapshot.construir_snapshot(os.path.join(cls.directorio, "base.snapshot"))
+
+    @classmethod
+    def tearDownClass(cls):
+        snapshot._cache.pop(snapshot.RUTA_SNAPSHOT, None)
+        snapshot.RUTA_SNAPSHOT = cls.ruta_original
+        shutil.rmtree(cls.directorio, ignore_errors=True)
+
+    def test_se_carga_desde_el_snapshot(self):
+        self.assertIsNotNone(snapshot.cargar_seccion("codigo_penal"))
+
+    def test_snapshot_de_otro_codigo_no_se_usa(self):
+        firma = snapshot.firma_codigo()
+        snapshot._cache.pop(snapshot.RUTA_SNAPSHOT, None)
+        snapshot._firma = "otra"
+        try:
+            self.assertFalse(snapshot.snapshot_vigente())
+            self.assertIsNone(snapshot.cargar_seccion("codigo_penal"))
+        finally:
+            snapshot._firma = firma
+            snapshot._cache.pop(snapshot.RUTA_SNAPSHOT, None)
+        self.assertTrue(snapshot.snapshot_vigente())
+
+    def test_codigo_penal_no_comparte_estructuras(self):
+        primero, segundo = CodigoPenal(), CodigoPenal()
+        self.assertIsNot(primero.articulos, segundo.articulos)
+        self.assertIsNot(primero.indice_articulos, segundo.indice_articulos)
+        self.assertIsNot(primero.remisiones_articulos, segundo.remisiones_articulos)
+
+    def test_agregar_articulo_no_afecta_a_otras_instancias(self):
+        codigo = CodigoPenal()
+        codigo.agregar_articulo(ArticuloCP(
+            numero="999", titulo="Artículo de prueba", contenido="Conducta zarandajosa inexistente",
+            libro="II", titulo_grupo="Prueba", capitulo="Prueba",
+        ))
+        self.assertIn("999", codigo.articulos)
+        self.assertTrue(codigo.buscar_texto_articulos("zarandajosa"))
+
+        otro = CodigoPenal()
+        self.assertNotIn("999", otro.articulos)
+        self.assertFalse(otro.buscar_texto_articulos("zarandajosa"))
+
+    def test_agregar_sentencia_no_afecta_a_otras_instancias(self):
+        jurisprudencia = Jurisprudencia()
+        jurisprudencia.agregar_sentencia("STS_PRUEBA", Sentencia(
+            tribunal="TS", numero="STS 9999/2099", fecha="01/01/2099", ponente="Prueba",
+            materia="Zarandajas", tipo_penal="Prueba", resumen="", doctrina="",
+            enlace_cendoj="", palabras_clave=["zarandaja"],
+        ))
+        self.assertTrue(jurisprudencia.buscar_por_materia("Zarandajas"))
+
+        otra = Jurisprudencia()
+        self.assertNotIn("STS_PRUEBA", otra.sentencias)
+        self.assertFalse(otra.buscar_por_materia("Zarandajas"))
+
+
+if __name__ == "__main__":
+    unittest.main()